@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016 Red Hat, Inc.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Microbenchmark comparing `StructSerializer` of the facts modules with
+`get_dict_of_struct`, over synthetic VM, host and disk structs.
+
+Requires Ansible and oVirt Python SDK 4, no engine is needed:
+
+    $ python benchmarks/struct_serializer.py --count 2000 --repeat 5
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import timeit
+
+import ovirtsdk4.types as otypes
+
+from ansible.module_utils.ovirt import get_dict_of_struct
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'module_utils'),
+)
+from ovirt_facts import StructSerializer  # noqa: E402
+
+
+def _with_href(struct, href):
+    # The engine returns `href` of every entity, but the types don't accept it:
+    struct.href = href
+    return struct
+
+
+def _link(struct_type, index, name=None):
+    return _with_href(
+        struct_type(id='%08d-0000-0000-0000-000000000000' % index, name=name),
+        '/ovirt-engine/api/%ss/%d' % (struct_type.__name__.lower(), index),
+    )
+
+
+def make_vm(index):
+    return _with_href(otypes.Vm(
+        id='%08d-0000-0000-0000-000000000001' % index,
+        name='vm%d' % index,
+        description='Benchmark VM %d' % index,
+        status=otypes.VmStatus.UP,
+        type=otypes.VmType.SERVER,
+        memory=4 * 2**30,
+        creation_time=datetime.datetime(2017, 1, 1, 12, 0, index % 60),
+        start_time=datetime.datetime(2017, 1, 2, 12, 0, index % 60),
+        stateless=False,
+        cluster=_link(otypes.Cluster, index % 4),
+        template=_link(otypes.Template, 0),
+        host=_link(otypes.Host, index % 16),
+        cpu=otypes.Cpu(
+            architecture=otypes.Architecture.X86_64,
+            topology=otypes.CpuTopology(cores=2, sockets=2, threads=1),
+        ),
+        os=otypes.OperatingSystem(
+            type='rhel_7x64',
+            boot=otypes.Boot(devices=[otypes.BootDevice.HD, otypes.BootDevice.NETWORK]),
+        ),
+        high_availability=otypes.HighAvailability(enabled=True, priority=50),
+        display=otypes.Display(type=otypes.DisplayType.SPICE, monitors=1),
+        nics=[],
+        tags=[_link(otypes.Tag, i, name='tag%d' % i) for i in range(3)],
+    ), '/ovirt-engine/api/vms/%d' % index)
+
+
+def make_host(index):
+    return _with_href(otypes.Host(
+        id='%08d-0000-0000-0000-000000000002' % index,
+        name='host%d' % index,
+        address='10.0.%d.%d' % (index // 250, index % 250),
+        status=otypes.HostStatus.UP,
+        type=otypes.HostType.RHEL,
+        memory=256 * 2**30,
+        max_scheduling_memory=200 * 2**30,
+        cluster=_link(otypes.Cluster, index % 4),
+        cpu=otypes.Cpu(
+            name='Intel(R) Xeon(R) CPU',
+            speed=2600,
+            topology=otypes.CpuTopology(cores=12, sockets=2, threads=2),
+        ),
+        os=otypes.OperatingSystem(
+            type='RHEL',
+            version=otypes.Version(full_version='7.3', major=7, minor=3),
+        ),
+        summary=otypes.VmSummary(active=20, migrating=0, total=20),
+        power_management=otypes.PowerManagement(enabled=False),
+        hardware_information=otypes.HardwareInformation(
+            manufacturer='Dell Inc.',
+            product_name='PowerEdge R630',
+            serial_number='SN%08d' % index,
+        ),
+        update_available=False,
+    ), '/ovirt-engine/api/hosts/%d' % index)
+
+
+def make_disk(index):
+    return _with_href(otypes.Disk(
+        id='%08d-0000-0000-0000-000000000003' % index,
+        name='disk%d' % index,
+        alias='vm%d_Disk1' % index,
+        status=otypes.DiskStatus.OK,
+        format=otypes.DiskFormat.COW,
+        interface=otypes.DiskInterface.VIRTIO_SCSI,
+        storage_type=otypes.DiskStorageType.IMAGE,
+        provisioned_size=20 * 2**30,
+        actual_size=3 * 2**30,
+        sparse=True,
+        bootable=True,
+        shareable=False,
+        storage_domains=[_link(otypes.StorageDomain, index % 8)],
+        quota=_link(otypes.Quota, 0),
+    ), '/ovirt-engine/api/disks/%d' % index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=1000, help='number of structs of every type')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed repetitions')
+    args = parser.parse_args()
+
+    serializer = StructSerializer()
+    for name, make in (('vm', make_vm), ('host', make_host), ('disk', make_disk)):
+        structs = [make(i) for i in range(args.count)]
+
+        # The serializer must produce exactly the same dictionaries:
+        for struct in structs:
+            expected = get_dict_of_struct(struct)
+            actual = serializer.to_dict(struct)
+            if expected != actual:
+                sys.exit('%s %s differs:\n%s\n%s' % (name, struct.id, expected, actual))
+
+        baseline = min(timeit.repeat(
+            lambda: [get_dict_of_struct(s) for s in structs],
+            number=1,
+            repeat=args.repeat,
+        ))
+        fast = min(timeit.repeat(
+            lambda: [serializer.to_dict(s) for s in structs],
+            number=1,
+            repeat=args.repeat,
+        ))
+        print(
+            '%-5s %6d structs  get_dict_of_struct %8.1f ms  StructSerializer %8.1f ms  speedup %.1fx' % (
+                name, args.count, baseline * 1000, fast * 1000, baseline / fast,
+            )
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016 Red Hat, Inc.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+oVirt dynamic inventory script
+==============================
+
+Generates dynamic inventory of oVirt virtual machines. The VMs are grouped
+by their cluster, data center, tags and affinity labels:
+
+    cluster_<name>, datacenter_<name>, tag_<name>, affinity_label_<name>
+
+The address of the VM reported by the guest agent is used as `ansible_host`
+and all reported addresses are in the `ovirt_ips` variable. The attributes
+of the VM are in the variables prefixed with `ovirt_`.
+
+The script is configured by the `ovirt4.ini` file located next to it,
+or by the file specified by `OVIRT_INI_PATH` environment variable. The
+connection parameters can be also set by `OVIRT_URL`, `OVIRT_USERNAME`,
+`OVIRT_PASSWORD` and `OVIRT_CA_FILE` environment variables.
+
+The inventory is cached on disk for `cache_ttl` seconds, separately for
+every engine, user and search. If `cache_events` is enabled, the cache
+is dropped earlier, as soon as the engine logs an event related to a VM,
+cluster or data center. Run the script with
+`--refresh` to drop the cache explicitly.
+
+Example:
+
+    $ ansible -i contrib/inventory/ovirt4.py cluster_west -m ping
+
+Requires Ansible and oVirt Python SDK 4, it uses the code shared by the
+oVirt facts modules, located in the `module_utils` directory.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+try:
+    import ConfigParser as configparser
+except ImportError:
+    import configparser
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'module_utils'),
+)
+from ovirt_connection import create_connection  # noqa: E402
+from ovirt_facts import (  # noqa: E402
+    entity_to_dict,
+    last_event_index,
+    link_entities,
+    list_pages,
+    read_json,
+    supports_follow,
+    write_json,
+)
+
+
+DEFAULTS = {
+    'ovirt_url': '',
+    'ovirt_username': '',
+    'ovirt_password': '',
+    'ovirt_ca_file': '',
+    'ovirt_insecure': 'false',
+    'ovirt_search': '',
+    'ovirt_fields': '',
+    'ovirt_page_size': '0',
+    'cache_ttl': '300',
+    'cache_path': '~/.ansible/ovirt_inventory_cache',
+    'cache_events': 'true',
+}
+
+# Environment variables overriding the connection parameters:
+ENVIRONMENT = {
+    'ovirt_url': 'OVIRT_URL',
+    'ovirt_username': 'OVIRT_USERNAME',
+    'ovirt_password': 'OVIRT_PASSWORD',
+    'ovirt_ca_file': 'OVIRT_CA_FILE',
+}
+
+# Links of the VM which are needed to build the inventory. The engine
+# returns them inlined, if the SDK supports the `follow` parameter:
+FOLLOW = ['reported_devices', 'tags', 'affinity_labels']
+
+# Attributes of the events, which mean the inventory may have changed:
+EVENT_ATTRIBUTES = ['vm', 'cluster', 'data_center']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Ansible dynamic inventory script for oVirt.',
+    )
+    parser.add_argument(
+        '--list',
+        action='store_true',
+        default=True,
+        help='Get data of all virtual machines (default: True).',
+    )
+    parser.add_argument(
+        '--host',
+        help='Get data of virtual machine.',
+    )
+    parser.add_argument(
+        '--refresh',
+        action='store_true',
+        default=False,
+        help='Drop the cached inventory and fetch it from the engine.',
+    )
+    parser.add_argument(
+        '--pretty',
+        action='store_true',
+        default=False,
+        help='Pretty format (default: False).',
+    )
+    return parser.parse_args()
+
+
+def read_config():
+    """
+    Read the configuration file, environment variables override the
+    connection parameters of the file.
+    """
+    config_path = os.environ.get(
+        'OVIRT_INI_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ovirt4.ini'),
+    )
+    # Raw parser, so passwords can contain `%` characters:
+    parser = configparser.RawConfigParser(DEFAULTS)
+    parser.read(config_path)
+    if not parser.has_section('ovirt'):
+        parser.add_section('ovirt')
+
+    config = dict(parser.items('ovirt'))
+    for option, variable in ENVIRONMENT.items():
+        if os.environ.get(variable):
+            config[option] = os.environ[variable]
+
+    return config
+
+
+def _split(value):
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+def _bool(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+def _names(system_service, services_name):
+    return dict(
+        (e.id, e.name) for e in getattr(system_service, services_name)().list()
+    )
+
+
+def _inventory_changed(events_service, index):
+    """
+    Return `True` if the engine logged an event related to the inventory
+    since the event of the given index.
+    """
+    return any(
+        getattr(event, attribute, None) is not None
+        for event in events_service.list(from_=index)
+        for attribute in EVENT_ATTRIBUTES
+    )
+
+
+def fetch_inventory(connection, config):
+    """
+    Fetch the VMs from the engine and build the inventory.
+    """
+    system_service = connection.system_service()
+    vms_service = system_service.vms_service()
+    clusters = dict(
+        (c.id, c) for c in system_service.clusters_service().list()
+    )
+    data_centers = _names(system_service, 'data_centers_service')
+    fields = _split(config['ovirt_fields'])
+
+    list_kwargs = dict()
+    if supports_follow(vms_service):
+        list_kwargs['follow'] = ','.join(FOLLOW)
+
+    inventory = {'_meta': {'hostvars': {}}}
+
+    def add(group, name):
+        inventory.setdefault(group, {'hosts': []})['hosts'].append(name)
+
+    vms = list_pages(
+        vms_service,
+        search=config['ovirt_search'] or None,
+        page_size=int(config['ovirt_page_size']),
+        **list_kwargs
+    )
+    for vm in vms:
+        ips = [
+            ip.address
+            for device in link_entities(connection, vm.reported_devices)
+            for ip in device.ips or []
+        ]
+        tags = [tag.name for tag in link_entities(connection, vm.tags)]
+        labels = [label.name for label in link_entities(connection, vm.affinity_labels)]
+        cluster = clusters.get(vm.cluster.id) if vm.cluster else None
+        data_center = data_centers.get(cluster.data_center.id) if cluster and cluster.data_center else None
+
+        hostvars = dict(
+            ('ovirt_%s' % key, value)
+            for key, value in entity_to_dict(connection, vm, fields=fields).items()
+            if key not in FOLLOW
+        )
+        hostvars.update(
+            ovirt_ips=ips,
+            ovirt_tags=tags,
+            ovirt_affinity_labels=labels,
+            ovirt_cluster=cluster.name if cluster else None,
+            ovirt_data_center=data_center,
+        )
+        if ips:
+            hostvars['ansible_host'] = ips[0]
+        inventory['_meta']['hostvars'][vm.name] = hostvars
+
+        if cluster:
+            add('cluster_%s' % cluster.name, vm.name)
+        if data_center:
+            add('datacenter_%s' % data_center, vm.name)
+        for tag in tags:
+            add('tag_%s' % tag, vm.name)
+        for label in labels:
+            add('affinity_label_%s' % label, vm.name)
+
+    return inventory
+
+
+def get_inventory(config, refresh=False):
+    """
+    Return the inventory from the cache, or fetch it from the engine if
+    the cache expired, or an event related to the inventory was logged.
+    """
+    ttl = int(config['cache_ttl'])
+    cache_file = os.path.join(
+        os.path.expanduser(config['cache_path']),
+        '%s.json' % hashlib.sha1(
+            json.dumps(
+                [
+                    config['ovirt_url'],
+                    config['ovirt_username'],
+                    config['ovirt_search'],
+                    config['ovirt_fields'],
+                ]
+            ).encode('utf-8')
+        ).hexdigest(),
+    )
+    cached = None if refresh or ttl <= 0 else read_json(cache_file)
+    if cached is not None and time.time() - cached.get('time', 0) > ttl:
+        cached = None
+    if cached is not None and not _bool(config['cache_events']):
+        return cached['inventory']
+
+    connection = create_connection(
+        dict(
+            url=config['ovirt_url'],
+            username=config['ovirt_username'],
+            password=config['ovirt_password'],
+            ca_file=config['ovirt_ca_file'] or None,
+            insecure=_bool(config['ovirt_insecure']),
+        )
+    )
+    try:
+        events_service = connection.system_service().events_service()
+        if cached is not None and not _inventory_changed(events_service, cached['index']):
+            return cached['inventory']
+
+        # Take the index before fetching, so changes done during fetching
+        # invalidate the cache:
+        index = last_event_index(events_service)
+        inventory = fetch_inventory(connection, config)
+        if ttl > 0:
+            write_json(cache_file, dict(time=time.time(), index=index, inventory=inventory))
+        return inventory
+    finally:
+        connection.close()
+
+
+def main():
+    args = parse_args()
+    inventory = get_inventory(read_config(), refresh=args.refresh)
+    if args.host:
+        result = inventory['_meta']['hostvars'].get(args.host, {})
+    else:
+        result = inventory
+
+    print(json.dumps(result, sort_keys=args.pretty, indent=2 if args.pretty else None))
+
+
+if __name__ == '__main__':
+    main()
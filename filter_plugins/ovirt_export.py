@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016 Red Hat, Inc.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import sys
+
+from ansible import errors
+
+# Filters run on the controller, where the module_utils directory of this
+# repository isn't part of the ansible.module_utils package:
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'module_utils'),
+)
+from ovirt_export import load_export  # noqa: E402
+
+
+def ovirt_export_load(export, table=None):
+    """
+    Load facts exported by oVirt facts modules with `export_path` parameter.
+
+    :param export: path of the file, or the `<name>_export` fact
+    :param table: name of the table to return, all tables if not specified
+    :return: dictionary of the lists of entities keyed by table name, or
+             the list of entities of the table
+    """
+    path = export.get('path') if isinstance(export, dict) else export
+    try:
+        tables = load_export(path)
+    except Exception as e:
+        raise errors.AnsibleFilterError("Failed to load oVirt facts export '%s': %s" % (path, e))
+
+    if table is None:
+        return tables
+    if table not in tables:
+        raise errors.AnsibleFilterError("oVirt facts export '%s' has no table '%s'." % (path, table))
+    return tables[table]
+
+
+class FilterModule(object):
+
+    def filters(self):
+        return {
+            'ovirt_export_load': ovirt_export_load,
+        }
@@ -25,9 +25,16 @@ import traceback
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.ovirt import (
     check_sdk,
-    create_connection,
-    get_dict_of_struct,
-    ovirt_full_argument_spec,
+)
+from ansible.module_utils.ovirt_connection import create_connection
+from ansible.module_utils.ovirt_export import export_facts
+from ansible.module_utils.ovirt_facts import (
+    FactsCache,
+    get_dict_of_entity,
+    link_entities,
+    list_by_name,
+    ovirt_facts_argument_spec,
+    supports_follow,
 )
 
 
@@ -49,9 +56,55 @@ options:
     vm:
       description:
         - "Name of the VM, which affinity labels should be listed."
+        - "If Python SDK supports C(follow), the VMs of the labels are returned inlined, by the listing of the labels."
     host:
       description:
         - "Name of the host, which affinity labels should be listed."
+        - "If Python SDK supports C(follow), the hosts of the labels are returned inlined, by the listing of the labels."
+    fetch_nested:
+      description:
+        - "If I(true) the links of the returned entities are followed, and the attributes specified
+           in C(nested_attributes) of the linked entities are returned. Every link is followed by
+           a separate request, consider using C(follow) instead."
+      default: false
+    nested_attributes:
+      description:
+        - "List of the attributes of the linked entities, which are returned if C(fetch_nested) is I(true)."
+    fields:
+      description:
+        - "List of the attributes of the entities, which should be returned. By default all attributes are returned."
+        - "Links of the attributes which aren't listed are never followed, even if C(fetch_nested) is I(true)."
+    follow:
+      description:
+        - "List of the links which the engine should follow, returning the linked entities inlined
+           in the same response, for example I(nics) or I(disk_attachments.disk)."
+        - "This parameter requires oVirt engine and Python SDK 4.2 or higher."
+    cache_ttl:
+      description:
+        - "Number of seconds the gathered facts are cached locally. Subsequent tasks gathering
+           the same facts get them from the cache, without querying the engine. Facts are cached
+           per engine URL, user, module and search parameters."
+        - "By default the facts aren't cached."
+      default: 0
+    cache_path:
+      description:
+        - "Directory where the cached facts are stored."
+      default: "~/.ansible/ovirt_facts_cache"
+    cache_invalidate:
+      description:
+        - "If I(true) all cached facts of this module for the engine are removed, before the facts are gathered."
+      default: false
+    export_path:
+      description:
+        - "Path of the file, where the facts are exported in compact columnar format, instead of returning them.
+           Strings repeated across the entities, like names of clusters, are stored only once.
+           Only the summary of the export is returned as C(affinity_labels_export) fact."
+        - "Exported facts can be loaded by C(ovirt_export_load) filter."
+    export_format:
+      description:
+        - "Format of the file specified by C(export_path), I(msgpack) requires msgpack Python module."
+      choices: ['json', 'msgpack']
+      default: json
 extends_documentation_fragment: ovirt
 '''
 
@@ -94,11 +147,46 @@ ovirt_vms:
                   all affinity labels attributes can be found at following url: https://ovirt.example.com/ovirt-engine/api/model#types/affinity_label."
     returned: On success.
     type: list
+filter_pushed_down:
+    description: "I(true) if the C(host) and C(vm) patterns were evaluated by the engine search backend, so only the matching
+                  hosts and VMs were transferred. Affinity labels themselves don't support search, so it's I(false)
+                  if C(name) pattern is specified."
+    returned: On success.
+    type: bool
+affinity_labels_export:
+    description: "Summary of the export, if C(export_path) is specified. Contains C(path), C(format), C(size) of the file
+                  and C(counts) of the exported entities."
+    returned: When C(export_path) is specified.
+    type: dict
 '''
 
 
+def _matching_ids(service, pattern):
+    """
+    Return IDs of the entities which names match the glob pattern, and flag
+    if the pattern was pushed down to the engine. The matching entities are
+    listed once, so matching members of labels doesn't need to fetch each member.
+    """
+    entities, pushed_down = list_by_name(service, pattern)
+    return set(e.id for e in entities), pushed_down
+
+
+def _list_params(module, service):
+    """
+    Return parameters of the listing of the labels. The members of the labels
+    filtered by their hosts or VMs are inlined by the engine, so the members
+    of every label aren't fetched by separate request.
+    """
+    follow = list(module.params['follow'] or [])
+    if supports_follow(service):
+        for attribute, param in [('hosts', 'host'), ('vms', 'vm')]:
+            if module.params[param] and attribute not in follow:
+                follow.append(attribute)
+    return dict(follow=','.join(follow)) if follow else dict()
+
+
 def main():
-    argument_spec = ovirt_full_argument_spec(
+    argument_spec = ovirt_facts_argument_spec(
         name=dict(default=None),
         host=dict(default=None),
         vm=dict(default=None),
@@ -106,48 +194,60 @@ def main():
     module = AnsibleModule(argument_spec)
     check_sdk(module)
 
+    connection = None
     try:
-        connection = create_connection(module.params.pop('auth'))
-        affinity_labels_service = connection.system_service().affinity_labels_service()
-        labels = []
-        all_labels = affinity_labels_service.list()
-        if module.params['name']:
-            labels.extend([
-                l for l in all_labels
-                if fnmatch.fnmatch(l.name, module.params['name'])
-            ])
-        if module.params['host']:
-            hosts_service = connection.system_service().hosts_service()
-            labels.extend([
-                label
-                for label in all_labels
-                for host in connection.follow_link(label.hosts)
-                if fnmatch.fnmatch(hosts_service.service(host.id).get().name, module.params['host'])
-            ])
-        if module.params['vm']:
-            vms_service = connection.system_service().vms_service()
-            labels.extend([
-                label
-                for label in all_labels
-                for vm in connection.follow_link(label.vms)
-                if fnmatch.fnmatch(vms_service.service(vm.id).get().name, module.params['vm'])
-            ])
-
-        if not (module.params['vm'] or module.params['host'] or module.params['name']):
-            labels = all_labels
+        auth = module.params.pop('auth')
+        facts_cache = FactsCache(module, auth, 'ovirt_affinity_labels_facts')
+        affinity_labels = facts_cache.get()
+        filter_pushed_down = facts_cache.metadata.get('filter_pushed_down', False)
+        if affinity_labels is None:
+            connection = create_connection(auth)
+            affinity_labels_service = connection.system_service().affinity_labels_service()
+            labels = []
+            pushed_down = []
+            all_labels = affinity_labels_service.list(**_list_params(module, affinity_labels_service))
+            if module.params['name']:
+                # Affinity labels don't support search, so they're always filtered locally:
+                labels.extend([
+                    l for l in all_labels
+                    if fnmatch.fnmatch(l.name, module.params['name'])
+                ])
+                pushed_down.append(False)
+            if module.params['host']:
+                hosts_service = connection.system_service().hosts_service()
+                host_ids, host_pushed_down = _matching_ids(hosts_service, module.params['host'])
+                pushed_down.append(host_pushed_down)
+                labels.extend([
+                    label for label in all_labels
+                    if any(host.id in host_ids for host in link_entities(connection, label.hosts))
+                ])
+            if module.params['vm']:
+                vms_service = connection.system_service().vms_service()
+                vm_ids, vm_pushed_down = _matching_ids(vms_service, module.params['vm'])
+                pushed_down.append(vm_pushed_down)
+                labels.extend([
+                    label for label in all_labels
+                    if any(vm.id in vm_ids for vm in link_entities(connection, label.vms))
+                ])
+
+            if not (module.params['vm'] or module.params['host'] or module.params['name']):
+                labels = all_labels
+            filter_pushed_down = bool(pushed_down) and all(pushed_down)
+            affinity_labels = [
+                get_dict_of_entity(connection, module, l) for l in labels
+            ]
+            facts_cache.put(affinity_labels, filter_pushed_down=filter_pushed_down)
 
         module.exit_json(
             changed=False,
-            ansible_facts=dict(
-                affinity_labels=[
-                    get_dict_of_struct(l) for l in labels
-                ],
-            ),
+            ansible_facts=export_facts(module, 'affinity_labels', affinity_labels),
+            filter_pushed_down=filter_pushed_down,
         )
     except Exception as e:
         module.fail_json(msg=str(e), exception=traceback.format_exc())
     finally:
-        connection.close(logout=False)
+        if connection is not None:
+            connection.close(logout=False)
 
 
 if __name__ == '__main__':
@@ -85,6 +85,23 @@ options:
         description:
             - "A boolean flag indicating if Kerberos authentication
                should be used instead of the default basic authentication."
+    connections:
+        required: False
+        version_added: "2.3"
+        description:
+            - "The maximum number of connections to open to the engine. Connections
+               are kept alive and reused by all requests sent by a module, so modules
+               which send many requests don't need to reconnect for each of them.
+               A value of zero (the default) means unlimited number of connections."
+            - "This parameter requires oVirt Python SDK 4.1 or higher."
+    pipeline:
+        required: False
+        version_added: "2.3"
+        description:
+            - "The maximum number of requests to put in an HTTP pipeline of a single
+               connection without waiting for the response. A value of zero (the default)
+               means pipelining is disabled."
+            - "This parameter requires oVirt Python SDK 4.1 or higher."
 notes:
   - "Everytime you use ovirt_auth module to obtain ticket, you need to also revoke the ticket,
      when you no longer need it, otherwise the ticket would be revoked by engine when it expires.
@@ -108,6 +125,18 @@ tasks:
            ca_file: ca.pem
            password: "{{ ovirt_password }}"
 
+       # Modules sending many requests, can reuse pool of persistent connections
+       # and pipeline the requests, when the pool is configured in the SSO token task:
+       - name: Obtain SSO token with connection pool
+         no_log: true
+         ovirt_auth:
+           url: https://ovirt.example.com/ovirt-engine/api
+           username: admin@internal
+           ca_file: ca.pem
+           password: "{{ ovirt_password }}"
+           connections: 10
+           pipeline: 5
+
        # Previous task generated I(ovirt_auth) fact, which you can later use
        # in different modules as follows:
        - ovirt_vms:
@@ -138,6 +167,11 @@ ovirt_auth:
             returned: success
             type: string
             sample: "https://ovirt.example.com/ovirt-engine/api"
+        username:
+            description: "Name of the user, it identifies the user of the data cached locally by the facts modules."
+            returned: success
+            type: string
+            sample: "admin@internal"
         ca_file:
             description: CA file, which is used to verify SSL/TLS connection.
             returned: success
@@ -163,6 +197,16 @@ ovirt_auth:
             returned: success
             type: bool
             sample: False
+        connections:
+            description: Maximum number of persistent connections to the engine.
+            returned: success
+            type: int
+            sample: 10
+        pipeline:
+            description: Maximum number of pipelined requests per connection.
+            returned: success
+            type: int
+            sample: 5
 '''
 
 
@@ -177,6 +221,8 @@ def main():
             timeout=dict(required=False, type='int', default=0),
             compress=dict(required=False, type='bool', default=True),
             kerberos=dict(required=False, type='bool', default=False),
+            connections=dict(required=False, type='int', default=0),
+            pipeline=dict(required=False, type='int', default=0),
             state=dict(default='present', choices=['present', 'absent']),
             ovirt_auth=dict(required=None, type='dict'),
         ),
@@ -193,6 +239,10 @@ def main():
     elif state == 'absent':
         params = module.params['ovirt_auth']
 
+    pool = dict(
+        (param, params.get(param))
+        for param in POOL_PARAMETERS if params.get(param)
+    )
     connection = sdk.Connection(
         url=params.get('url'),
         username=params.get('username'),
@@ -203,6 +253,7 @@ def main():
         compress=params.get('compress'),
         kerberos=params.get('kerberos'),
         token=params.get('token'),
+        **pool
     )
     try:
         token = connection.authenticate()
@@ -212,11 +263,14 @@ def main():
                 ovirt_auth=dict(
                     token=token,
                     url=params.get('url'),
+                    username=params.get('username'),
                     ca_file=params.get('ca_file'),
                     insecure=params.get('insecure'),
                     timeout=params.get('timeout'),
                     compress=params.get('compress'),
                     kerberos=params.get('kerberos'),
+                    connections=params.get('connections'),
+                    pipeline=params.get('pipeline'),
                 ) if state == 'present' else dict()
             )
         )
@@ -229,5 +283,6 @@ def main():
 
 from ansible.module_utils.basic import *
 from ansible.module_utils.ovirt import *
+from ansible.module_utils.ovirt_connection import POOL_PARAMETERS
 if __name__ == "__main__":
     main()
@@ -0,0 +1,171 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016 Red Hat, Inc.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+try:
+    import ovirtsdk4.types as otypes
+except ImportError:
+    pass
+
+import traceback
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.ovirt import (
+    check_sdk,
+    ovirt_full_argument_spec,
+)
+from ansible.module_utils.ovirt_capacity import (
+    HAS_NUMPY,
+    CapacityPlanner,
+)
+from ansible.module_utils.ovirt_connection import create_connection
+
+
+DOCUMENTATION = '''
+---
+module: ovirt_capacity_facts
+short_description: Retrieve capacity of oVirt clusters for host maintenance decisions
+author: "Ondra Machacek (@machacekondra)"
+version_added: "2.3"
+description:
+    - "Retrieve memory and CPU capacity of oVirt hosts and allocations of the Virtual Machines running on them,
+       check whether Virtual Machines of given hosts can be migrated to the other hosts of their clusters, and
+       compute how many hosts of every cluster can be in maintenance at once."
+notes:
+    - "This module creates a new top-level C(ovirt_capacity) fact, which
+       contains the capacity of the hosts."
+    - "The hosts, Virtual Machines and clusters are retrieved by one listing each. Every Virtual Machine is
+       placed to the host with the most free memory, from the Virtual Machine with the most memory."
+    - "If NumPy Python module is available the capacity is computed in vectorized form,
+       which is much faster for thousands of hosts and Virtual Machines."
+options:
+    cluster:
+      description:
+        - "Name of the cluster, which capacity should be retrieved. By default capacity of all clusters is retrieved."
+    hosts:
+      description:
+        - "List of names of the hosts, which should be checked whether they can be moved to maintenance
+           together, so all their Virtual Machines are migrated to the other up hosts of their clusters."
+    cpu_over_commit:
+      description:
+        - "Number of virtual CPUs of the Virtual Machines per one CPU thread of the host. By default
+           only memory of the hosts is considered."
+'''
+
+EXAMPLES = '''
+# Examples don't contain auth parameter for simplicity,
+# look at ovirt_auth module to see how to reuse authentication:
+
+# Check whether host myhost can be moved to maintenance:
+- ovirt_capacity_facts:
+    cluster: production
+    hosts:
+      - myhost
+- ovirt_hosts:
+    name: myhost
+    state: maintenance
+  when: ovirt_capacity.drain.possible
+
+# Print number of hosts of cluster production, which can be in maintenance at once,
+# considering at most 4 virtual CPUs per CPU thread of the hosts:
+- ovirt_capacity_facts:
+    cluster: production
+    cpu_over_commit: 4
+- debug:
+    var: ovirt_capacity.max_hosts_down.production
+'''
+
+RETURN = '''
+ovirt_capacity:
+    description: "Dictionary with capacity of the clusters. Contains C(vectorized) flag which is I(true) if NumPy
+                  was used, and C(hosts) list of dictionaries of every host with its C(name), C(id), C(status),
+                  C(memory_capacity) and C(memory_used) in bytes, C(cpu_capacity) and C(cpu_used) in virtual CPUs,
+                  and number of running C(vms). C(max_hosts_down) is dictionary of number of up hosts which can be
+                  in maintenance at once, keyed by cluster name. If C(hosts) parameter is specified, C(drain) contains
+                  the checked C(hosts), C(possible) flag, C(placement) dictionary of host names keyed by names of the
+                  Virtual Machines, and C(unplaced) list of names of the Virtual Machines, which can't be migrated."
+    returned: On success.
+    type: dict
+'''
+
+
+def main():
+    argument_spec = ovirt_full_argument_spec(
+        cluster=dict(default=None),
+        hosts=dict(default=None, type='list'),
+        cpu_over_commit=dict(default=None, type='float'),
+    )
+    module = AnsibleModule(argument_spec)
+    check_sdk(module)
+
+    connection = None
+    try:
+        auth = module.params.pop('auth')
+        connection = create_connection(auth)
+        planner = CapacityPlanner.fetch(
+            connection,
+            cluster=module.params['cluster'],
+            cpu_over_commit=module.params['cpu_over_commit'],
+        )
+        hosts = dict((host.name, host) for host in planner.hosts)
+        clusters = {}
+        for host in planner.hosts:
+            if host.status == otypes.HostStatus.UP:
+                clusters.setdefault(host.cluster.id, []).append(host.id)
+
+        facts = dict(
+            vectorized=HAS_NUMPY,
+            hosts=planner.host_capacity(),
+            max_hosts_down=dict(
+                (
+                    getattr(planner.clusters.get(cluster_id), 'name', cluster_id),
+                    planner.max_down(host_ids),
+                ) for cluster_id, host_ids in clusters.items()
+            ),
+        )
+
+        if module.params['hosts'] is not None:
+            missing = [name for name in module.params['hosts'] if name not in hosts]
+            if missing:
+                raise Exception("Hosts %s were not found." % ', '.join(missing))
+
+            placement, unplaced = planner.drain([hosts[name].id for name in module.params['hosts']])
+            vms = dict((vm.id, vm.name) for vm in planner.vms)
+            names = dict((host.id, host.name) for host in planner.hosts)
+            facts['drain'] = dict(
+                hosts=module.params['hosts'],
+                possible=not unplaced,
+                placement=dict((vms[vm_id], names[host_id]) for vm_id, host_id in placement.items()),
+                unplaced=sorted(vms[vm_id] for vm_id in unplaced),
+            )
+
+        module.exit_json(
+            changed=False,
+            ansible_facts=dict(ovirt_capacity=facts),
+        )
+    except Exception as e:
+        module.fail_json(msg=str(e), exception=traceback.format_exc())
+    finally:
+        if connection is not None:
+            connection.close(logout=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -43,13 +43,13 @@ from ansible.module_utils.ovirt import (
     check_sdk,
     check_params,
     convert_to_bytes,
-    create_connection,
     equal,
     follow_link,
     ovirt_full_argument_spec,
     search_by_name,
     wait,
 )
+from ansible.module_utils.ovirt_connection import create_connection
 
 
 DOCUMENTATION = '''
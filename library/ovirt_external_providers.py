@@ -31,10 +31,10 @@ from ansible.module_utils.ovirt import (
     BaseModule,
     check_params,
     check_sdk,
-    create_connection,
     equal,
     ovirt_full_argument_spec,
 )
+from ansible.module_utils.ovirt_connection import create_connection
 
 
 DOCUMENTATION = '''
@@ -24,9 +24,14 @@ import traceback
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.ovirt import (
     check_sdk,
-    create_connection,
-    get_dict_of_struct,
-    ovirt_full_argument_spec,
+)
+from ansible.module_utils.ovirt_connection import create_connection
+from ansible.module_utils.ovirt_export import export_facts
+from ansible.module_utils.ovirt_facts import (
+    FactsCache,
+    get_dict_of_entity,
+    list_params,
+    ovirt_facts_argument_spec,
 )
 
 
@@ -46,6 +51,50 @@ options:
       description:
         - "Search term which is accepted by oVirt search backend."
         - "For example to search group X use following pattern: name=X"
+    fetch_nested:
+      description:
+        - "If I(true) the links of the returned entities are followed, and the attributes specified
+           in C(nested_attributes) of the linked entities are returned. Every link is followed by
+           a separate request, consider using C(follow) instead."
+      default: false
+    nested_attributes:
+      description:
+        - "List of the attributes of the linked entities, which are returned if C(fetch_nested) is I(true)."
+    fields:
+      description:
+        - "List of the attributes of the entities, which should be returned. By default all attributes are returned."
+        - "Links of the attributes which aren't listed are never followed, even if C(fetch_nested) is I(true)."
+    follow:
+      description:
+        - "List of the links which the engine should follow, returning the linked entities inlined
+           in the same response, for example I(nics) or I(disk_attachments.disk)."
+        - "This parameter requires oVirt engine and Python SDK 4.2 or higher."
+    cache_ttl:
+      description:
+        - "Number of seconds the gathered facts are cached locally. Subsequent tasks gathering
+           the same facts get them from the cache, without querying the engine. Facts are cached
+           per engine URL, user, module and search parameters."
+        - "By default the facts aren't cached."
+      default: 0
+    cache_path:
+      description:
+        - "Directory where the cached facts are stored."
+      default: "~/.ansible/ovirt_facts_cache"
+    cache_invalidate:
+      description:
+        - "If I(true) all cached facts of this module for the engine are removed, before the facts are gathered."
+      default: false
+    export_path:
+      description:
+        - "Path of the file, where the facts are exported in compact columnar format, instead of returning them.
+           Strings repeated across the entities, like names of clusters, are stored only once.
+           Only the summary of the export is returned as C(ovirt_groups_export) fact."
+        - "Exported facts can be loaded by C(ovirt_export_load) filter."
+    export_format:
+      description:
+        - "Format of the file specified by C(export_path), I(msgpack) requires msgpack Python module."
+      choices: ['json', 'msgpack']
+      default: json
 extends_documentation_fragment: ovirt
 '''
 
@@ -66,32 +115,47 @@ ovirt_groups:
                   all groups attributes can be found at following url: https://ovirt.example.com/ovirt-engine/api/model#types/group."
     returned: On success.
     type: list
+ovirt_groups_export:
+    description: "Summary of the export, if C(export_path) is specified. Contains C(path), C(format), C(size) of the file
+                  and C(counts) of the exported entities."
+    returned: When C(export_path) is specified.
+    type: dict
 '''
 
 
 def main():
-    argument_spec = ovirt_full_argument_spec(
+    argument_spec = ovirt_facts_argument_spec(
         pattern=dict(default='', required=False),
     )
     module = AnsibleModule(argument_spec)
     check_sdk(module)
 
+    connection = None
     try:
-        connection = create_connection(module.params.pop('auth'))
-        groups_service = connection.system_service().groups_service()
-        groups = groups_service.list(search=module.params['pattern'])
+        auth = module.params.pop('auth')
+        facts_cache = FactsCache(module, auth, 'ovirt_groups_facts')
+        ovirt_groups = facts_cache.get()
+        if ovirt_groups is None:
+            connection = create_connection(auth)
+            groups_service = connection.system_service().groups_service()
+            groups = groups_service.list(
+                search=module.params['pattern'],
+                **list_params(module)
+            )
+            ovirt_groups = [
+                get_dict_of_entity(connection, module, c) for c in groups
+            ]
+            facts_cache.put(ovirt_groups)
+
         module.exit_json(
             changed=False,
-            ansible_facts=dict(
-                ovirt_groups=[
-                    get_dict_of_struct(c) for c in groups
-                ],
-            ),
+            ansible_facts=export_facts(module, 'ovirt_groups', ovirt_groups),
         )
     except Exception as e:
         module.fail_json(msg=str(e), exception=traceback.format_exc())
     finally:
-        connection.close(logout=False)
+        if connection is not None:
+            connection.close(logout=False)
 
 
 if __name__ == '__main__':
@@ -26,6 +26,8 @@ except ImportError:
     pass
 
 from ansible.module_utils.ovirt import *
+from ansible.module_utils.ovirt_bulk import run_concurrently
+from ansible.module_utils.ovirt_connection import create_connection
 
 
 DOCUMENTATION = '''
@@ -40,7 +42,14 @@ options:
     name:
         description:
             - "Name of the the host to manage networks for."
-        required: true
+            - "One of C(name) or C(pattern) is required."
+    pattern:
+        description:
+            - "Search term which is accepted by oVirt search backend, selecting the hosts to manage networks for,
+               for example I(cluster=production)."
+            - "NICs and network attachments of all selected hosts are listed concurrently, the differences from the
+               desired C(bond), C(networks) and C(labels) are computed for every host, and networks of the hosts
+               which differ are set up concurrently."
     state:
         description:
             - "Should the host be present/absent."
@@ -75,6 +84,12 @@ options:
     save:
         description:
             - "If I(true) network configuration will be persistent, by default they are temporary."
+    concurrency:
+        description:
+            - "Maximum number of pending requests, when networks of hosts selected by C(pattern) are managed."
+            - "If C(check) is I(true), networks of the hosts are set up in batches of C(concurrency) hosts, and if
+               setup of any host of the batch fails, networks of the remaining hosts aren't set up."
+        default: 10
 extends_documentation_fragment: ovirt
 '''
 
@@ -128,6 +143,23 @@ EXAMPLES = '''
     state: absent
     name: myhost
     interface: eth0
+
+# Create bond0 of eth1 and eth2 interfaces with myvlan1 and myvlan2 vlans on all hosts
+# of cluster production, at most 20 hosts at a time, verifying connectivity:
+- ovirt_host_networks:
+    pattern: cluster=production
+    bond:
+      name: bond0
+      mode: 4
+      interfaces:
+        - eth1
+        - eth2
+    networks:
+      - name: myvlan1
+      - name: myvlan2
+    check: true
+    save: true
+    concurrency: 20
 '''
 
 RETURN = '''
@@ -140,79 +172,267 @@ host_nic:
     description: "Dictionary of all the host NIC attributes. Host NIC attributes can be found on your oVirt instance
                   at following url: https://ovirt.example.com/ovirt-engine/api/model#types/host_nic."
     returned: On success if host NIC is found.
+hosts:
+    description: "List of dictionaries describing the hosts selected by C(pattern). Every dictionary contains C(name),
+                  C(id), C(changed) flag and C(error) message if setup of networks of the host failed."
+    returned: When C(pattern) is specified.
+    type: list
 '''
 
 
-class HostNetworksModule(BaseModule):
+def _bond_nic(bond):
+    return otypes.HostNic(
+        name=bond.get('name'),
+        bonding=otypes.Bonding(
+            options=[
+                otypes.Option(
+                    name="mode",
+                    value=str(bond.get('mode')),
+                )
+            ],
+            slaves=[
+                otypes.HostNic(name=i) for i in bond.get('interfaces', [])
+            ],
+        ),
+    )
 
-    def build_entity(self):
-        return otypes.Host()
 
-    def update_address(self, attachment, network):
-        # Check if there is any change in address assignenmts and
-        # update it if needed:
-        for ip in attachment.ip_address_assignments:
-            if str(ip.ip.version) == network.get('version'):
-                changed = False
-                if not equal(network.get('boot_protocol'), str(ip.assignment_method)):
-                    ip.assignment_method = otypes.BootProtocol(network.get('boot_protocol'))
-                    changed = True
-                if not equal(network.get('address'), ip.ip.address):
-                    ip.ip.address = network.get('address')
-                    changed = True
-                if not equal(network.get('gateway'), ip.ip.gateway):
-                    ip.ip.gateway = network.get('gateway')
-                    changed = True
-                if not equal(network.get('prefix'), int(ip.ip.netmask)):
-                    ip.ip.netmask = str(network.get('prefix'))
-                    changed = True
-
-                if changed:
-                    attachments_service.service(attachment.id).update(attachment)
-                    self.changed = True
-                    break
-
-    def has_update(self, nic_service):
-        update = False
-        bond = self._module.params['bond']
-        networks = self._module.params['networks']
-        nic = nic_service.get()
-
-        if nic is None:
-            return update
-
-        # Check if bond configuration should be updated:
-        if bond:
-            update = not (
-                equal(str(bond.get('mode')), nic.bonding.options[0].value) and
-                equal(
-                    sorted(bond.get('interfaces')) if bond.get('interfaces') else None,
-                    sorted(get_link_name(self._connection, s) for s in nic.bonding.slaves)
-                )
+def _network_labels(labels, nic_name):
+    return [
+        otypes.NetworkLabel(
+            name=str(name),
+            host_nic=otypes.HostNic(
+                name=nic_name,
+            ),
+        ) for name in labels
+    ]
+
+
+def _network_attachment(network, nic_name, attachment_id=None):
+    return otypes.NetworkAttachment(
+        id=attachment_id,
+        network=otypes.Network(
+            name=network['name']
+        ) if network['name'] else None,
+        host_nic=otypes.HostNic(
+            name=nic_name,
+        ),
+        ip_address_assignments=[
+            otypes.IpAddressAssignment(
+                assignment_method=otypes.BootProtocol(
+                    network.get('boot_protocol', 'none')
+                ),
+                ip=otypes.Ip(
+                    address=network.get('address'),
+                    gateway=network.get('gateway'),
+                    netmask=network.get('netmask') or (
+                        str(network['prefix']) if network.get('prefix') is not None else None
+                    ),
+                    version=otypes.IpVersion(
+                        network.get('version')
+                    ) if network.get('version') else None,
+                ),
+            ),
+        ],
+    )
+
+
+def bond_changed(bond, nic, nic_names):
+    """
+    Return `True` if the bond NIC differs from the desired bond, names of
+    the slaves are taken from `nic_names` dictionary keyed by NIC ID.
+    """
+    if nic.bonding is None:
+        return True
+    mode = [option.value for option in nic.bonding.options or [] if option.name == 'mode']
+    return not (
+        equal(str(bond.get('mode')), mode[0] if mode else None) and
+        equal(
+            sorted(bond.get('interfaces')) if bond.get('interfaces') else None,
+            sorted(nic_names.get(s.id) for s in nic.bonding.slaves or [])
+        )
+    )
+
+
+def _prefix(netmask):
+    if netmask is None or '.' not in netmask:
+        return netmask
+    return str(sum(bin(int(octet)).count('1') for octet in netmask.split('.')))
+
+
+def address_changed(attachment, network):
+    """
+    Return `True` if the IP address assignment of the network attachment
+    differs from the desired network.
+    """
+    for ip in attachment.ip_address_assignments or []:
+        if str(ip.ip.version) == network.get('version'):
+            return not (
+                equal(network.get('boot_protocol'), str(ip.assignment_method)) and
+                equal(network.get('address'), ip.ip.address) and
+                equal(network.get('gateway'), ip.ip.gateway) and
+                equal(str(network['prefix']) if network.get('prefix') is not None else None, _prefix(ip.ip.netmask))
             )
+    return False
+
+
+def host_diff(params, nics, attachments, network_names):
+    """
+    Compare the NICs and network attachments of the host with the desired
+    state, and return parameters of the `setup_networks` action, which
+    bring the host to the desired state, or `None` if the host is in the
+    desired state.
+
+    :param params: parameters of the module
+    :param nics: list of the NICs of the host
+    :param attachments: list of the network attachments of the host
+    :param network_names: dictionary of network names keyed by network ID
+    """
+    bond = params['bond']
+    networks = params['networks']
+    labels = params['labels']
+    nic_name = bond.get('name') if bond else params['interface']
+    nic_names = dict((nic.id, nic.name) for nic in nics)
+    nic = next((nic for nic in nics if nic.name == nic_name), None)
+    attached = dict(
+        (network_names.get(attachment.network.id), attachment)
+        for attachment in attachments
+        if nic is not None and attachment.host_nic is not None and attachment.host_nic.id == nic.id
+    )
 
-        if not networks:
-            return update
+    if params['state'] == 'present':
+        modified_bonds = [_bond_nic(bond)] if bond and (nic is None or bond_changed(bond, nic, nic_names)) else None
+        modified_network_attachments = [
+            _network_attachment(
+                network,
+                nic_name,
+                attached[network['name']].id if network['name'] in attached else None,
+            ) for network in networks or []
+            if network['name'] not in attached or address_changed(attached[network['name']], network)
+        ]
+        if nic is not None and not modified_bonds and not modified_network_attachments:
+            return None
+        return dict(
+            modified_bonds=modified_bonds,
+            modified_labels=_network_labels(labels, nic_name) if labels else None,
+            modified_network_attachments=modified_network_attachments or None,
+        )
 
-        # Check if networks attachments configuration should be updated:
-        attachments_service = nic_service.network_attachments_service()
-        network_names = [network.get('name') for network in networks]
+    if nic is None:
+        return None
+    if networks:
+        network_names = [network['name'] for network in networks]
+        attached = dict((name, a) for name, a in attached.items() if name in network_names)
+    if not (labels or bond or attached):
+        return None
+    return dict(
+        removed_bonds=[otypes.HostNic(name=bond.get('name'))] if bond else None,
+        removed_labels=[otypes.NetworkLabel(name=str(name)) for name in labels] if labels else None,
+        removed_network_attachments=list(attached.values()),
+    )
 
-        attachments = {}
-        for attachment in attachments_service.list():
-            name = get_link_name(self._connection, attachment.network)
-            if name in network_names:
-                attachments[name] = attachment
 
-        for network in networks:
-            attachment = attachments.get(network.get('name'))
-            # If attachment don't exsits, we need to create it:
-            if attachment is None:
-                return True
+def bulk_setup(connection, module, hosts_service):
+    """
+    Set up networks of all hosts selected by `pattern`. NICs and network
+    attachments of the hosts are listed concurrently, and networks of the
+    hosts which differ from the desired state are set up concurrently, at
+    most `concurrency` requests are pending at a time. If connectivity is
+    checked, the hosts are set up in batches of `concurrency` hosts, and
+    the next batch is started only if all hosts of the batch succeeded.
+    """
+    concurrency = module.params['concurrency']
+    hosts = sorted(hosts_service.list(search=module.params['pattern']), key=lambda host: host.name)
+    network_names = dict(
+        (network.id, network.name)
+        for network in connection.system_service().networks_service().list()
+    )
 
-            self.update_address(attachment, network)
+    calls = []
+    for host in hosts:
+        host_service = hosts_service.host_service(host.id)
+        calls.append(lambda host_service=host_service: host_service.nics_service().list(wait=False))
+        calls.append(lambda host_service=host_service: host_service.network_attachments_service().list(wait=False))
+    listings = run_concurrently(calls, concurrency)
+
+    results = {}
+    diffs = {}
+    for index, host in enumerate(hosts):
+        results[host.id] = dict(name=host.name, id=host.id, changed=False)
+        (nics, nics_error, _), (attachments, attachments_error, _) = listings[2 * index:2 * index + 2]
+        if nics_error or attachments_error:
+            results[host.id]['error'] = str(nics_error or attachments_error)
+            continue
+        try:
+            diff = host_diff(module.params, nics, attachments, network_names)
+        except Exception as e:
+            results[host.id]['error'] = str(e)
+            continue
+        if diff is not None:
+            results[host.id]['changed'] = True
+            diffs[host.id] = diff
+
+    pending = [host.id for host in hosts if host.id in diffs]
+    batch_size = max(concurrency, 1) if module.params['check'] else max(len(pending), 1)
+    for start in [] if module.check_mode else range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        setups = run_concurrently(
+            [
+                lambda host_id=host_id: hosts_service.host_service(host_id).setup_networks(
+                    check_connectivity=module.params['check'],
+                    wait=False,
+                    **diffs[host_id]
+                ) for host_id in batch
+            ],
+            concurrency,
+        )
+        configured = []
+        for host_id, (_, error, _) in zip(batch, setups):
+            if error is not None:
+                results[host_id].update(changed=False, error=str(error))
+            else:
+                configured.append(host_id)
+
+        if module.params['save']:
+            commits = run_concurrently(
+                [
+                    lambda host_id=host_id: hosts_service.host_service(host_id).commit_net_config(wait=False)
+                    for host_id in configured
+                ],
+                concurrency,
+            )
+            for host_id, (_, error, _) in zip(configured, commits):
+                if error is not None:
+                    results[host_id]['error'] = str(error)
+
+        failed = [results[host_id]['name'] for host_id in batch if 'error' in results[host_id]]
+        if module.params['check'] and failed:
+            for host_id in pending[start + batch_size:]:
+                results[host_id].update(
+                    changed=False,
+                    error="Networks of the host weren't set up, because setup of hosts %s failed." % ', '.join(failed),
+                )
+            break
+
+    ret = dict(
+        changed=any(result['changed'] for result in results.values()),
+        hosts=[results[host.id] for host in hosts],
+    )
+    failed = [result for result in ret['hosts'] if 'error' in result]
+    if failed:
+        module.fail_json(
+            msg="Failed to set up networks of %d of %d hosts: %s" % (
+                len(failed), len(ret['hosts']), ', '.join(result['name'] for result in failed),
+            ),
+            **ret
+        )
+    return ret
 
-        return update
+
+class HostNetworksModule(BaseModule):
+
+    def build_entity(self):
+        return otypes.Host()
 
     def _action_save_configuration(self, entity):
         if self._module.params['save']:
@@ -227,20 +447,29 @@ def main():
             choices=['present', 'absent'],
             default='present',
         ),
-        name=dict(default=None, aliases=['host'], required=True),
+        name=dict(default=None, aliases=['host']),
+        pattern=dict(default=None),
         bond=dict(default=None, type='dict'),
         interface=dict(default=None),
         networks=dict(default=None, type='list'),
         labels=dict(default=None, type='list'),
         check=dict(default=None, type='bool'),
         save=dict(default=None, type='bool'),
+        concurrency=dict(default=10, type='int'),
+    )
+    module = AnsibleModule(
+        argument_spec=argument_spec,
+        required_one_of=[['name', 'pattern']],
+        mutually_exclusive=[['name', 'pattern']],
     )
-    module = AnsibleModule(argument_spec=argument_spec)
     check_sdk(module)
 
     try:
         connection = create_connection(module.params.pop('auth'))
         hosts_service = connection.system_service().hosts_service()
+        if module.params['pattern'] is not None:
+            module.exit_json(**bulk_setup(connection, module, hosts_service))
+
         host_networks_module = HostNetworksModule(
             connection=connection,
             module=module,
@@ -252,103 +481,34 @@ def main():
             raise Exception("Host '%s' was not found." % module.params['name'])
 
         bond = module.params['bond']
-        interface = module.params['interface']
-        networks = module.params['networks']
-        labels = module.params['labels']
         nic_name = bond.get('name') if bond else module.params['interface']
 
-        nics_service = hosts_service.host_service(host.id).nics_service()
-        nic = search_by_name(nics_service, nic_name)
-
-        state = module.params['state']
-        if (
-            state == 'present' and
-            (nic is None or host_networks_module.has_update(nics_service.service(nic.id)))
-        ):
+        # NICs, network attachments and networks of the cluster of the host
+        # are listed once, and compared with the desired state locally:
+        host_service = hosts_service.host_service(host.id)
+        nics_service = host_service.nics_service()
+        nics = nics_service.list()
+        nic = next((nic for nic in nics if nic.name == nic_name), None)
+        networks_service = connection.system_service().clusters_service().cluster_service(
+            host.cluster.id
+        ).networks_service()
+        diff = host_diff(
+            module.params,
+            nics,
+            host_service.network_attachments_service().list(),
+            dict((network.id, network.name) for network in networks_service.list()),
+        )
+        if diff is not None:
             host_networks_module.action(
                 entity=host,
                 action='setup_networks',
                 post_action=host_networks_module._action_save_configuration,
                 check_connectivity=module.params['check'],
-                modified_bonds=[
-                    otypes.HostNic(
-                        name=bond.get('name'),
-                        bonding=otypes.Bonding(
-                            options=[
-                                otypes.Option(
-                                    name="mode",
-                                    value=str(bond.get('mode')),
-                                )
-                            ],
-                            slaves=[
-                                otypes.HostNic(name=i) for i in bond.get('interfaces', [])
-                            ],
-                        ),
-                    ),
-                ] if bond else None,
-                modified_labels=[
-                    otypes.NetworkLabel(
-                        name=str(name),
-                        host_nic=otypes.HostNic(
-                            name=bond.get('name') if bond else interface
-                        ),
-                    ) for name in labels
-                ] if labels else None,
-                modified_network_attachments=[
-                    otypes.NetworkAttachment(
-                        network=otypes.Network(
-                            name=network['name']
-                        ) if network['name'] else None,
-                        host_nic=otypes.HostNic(
-                            name=bond.get('name') if bond else interface
-                        ),
-                        ip_address_assignments=[
-                            otypes.IpAddressAssignment(
-                                assignment_method=otypes.BootProtocol(
-                                    network.get('boot_protocol', 'none')
-                                ),
-                                ip=otypes.Ip(
-                                    address=network.get('address'),
-                                    gateway=network.get('gateway'),
-                                    netmask=network.get('netmask'),
-                                    version=otypes.IpVersion(
-                                        network.get('version')
-                                    ) if network.get('version') else None,
-                                ),
-                            ),
-                        ],
-                    ) for network in networks
-                ] if networks else None,
+                **diff
             )
-        elif state == 'absent' and nic:
-            attachments_service = nics_service.nic_service(nic.id).network_attachments_service()
-            attachments = attachments_service.list()
-            if networks:
-                network_names = [network['name'] for network in networks]
-                attachments = [
-                    attachment for attachment in attachments
-                    if get_link_name(connection, attachment.network) in network_names
-                ]
-            if labels or bond or attachments:
-                host_networks_module.action(
-                    entity=host,
-                    action='setup_networks',
-                    post_action=host_networks_module._action_save_configuration,
-                    check_connectivity=module.params['check'],
-                    removed_bonds=[
-                        otypes.HostNic(
-                            name=bond.get('name'),
-                        ),
-                    ] if bond else None,
-                    removed_labels=[
-                        otypes.NetworkLabel(
-                            name=str(name),
-                        ) for name in labels
-                    ] if labels else None,
-                    removed_network_attachments=list(attachments),
-                )
 
-        nic = search_by_name(nics_service, nic_name)
+        if host_networks_module.changed:
+            nic = search_by_name(nics_service, nic_name)
         module.exit_json(**{
             'changed': host_networks_module.changed,
             'id': nic.id if nic else None,
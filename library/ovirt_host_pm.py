@@ -26,6 +26,7 @@ except ImportError:
     pass
 
 from ansible.module_utils.ovirt import *
+from ansible.module_utils.ovirt_connection import create_connection
 
 
 DOCUMENTATION = '''
@@ -27,7 +27,22 @@ try:
 except ImportError:
     pass
 
+import time
+
 from ansible.module_utils.ovirt import *
+from ansible.module_utils.ovirt_bulk import (
+    BulkResults,
+    ModuleSpec,
+    Slots,
+    create_concurrently,
+    merge_specs,
+    run_waves,
+    search_by_ids,
+    search_by_names,
+    wait_all,
+)
+from ansible.module_utils.ovirt_capacity import CapacityPlanner
+from ansible.module_utils.ovirt_connection import create_connection
 
 
 DOCUMENTATION = '''
@@ -42,7 +57,7 @@ options:
     name:
         description:
             - "Name of the the host to manage."
-        required: true
+            - "Required, unless all hosts of the C(cluster) are I(upgraded), or C(hosts) are specified."
     state:
         description:
             - "State which should a host to be in after successful completion."
@@ -54,6 +69,13 @@ options:
     cluster:
         description:
             - "Name of the cluster, where host should be created."
+            - "If C(state) is I(upgraded) and C(name) isn't specified, all hosts of the cluster, which have
+               an update available, are upgraded in rolling fashion. At most C(upgrade_batch_size) hosts are
+               upgraded at a time, every host is moved to maintenance, upgraded and activated, and the next host
+               is moved to maintenance as soon as one of the hosts is activated. If any host fails, no other host
+               is moved to maintenance, and the module fails."
+            - "In the rolling upgrade C(timeout) limits the upgrade of every host, from its move to maintenance
+               until it's activated, the upgrade of the whole cluster isn't limited."
     address:
         description:
             - "Host address. It can be either FQDN (preferred) or IP address."
@@ -81,6 +103,29 @@ options:
         description:
             - "If True host will be forcibly moved to desired state."
         default: False
+    upgrade_batch_size:
+        description:
+            - "Maximum number of hosts of the C(cluster) upgraded at a time."
+            - "The number of hosts is limited also by the spare capacity of the cluster, so every running
+               Virtual Machine of the upgraded hosts fits into memory of one of the hosts which remain up,
+               considering memory over commitment of the cluster. Hosts with most memory allocated by
+               Virtual Machines are assumed to be upgraded together, see M(ovirt_capacity_facts) module.
+               Hosts which are already in maintenance don't lower the capacity, so they are limited only by
+               this parameter."
+        default: 1
+    hosts:
+        description:
+            - "List of hosts to add in one task. Every host is described by dictionary of C(name), C(address),
+               C(password), C(public_key), C(cluster), C(comment), C(kdump_integration), C(spm_priority) and
+               C(override_iptables) parameters of this module. Parameters of the module, which aren't specified
+               in the dictionary, are used as defaults."
+            - "Only C(state) I(present) is supported. Missing hosts are added concurrently, and all hosts are
+               polled by one request. Added hosts which end up in maintenance are activated as soon as they are
+               installed. Existing hosts are never activated, the module only waits for those which are installing."
+    concurrency:
+        description:
+            - "Maximum number of pending add requests, when C(hosts) are added."
+        default: 10
 extends_documentation_fragment: ovirt
 '''
 
@@ -117,6 +162,28 @@ EXAMPLES = '''
     state: upgraded
     name: myhost
 
+# Add rack of hosts, using public key:
+- ovirt_hosts:
+    cluster: production
+    public_key: true
+    timeout: 1800
+    hosts:
+      - name: rack1host1
+        address: 10.34.61.1
+      - name: rack1host2
+        address: 10.34.61.2
+      - name: rack1host3
+        address: 10.34.61.3
+        spm_priority: 8
+
+# Upgrade all hosts of cluster production, at most 4 hosts at a time,
+# waiting at most one hour for the upgrade of every host:
+- ovirt_hosts:
+    state: upgraded
+    cluster: production
+    upgrade_batch_size: 4
+    timeout: 3600
+
 # Remove host
 - ovirt_hosts:
     state: absent
@@ -134,6 +201,18 @@ host:
     description: "Dictionary of all the host attributes. Host attributes can be found on your oVirt instance
                   at following url: https://ovirt.example.com/ovirt-engine/api/model#types/host."
     returned: On success if host is found.
+hosts:
+    description: "List of dictionaries describing the hosts upgraded in rolling fashion, or added by C(hosts) parameter.
+                  Every dictionary contains C(name), C(id), C(error) message if the host failed, and C(timings) dictionary
+                  with number of seconds since the start of the task. Upgraded hosts have timings of moving to C(maintenance),
+                  when they were C(upgraded) and C(activated). Added hosts contain C(changed) flag, and timings when they were
+                  C(added), C(installed) and C(up), and C(install) duration in seconds."
+    returned: When hosts of the C(cluster) are upgraded, or C(hosts) parameter is specified.
+    type: list
+batch_size:
+    description: "Number of up hosts moved to maintenance and upgraded at a time."
+    returned: When hosts of the C(cluster) are upgraded.
+    type: int
 '''
 
 
@@ -191,6 +270,16 @@ def failed_state(host):
     ]
 
 
+def installing_state(host):
+    return host.status in [
+        hoststate.REBOOT,
+        hoststate.CONNECTING,
+        hoststate.INITIALIZING,
+        hoststate.INSTALLING,
+        hoststate.INSTALLING_OS,
+    ]
+
+
 def control_state(host_module):
     host = host_module.search_entity()
     if host is None:
@@ -200,13 +289,7 @@ def control_state(host_module):
     host_service = host_module._service.service(host.id)
     if failed_state(host):
         raise Exception("Not possible to manage host '%s'." % host.name)
-    elif host.status in [
-        hoststate.REBOOT,
-        hoststate.CONNECTING,
-        hoststate.INITIALIZING,
-        hoststate.INSTALLING,
-        hoststate.INSTALLING_OS,
-    ]:
+    elif installing_state(host):
         wait(
             service=host_service,
             condition=lambda host: host.status == hoststate.UP,
@@ -220,13 +303,228 @@ def control_state(host_module):
         )
 
 
+def rolling_upgrade(connection, module, hosts_service):
+    """
+    Upgrade all hosts of the cluster with an update available. At most
+    `upgrade_batch_size` hosts are upgraded at a time, every host is moved
+    to maintenance, upgraded and activated, and the next host is moved to
+    maintenance as soon as any host is activated. The number of up hosts in
+    maintenance at once is limited also by the spare capacity of the cluster.
+    Hosts which were in maintenance before the upgrade don't lower the
+    capacity, they are upgraded directly and left in maintenance. The
+    `timeout` limits the upgrade of every host, not of the whole cluster.
+    """
+    started = time.time()
+    system_service = connection.system_service()
+    cluster = search_by_name(system_service.clusters_service(), module.params['cluster'])
+    if cluster is None:
+        raise Exception("Cluster '%s' was not found." % module.params['cluster'])
+
+    hosts = hosts_service.list(search='cluster=%s' % module.params['cluster'])
+    candidates = [
+        host for host in hosts
+        if host.update_available and host.status in [hoststate.UP, hoststate.MAINTENANCE]
+    ]
+    failed = [host.name for host in hosts if failed_state(host)]
+    if failed and candidates:
+        raise Exception("Not possible to upgrade hosts, hosts %s are in failed state." % ', '.join(sorted(failed)))
+
+    # Hosts which were up before the upgrade:
+    activate = set(host.id for host in candidates if host.status == hoststate.UP)
+    vms = system_service.vms_service().list(search='cluster=%s' % module.params['cluster'])
+    batch_size = min(
+        module.params['upgrade_batch_size'],
+        CapacityPlanner(hosts, vms, [cluster]).max_down(activate),
+    )
+    results = dict(
+        (host.id, dict(name=host.name, id=host.id, timings=dict()))
+        for host in candidates
+    )
+    ret = dict(
+        changed=bool(candidates),
+        hosts=sorted(results.values(), key=lambda host: host['name']),
+        batch_size=batch_size,
+    )
+    if module.check_mode or not candidates:
+        return ret
+    if activate and batch_size < 1:
+        raise Exception(
+            "Not possible to upgrade hosts, the cluster doesn't have enough capacity to move any host to maintenance."
+        )
+
+    # Steps of the upgrade of every host:
+    steps = {}
+    aborted = []
+    capacity = ('capacity', cluster.id)
+
+    def timing(host_id, name):
+        results[host_id]['timings'][name] = round(time.time() - started, 3)
+
+    def admit(host_id, slots):
+        if aborted:
+            raise Exception("The upgrade wasn't started, because host '%s' failed." % aborted[0])
+        host_service = hosts_service.host_service(host_id)
+        if host_id in activate:
+            if slots.full(capacity):
+                return None
+            steps[host_id] = 'maintenance'
+            return [capacity], lambda: host_service.deactivate(wait=False)
+        steps[host_id] = 'upgrade'
+        timing(host_id, 'maintenance')
+        return [], lambda: host_service.upgrade(wait=False)
+
+    def progress(host):
+        step = steps[host.id]
+        host_service = hosts_service.host_service(host.id)
+        if step == 'maintenance' and host.status == hoststate.MAINTENANCE:
+            timing(host.id, 'maintenance')
+            host_service.upgrade()
+            steps[host.id] = 'upgrade'
+        elif step == 'upgrade' and host.status in [hoststate.INSTALLING, hoststate.REBOOT]:
+            steps[host.id] = 'installing'
+        elif step in ['upgrade', 'installing'] and host.status == hoststate.MAINTENANCE and (
+            step == 'installing' or not host.update_available
+        ):
+            timing(host.id, 'upgraded')
+            if host.id in activate:
+                host_service.activate()
+                steps[host.id] = 'activate'
+            else:
+                steps[host.id] = 'done'
+
+    def condition(host):
+        if host is None:
+            return False
+        if steps[host.id] == 'activate' and host.status == hoststate.UP:
+            timing(host.id, 'activated')
+            return True
+        return steps[host.id] == 'done'
+
+    def fail_condition(host):
+        if host is None or failed_state(host):
+            aborted.append(host.name if host is not None else 'unknown')
+            return True
+        return False
+
+    _, _, errors = run_waves(
+        ids=[host.id for host in sorted(candidates, key=lambda host: host.name)],
+        admit=admit,
+        list_entities=search_by_ids(hosts_service),
+        condition=condition,
+        fail_condition=fail_condition,
+        progress=progress,
+        limit=module.params['upgrade_batch_size'],
+        slots=Slots(dict(capacity=batch_size)),
+        timeout=None,
+        poll_interval=module.params['poll_interval'],
+        entity_timeout=module.params['timeout'],
+    )
+    for host_id, error in errors.items():
+        results[host_id]['error'] = error
+
+    failed = [host for host in ret['hosts'] if 'error' in host]
+    if failed:
+        module.fail_json(
+            msg="Failed to upgrade %d of %d hosts: %s" % (
+                len(failed), len(ret['hosts']), ', '.join(host['name'] for host in failed),
+            ),
+            **ret
+        )
+    return ret
+
+
+BULK_PARAMETERS = [
+    'name', 'address', 'password', 'public_key', 'cluster', 'comment',
+    'kdump_integration', 'spm_priority', 'override_iptables',
+]
+
+
+def bulk_add(connection, module, hosts_service):
+    """
+    Add all hosts of `hosts` parameter. Missing hosts are added concurrently,
+    at most `concurrency` requests are pending at a time. Status of all hosts
+    is polled by one search query per poll, and hosts which end up in
+    maintenance are activated as soon as they are installed.
+    """
+    specs = merge_specs(module, 'hosts', BULK_PARAMETERS, kind='host')
+    existing = search_by_names(hosts_service, [spec['name'] for spec in specs])
+    results = BulkResults([spec['name'] for spec in specs], existing)
+
+    for name, host in existing.items():
+        if failed_state(host):
+            results.fail(name, "Not possible to manage host '%s'." % name)
+
+    added = create_concurrently(
+        module,
+        results,
+        [spec for spec in specs if spec['name'] not in existing],
+        build=lambda spec: HostsModule(
+            connection=connection,
+            module=ModuleSpec(module, spec),
+            service=hosts_service,
+        ).build_entity(),
+        add=lambda entity, spec: hosts_service.add(entity, wait=False),
+        timing='added',
+    )
+
+    # Wait for the added hosts to be up, and for the existing hosts which
+    # are installing. Existing hosts are never activated, because they may
+    # be in maintenance intentionally:
+    added_ids = set(host.id for host in added.values())
+    waiting = [
+        result['id'] for name, result in results.items()
+        if 'error' not in result and result['id'] and (
+            result['id'] in added_ids or installing_state(existing[name])
+        )
+    ]
+    names = dict((result['id'], name) for name, result in results.items())
+    activated = set()
+
+    def condition(host):
+        if host is None:
+            return False
+        if host.id in added_ids:
+            return host.status == hoststate.UP
+        return not installing_state(host)
+
+    def progress(host):
+        timings = results[names[host.id]]['timings']
+        if host.status in [hoststate.MAINTENANCE, hoststate.UP] and 'installed' not in timings:
+            timings['installed'] = results.elapsed(time.time())
+            if 'added' in timings:
+                timings['install'] = round(timings['installed'] - timings['added'], 3)
+        if host.status == hoststate.MAINTENANCE and host.id in added_ids and host.id not in activated:
+            hosts_service.host_service(host.id).activate()
+            activated.add(host.id)
+            results[names[host.id]]['changed'] = True
+
+    if not module.check_mode and waiting and module.params['wait']:
+        phase = time.time()
+        up, errors = wait_all(
+            list_entities=search_by_ids(hosts_service),
+            ids=waiting,
+            condition=condition,
+            fail_condition=lambda host: host is None or failed_state(host),
+            timeout=module.params['timeout'],
+            poll_interval=module.params['poll_interval'],
+            progress=progress,
+        )
+        for host_id in up:
+            if host_id in added_ids:
+                results[names[host_id]]['timings']['up'] = results.elapsed(phase + up[host_id])
+        for host_id, error in errors.items():
+            results.fail(names[host_id], error)
+
+    return results.report(module, 'hosts', 'add', 'hosts')
+
+
 def main():
     argument_spec = ovirt_full_argument_spec(
         state=dict(
             choices=['present', 'absent', 'maintenance', 'upgraded', 'started', 'restarted', 'stopped'],
             default='present',
         ),
-        name=dict(required=True),
+        name=dict(default=None),
         comment=dict(default=None),
         cluster=dict(default=None),
         address=dict(default=None),
@@ -237,16 +535,29 @@ def main():
         override_iptables=dict(default=None, type='bool'),
         force=dict(default=False, type='bool'),
         timeout=dict(default=600, type='int'),
+        upgrade_batch_size=dict(default=1, type='int'),
+        hosts=dict(default=None, type='list'),
+        concurrency=dict(default=10, type='int'),
     )
     module = AnsibleModule(
         argument_spec=argument_spec,
         supports_check_mode=True,
     )
     check_sdk(module)
+    rolling = module.params['state'] == 'upgraded' and module.params['name'] is None and module.params['cluster']
+    if module.params['hosts'] and module.params['state'] != 'present':
+        module.fail_json(msg="Parameter hosts is supported only with state present.")
+    if module.params['name'] is None and not rolling and not module.params['hosts']:
+        module.fail_json(msg="Parameter name is required, unless hosts of cluster are upgraded.")
 
     try:
         connection = create_connection(module.params.pop('auth'))
         hosts_service = connection.system_service().hosts_service()
+        if rolling:
+            module.exit_json(**rolling_upgrade(connection, module, hosts_service))
+        if module.params['hosts']:
+            module.exit_json(**bulk_add(connection, module, hosts_service))
+
         hosts_module = HostsModule(
             connection=connection,
             module=module,
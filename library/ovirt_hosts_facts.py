@@ -25,6 +25,15 @@ except ImportError:
     pass
 
 from ansible.module_utils.ovirt import *
+from ansible.module_utils.ovirt_connection import create_connection
+from ansible.module_utils.ovirt_export import export_facts
+from ansible.module_utils.ovirt_facts import (
+    DeltaTracker,
+    FactsCache,
+    get_dict_of_entity,
+    list_params,
+    ovirt_facts_argument_spec,
+)
 
 
 DOCUMENTATION = '''
@@ -44,6 +53,61 @@ options:
         - "Search term which is accepted by oVirt search backend."
         - "For example to search host X from datacenter Y use following pattern:
            name=X and datacenter=Y"
+    fetch_nested:
+      description:
+        - "If I(true) the links of the returned entities are followed, and the attributes specified
+           in C(nested_attributes) of the linked entities are returned. Every link is followed by
+           a separate request, consider using C(follow) instead."
+      default: false
+    nested_attributes:
+      description:
+        - "List of the attributes of the linked entities, which are returned if C(fetch_nested) is I(true)."
+    fields:
+      description:
+        - "List of the attributes of the entities, which should be returned. By default all attributes are returned."
+        - "Links of the attributes which aren't listed are never followed, even if C(fetch_nested) is I(true)."
+    follow:
+      description:
+        - "List of the links which the engine should follow, returning the linked entities inlined
+           in the same response, for example I(nics) or I(disk_attachments.disk)."
+        - "This parameter requires oVirt engine and Python SDK 4.2 or higher."
+    delta:
+      description:
+        - "If I(true) the module returns only hosts which were added, changed or removed since
+           the previous run of the module by the same user with the same search parameters, in the C(ovirt_hosts_delta) fact."
+        - "The module stores locally a snapshot of the hosts and the index of the last processed engine event,
+           so it fetches only hosts referenced by newer events. The first run returns all hosts as added."
+      default: false
+    delta_path:
+      description:
+        - "Directory where the snapshots of the hosts are stored, if C(delta) is I(true)."
+      default: "~/.ansible/ovirt_facts_delta"
+    cache_ttl:
+      description:
+        - "Number of seconds the gathered facts are cached locally. Subsequent tasks gathering
+           the same facts get them from the cache, without querying the engine. Facts are cached
+           per engine URL, user, module and search parameters."
+        - "By default the facts aren't cached."
+      default: 0
+    cache_path:
+      description:
+        - "Directory where the cached facts are stored."
+      default: "~/.ansible/ovirt_facts_cache"
+    cache_invalidate:
+      description:
+        - "If I(true) all cached facts of this module for the engine are removed, before the facts are gathered."
+      default: false
+    export_path:
+      description:
+        - "Path of the file, where the facts are exported in compact columnar format, instead of returning them.
+           Strings repeated across the entities, like names of clusters, are stored only once.
+           Only the summary of the export is returned as C(ovirt_hosts_export) fact."
+        - "Exported facts can be loaded by C(ovirt_export_load) filter."
+    export_format:
+      description:
+        - "Format of the file specified by C(export_path), I(msgpack) requires msgpack Python module."
+      choices: ['json', 'msgpack']
+      default: json
 extends_documentation_fragment: ovirt
 '''
 
@@ -57,6 +121,14 @@ EXAMPLES = '''
     pattern: name=host* and datacenter=west
 - debug:
     var: ovirt_hosts
+
+# Gather facts only about hosts of data center C(west), which changed since
+# the previous run of this task:
+- ovirt_hosts_facts:
+    pattern: datacenter=west
+    delta: true
+- debug:
+    var: ovirt_hosts_delta.changed
 '''
 
 RETURN = '''
@@ -65,30 +137,74 @@ ovirt_hosts:
                   all hosts attributes can be found at following url: https://ovirt.example.com/ovirt-engine/api/model#types/host."
     returned: On success.
     type: list
+ovirt_hosts_delta:
+    description: "Dictionary with lists of the hosts which were I(added), I(changed) or I(removed) since the previous run.
+                  Every host is described by the same dictionary as in the C(ovirt_hosts) fact."
+    returned: On success, if C(delta) is I(true).
+    type: dict
+ovirt_hosts_export:
+    description: "Summary of the export, if C(export_path) is specified. Contains C(path), C(format), C(size) of the file
+                  and C(counts) of the exported entities."
+    returned: When C(export_path) is specified.
+    type: dict
 '''
 
 
 def main():
-    argument_spec = ovirt_full_argument_spec(
+    argument_spec = ovirt_facts_argument_spec(
         pattern=dict(default='', required=False),
+        delta=dict(default=False, type='bool'),
+        delta_path=dict(default=None),
+    )
+    module = AnsibleModule(
+        argument_spec,
+        mutually_exclusive=[['delta', 'export_path']],
     )
-    module = AnsibleModule(argument_spec)
     check_sdk(module)
 
+    connection = None
     try:
-        connection = create_connection(module.params.pop('auth'))
-        hosts_service = connection.system_service().hosts_service()
-        hosts = hosts_service.list(search=module.params['pattern'])
+        auth = module.params.pop('auth')
+        if module.params['delta']:
+            connection = create_connection(auth)
+            delta_tracker = DeltaTracker(module, auth, 'ovirt_hosts_facts')
+            module.exit_json(
+                changed=False,
+                ansible_facts=dict(
+                    ovirt_hosts_delta=delta_tracker.delta(
+                        connection=connection,
+                        service=connection.system_service().hosts_service(),
+                        event_attribute='host',
+                        convert=lambda h: get_dict_of_entity(connection, module, h),
+                        search=module.params['pattern'],
+                        **list_params(module)
+                    ),
+                ),
+            )
+
+        facts_cache = FactsCache(module, auth, 'ovirt_hosts_facts')
+        ovirt_hosts = facts_cache.get()
+        if ovirt_hosts is None:
+            connection = create_connection(auth)
+            hosts_service = connection.system_service().hosts_service()
+            hosts = hosts_service.list(
+                search=module.params['pattern'],
+                **list_params(module)
+            )
+            ovirt_hosts = [
+                get_dict_of_entity(connection, module, c) for c in hosts
+            ]
+            facts_cache.put(ovirt_hosts)
+
         module.exit_json(
             changed=False,
-            ansible_facts=dict(
-                ovirt_hosts=[
-                    get_dict_of_struct(c) for c in hosts
-                ],
-            ),
+            ansible_facts=export_facts(module, 'ovirt_hosts', ovirt_hosts),
         )
     except Exception as e:
         module.fail_json(msg=str(e))
+    finally:
+        if connection is not None:
+            connection.close(logout=False)
 
 from ansible.module_utils.basic import *
 if __name__ == '__main__':
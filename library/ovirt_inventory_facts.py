@@ -0,0 +1,269 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016 Red Hat, Inc.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import traceback
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.ovirt import (
+    check_sdk,
+)
+from ansible.module_utils.ovirt_connection import create_connection
+from ansible.module_utils.ovirt_export import export_facts
+from ansible.module_utils.ovirt_facts import (
+    FactsCache,
+    get_dict_of_entity,
+    ovirt_facts_argument_spec,
+)
+
+
+DOCUMENTATION = '''
+---
+module: ovirt_inventory_facts
+short_description: Retrieve facts about several oVirt collections at once
+author: "Ondra Machacek (@machacekondra)"
+version_added: "2.3"
+description:
+    - "Retrieve facts about several oVirt collections, for example VMs, hosts and clusters, at once.
+       All collections are fetched concurrently over a single connection, and the entities
+       are cross-linked locally, so links to other fetched entities contain also their names."
+notes:
+    - "This module creates a new top-level C(ovirt_inventory) fact, which
+       contains a dictionary of collections, every collection is a dictionary
+       of entities keyed by their IDs."
+    - "Number of concurrent connections to the engine can be limited by C(connections)
+       parameter of the M(ovirt_auth) module. Concurrent requests require oVirt Python SDK 4.1 or higher."
+options:
+    collections:
+      description:
+        - "List of the collections to fetch."
+      choices: ['vms', 'hosts', 'clusters', 'data_centers', 'storage_domains', 'networks', 'templates', 'vm_pools']
+      default: ['vms', 'hosts', 'clusters', 'data_centers', 'storage_domains', 'networks', 'templates']
+    search:
+      description:
+        - "Dictionary of search terms which are accepted by oVirt search backend, keyed by collection name.
+           For example I({vms: 'cluster=west', hosts: 'cluster=west'})."
+        - "Collections without search term are fetched whole."
+    fetch_nested:
+      description:
+        - "If I(true) the links of the returned entities are followed, and the attributes specified
+           in C(nested_attributes) of the linked entities are returned. Every link is followed by
+           a separate request, links to entities of the fetched collections already contain their names."
+      default: false
+    nested_attributes:
+      description:
+        - "List of the attributes of the linked entities, which are returned if C(fetch_nested) is I(true)."
+    fields:
+      description:
+        - "List of the attributes of the entities, which should be returned. By default all attributes are returned."
+    follow:
+      description:
+        - "Dictionary of lists of the links which the engine should follow, returning the linked entities inlined
+           in the same response, keyed by collection name. For example I({vms: [nics, tags], hosts: [nics]})."
+        - "This parameter requires oVirt engine and Python SDK 4.2 or higher."
+    cache_ttl:
+      description:
+        - "Number of seconds the gathered facts are cached locally. Subsequent tasks gathering
+           the same facts get them from the cache, without querying the engine. Facts are cached
+           per engine URL, user, module and search parameters."
+        - "By default the facts aren't cached."
+      default: 0
+    cache_path:
+      description:
+        - "Directory where the cached facts are stored."
+      default: "~/.ansible/ovirt_facts_cache"
+    cache_invalidate:
+      description:
+        - "If I(true) all cached facts of this module for the engine are removed, before the facts are gathered."
+      default: false
+    export_path:
+      description:
+        - "Path of the file, where the facts are exported in compact columnar format, instead of returning them.
+           Strings repeated across the entities, like names of clusters, are stored only once.
+           Only the summary of the export is returned as C(ovirt_inventory_export) fact."
+        - "Every collection is exported as separate table of entities."
+        - "Exported facts can be loaded by C(ovirt_export_load) filter."
+    export_format:
+      description:
+        - "Format of the file specified by C(export_path), I(msgpack) requires msgpack Python module."
+      choices: ['json', 'msgpack']
+      default: json
+extends_documentation_fragment: ovirt
+'''
+
+EXAMPLES = '''
+# Examples don't contain auth parameter for simplicity,
+# look at ovirt_auth module to see how to reuse authentication:
+
+# Gather facts about all VMs, hosts, clusters, data centers, storage domains,
+# networks and templates:
+- ovirt_inventory_facts:
+- debug:
+    var: ovirt_inventory
+
+# Gather facts about VMs and hosts of cluster C(west) and all clusters,
+# and print the name of the cluster of every VM:
+- ovirt_inventory_facts:
+    collections:
+      - vms
+      - hosts
+      - clusters
+    search:
+      vms: cluster=west
+      hosts: cluster=west
+- debug:
+    msg: "{{ item.value.name }}: {{ item.value.cluster.name }}"
+  with_dict: "{{ ovirt_inventory.vms }}"
+'''
+
+RETURN = '''
+ovirt_inventory:
+    description: "Dictionary of the fetched collections. Every collection is a dictionary of the entities keyed by their IDs.
+                  Entity attributes are mapped to dictionary keys, links to entities of fetched collections contain
+                  also the C(name) of the linked entity."
+    returned: On success.
+    type: dict
+ovirt_inventory_export:
+    description: "Summary of the export, if C(export_path) is specified. Contains C(path), C(format), C(size) of the file
+                  and C(counts) of the exported entities."
+    returned: When C(export_path) is specified.
+    type: dict
+'''
+
+
+# Services of the collections which the module can fetch:
+COLLECTIONS = {
+    'vms': 'vms_service',
+    'hosts': 'hosts_service',
+    'clusters': 'clusters_service',
+    'data_centers': 'data_centers_service',
+    'storage_domains': 'storage_domains_service',
+    'networks': 'networks_service',
+    'templates': 'templates_service',
+    'vm_pools': 'vm_pools_service',
+}
+
+
+def _fetch(connection, module):
+    """
+    Send list requests of all collections at once, and wait for all
+    responses, so the collections are fetched concurrently.
+    """
+    system_service = connection.system_service()
+    search = module.params['search'] or {}
+    follow = module.params['follow'] or {}
+    futures = []
+    for collection in module.params['collections']:
+        links = follow.get(collection)
+        if isinstance(links, list):
+            links = ','.join(links)
+        futures.append((
+            collection,
+            getattr(system_service, COLLECTIONS[collection])().list(
+                search=search.get(collection),
+                wait=False,
+                **(dict(follow=links) if links else dict())
+            ),
+        ))
+    return [(collection, future.wait()) for collection, future in futures]
+
+
+def _cross_link(inventory):
+    """
+    Add names to the links, which point to the entities of fetched collections.
+    """
+    names = dict(
+        (entity_id, entity.get('name'))
+        for entities in inventory.values()
+        for entity_id, entity in entities.items()
+    )
+
+    def link(value):
+        if isinstance(value, dict) and value.get('id') in names and 'name' not in value:
+            value['name'] = names[value['id']]
+
+    for entities in inventory.values():
+        for entity in entities.values():
+            for value in entity.values():
+                if isinstance(value, list):
+                    for item in value:
+                        link(item)
+                else:
+                    link(value)
+
+
+def main():
+    argument_spec = ovirt_facts_argument_spec(
+        collections=dict(
+            default=[
+                'vms', 'hosts', 'clusters', 'data_centers', 'storage_domains', 'networks', 'templates',
+            ],
+            type='list',
+        ),
+        search=dict(default=None, type='dict'),
+        follow=dict(default=None, type='dict'),
+    )
+    module = AnsibleModule(argument_spec)
+    check_sdk(module)
+
+    unknown = (set(module.params['collections']) | set(module.params['follow'] or {})) - set(COLLECTIONS)
+    if unknown:
+        module.fail_json(msg="Unsupported collections: %s" % ', '.join(sorted(unknown)))
+
+    connection = None
+    try:
+        auth = module.params.pop('auth')
+        facts_cache = FactsCache(module, auth, 'ovirt_inventory_facts')
+        ovirt_inventory = facts_cache.get()
+        if ovirt_inventory is None:
+            connection = create_connection(auth)
+            ovirt_inventory = dict(
+                (
+                    collection,
+                    dict(
+                        (e.id, get_dict_of_entity(connection, module, e))
+                        for e in entities
+                    ),
+                ) for collection, entities in _fetch(connection, module)
+            )
+            _cross_link(ovirt_inventory)
+            facts_cache.put(ovirt_inventory)
+
+        module.exit_json(
+            changed=False,
+            ansible_facts=export_facts(
+                module,
+                'ovirt_inventory',
+                ovirt_inventory,
+                tables=dict(
+                    (collection, list(entities.values()))
+                    for collection, entities in ovirt_inventory.items()
+                ),
+            ),
+        )
+    except Exception as e:
+        module.fail_json(msg=str(e), exception=traceback.format_exc())
+    finally:
+        if connection is not None:
+            connection.close(logout=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -31,11 +31,11 @@ from ansible.module_utils.ovirt import (
     BaseModule,
     check_sdk,
     check_params,
-    create_connection,
     equal,
     ovirt_full_argument_spec,
     search_by_name,
 )
+from ansible.module_utils.ovirt_connection import create_connection
 
 
 DOCUMENTATION = '''
@@ -19,17 +19,22 @@
 # along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
 #
 
-import fnmatch
 import traceback
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.ovirt import (
     check_sdk,
-    create_connection,
-    get_dict_of_struct,
-    ovirt_full_argument_spec,
     search_by_name,
 )
+from ansible.module_utils.ovirt_connection import create_connection
+from ansible.module_utils.ovirt_export import export_facts
+from ansible.module_utils.ovirt_facts import (
+    FactsCache,
+    get_dict_of_entity,
+    list_by_name,
+    list_params,
+    ovirt_facts_argument_spec,
+)
 
 
 DOCUMENTATION = '''
@@ -51,6 +56,50 @@ options:
     name:
         description:
             - "Name of the NIC, can be used as glob expression."
+    fetch_nested:
+        description:
+            - "If I(true) the links of the returned entities are followed, and the attributes specified
+               in C(nested_attributes) of the linked entities are returned. Every link is followed by
+               a separate request, consider using C(follow) instead."
+        default: false
+    nested_attributes:
+        description:
+            - "List of the attributes of the linked entities, which are returned if C(fetch_nested) is I(true)."
+    fields:
+        description:
+            - "List of the attributes of the entities, which should be returned. By default all attributes are returned."
+            - "Links of the attributes which aren't listed are never followed, even if C(fetch_nested) is I(true)."
+    follow:
+        description:
+            - "List of the links which the engine should follow, returning the linked entities inlined
+               in the same response, for example I(nics) or I(disk_attachments.disk)."
+            - "This parameter requires oVirt engine and Python SDK 4.2 or higher."
+    cache_ttl:
+        description:
+            - "Number of seconds the gathered facts are cached locally. Subsequent tasks gathering
+               the same facts get them from the cache, without querying the engine. Facts are cached
+               per engine URL, user, module and search parameters."
+            - "By default the facts aren't cached."
+        default: 0
+    cache_path:
+        description:
+            - "Directory where the cached facts are stored."
+        default: "~/.ansible/ovirt_facts_cache"
+    cache_invalidate:
+        description:
+            - "If I(true) all cached facts of this module for the engine are removed, before the facts are gathered."
+        default: false
+    export_path:
+        description:
+            - "Path of the file, where the facts are exported in compact columnar format, instead of returning them.
+               Strings repeated across the entities, like names of clusters, are stored only once.
+               Only the summary of the export is returned as C(ovirt_nics_export) fact."
+            - "Exported facts can be loaded by C(ovirt_export_load) filter."
+    export_format:
+        description:
+            - "Format of the file specified by C(export_path), I(msgpack) requires msgpack Python module."
+        choices: ['json', 'msgpack']
+        default: json
 extends_documentation_fragment: ovirt
 '''
 
@@ -72,46 +121,65 @@ ovirt_nics:
                   all NICs attributes can be found at following url: https://ovirt.example.com/ovirt-engine/api/model#types/nic."
     returned: On success.
     type: list
+filter_pushed_down:
+    description: "I(true) if the C(name) pattern was evaluated by the engine search backend, so only the matching
+                  NICs were transferred, I(false) if all NICs were listed and filtered locally."
+    returned: On success.
+    type: bool
+ovirt_nics_export:
+    description: "Summary of the export, if C(export_path) is specified. Contains C(path), C(format), C(size) of the file
+                  and C(counts) of the exported entities."
+    returned: When C(export_path) is specified.
+    type: dict
 '''
 
 
 def main():
-    argument_spec = ovirt_full_argument_spec(
+    argument_spec = ovirt_facts_argument_spec(
         vm=dict(required=True),
         name=dict(default=None),
     )
     module = AnsibleModule(argument_spec)
     check_sdk(module)
 
+    connection = None
     try:
-        connection = create_connection(module.params.pop('auth'))
-        vms_service = connection.system_service().vms_service()
-        vm_name = module.params['vm']
-        vm = search_by_name(vms_service, vm_name)
-        if vm is None:
-            raise Exception("VM '%s' was not found." % vm_name)
+        auth = module.params.pop('auth')
+        facts_cache = FactsCache(module, auth, 'ovirt_nics_facts')
+        ovirt_nics = facts_cache.get()
+        filter_pushed_down = facts_cache.metadata.get('filter_pushed_down', False)
+        if ovirt_nics is None:
+            connection = create_connection(auth)
+            vms_service = connection.system_service().vms_service()
+            vm_name = module.params['vm']
+            vm = search_by_name(vms_service, vm_name)
+            if vm is None:
+                raise Exception("VM '%s' was not found." % vm_name)
 
-        nics_service = vms_service.service(vm.id).nics_service()
-        if module.params['name']:
-            nics = [
-                e for e in nics_service.list()
-                if fnmatch.fnmatch(e.name, module.params['name'])
+            nics_service = vms_service.service(vm.id).nics_service()
+            if module.params['name']:
+                nics, filter_pushed_down = list_by_name(
+                    nics_service,
+                    module.params['name'],
+                    **list_params(module)
+                )
+            else:
+                nics = nics_service.list(**list_params(module))
+            ovirt_nics = [
+                get_dict_of_entity(connection, module, c) for c in nics
             ]
-        else:
-            nics = nics_service.list()
+            facts_cache.put(ovirt_nics, filter_pushed_down=filter_pushed_down)
 
         module.exit_json(
             changed=False,
-            ansible_facts=dict(
-                ovirt_nics=[
-                    get_dict_of_struct(c) for c in nics
-                ],
-            ),
+            ansible_facts=export_facts(module, 'ovirt_nics', ovirt_nics),
+            filter_pushed_down=filter_pushed_down,
         )
     except Exception as e:
         module.fail_json(msg=str(e), exception=traceback.format_exc())
     finally:
-        connection.close(logout=False)
+        if connection is not None:
+            connection.close(logout=False)
 
 
 if __name__ == '__main__':
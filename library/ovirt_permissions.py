@@ -30,7 +30,6 @@ from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.ovirt import (
     BaseModule,
     check_sdk,
-    create_connection,
     equal,
     follow_link,
     get_link_name,
@@ -38,6 +37,7 @@ from ansible.module_utils.ovirt import (
     search_by_attributes,
     search_by_name,
 )
+from ansible.module_utils.ovirt_connection import create_connection
 
 
 DOCUMENTATION = '''
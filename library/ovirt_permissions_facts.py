@@ -29,11 +29,16 @@ except ImportError:
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.ovirt import (
     check_sdk,
-    create_connection,
-    get_link_name,
-    ovirt_full_argument_spec,
     search_by_name,
 )
+from ansible.module_utils.ovirt_connection import create_connection
+from ansible.module_utils.ovirt_export import export_facts
+from ansible.module_utils.ovirt_facts import (
+    FactsCache,
+    list_params,
+    ovirt_facts_argument_spec,
+)
+from ansible.module_utils.ovirt_names import EntityCache
 
 
 DOCUMENTATION = '''
@@ -63,6 +68,41 @@ options:
         description:
             - "Namespace of the authorization provider, where user/group resides."
         required: false
+    fields:
+        description:
+            - "List of the attributes of the entities, which should be returned. By default all attributes are returned."
+            - "Links of the attributes which aren't listed are never followed, even if C(fetch_nested) is I(true)."
+    follow:
+        description:
+            - "List of the links which the engine should follow, returning the linked entities inlined
+               in the same response, for example I(nics) or I(disk_attachments.disk)."
+            - "This parameter requires oVirt engine and Python SDK 4.2 or higher."
+    cache_ttl:
+        description:
+            - "Number of seconds the gathered facts are cached locally. Subsequent tasks gathering
+               the same facts get them from the cache, without querying the engine. Facts are cached
+               per engine URL, user, module and search parameters."
+            - "By default the facts aren't cached."
+        default: 0
+    cache_path:
+        description:
+            - "Directory where the cached facts are stored."
+        default: "~/.ansible/ovirt_facts_cache"
+    cache_invalidate:
+        description:
+            - "If I(true) all cached facts of this module for the engine are removed, before the facts are gathered."
+        default: false
+    export_path:
+        description:
+            - "Path of the file, where the facts are exported in compact columnar format, instead of returning them.
+               Strings repeated across the entities, like names of clusters, are stored only once.
+               Only the summary of the export is returned as C(ovirt_permissions_export) fact."
+            - "Exported facts can be loaded by C(ovirt_export_load) filter."
+    export_format:
+        description:
+            - "Format of the file specified by C(export_path), I(msgpack) requires msgpack Python module."
+        choices: ['json', 'msgpack']
+        default: json
 extends_documentation_fragment: ovirt
 '''
 
@@ -84,6 +124,11 @@ ovirt_permissions:
                   all permissions attributes can be found at following url: https://ovirt.example.com/ovirt-engine/api/model#types/permission."
     returned: On success.
     type: list
+ovirt_permissions_export:
+    description: "Summary of the export, if C(export_path) is specified. Contains C(path), C(format), C(size) of the file
+                  and C(counts) of the exported entities."
+    returned: When C(export_path) is specified.
+    type: dict
 '''
 
 
@@ -102,7 +147,7 @@ def _permissions_service(connection, module):
 
 
 def main():
-    argument_spec = ovirt_full_argument_spec(
+    argument_spec = ovirt_facts_argument_spec(
         authz_name=dict(required=True, aliases=['domain']),
         user_name=dict(rdefault=None),
         group_name=dict(default=None),
@@ -111,25 +156,40 @@ def main():
     module = AnsibleModule(argument_spec)
     check_sdk(module)
 
+    connection = None
     try:
-        connection = create_connection(module.params.pop('auth'))
-        permissions_service = _permissions_service(connection, module)
-        permissions = []
-        for p in permissions_service.list():
-            newperm = dict()
-            for key, value in p.__dict__.items():
-                if value and isinstance(value, sdk.Struct):
-                    newperm[key[1:]] = get_link_name(connection, value)
-            permissions.append(newperm)
+        auth = module.params.pop('auth')
+        facts_cache = FactsCache(module, auth, 'ovirt_permissions_facts')
+        permissions = facts_cache.get()
+        if permissions is None:
+            connection = create_connection(auth)
+            permissions_service = _permissions_service(connection, module)
+            permissions = []
+            fields = module.params['fields']
+            links = [
+                dict(
+                    (key[1:], value) for key, value in p.__dict__.items()
+                    if (not fields or key[1:] in fields) and value and isinstance(value, sdk.Struct)
+                ) for p in permissions_service.list(**list_params(module))
+            ]
+            # Names of all linked entities are looked up by one query per type:
+            cache = EntityCache(connection)
+            cache.prefetch_names(link for permission in links for link in permission.values())
+            for permission in links:
+                permissions.append(
+                    dict((key, cache.name(link)) for key, link in permission.items())
+                )
+            facts_cache.put(permissions)
 
         module.exit_json(
             changed=False,
-            ansible_facts=dict(ovirt_permissions=permissions),
+            ansible_facts=export_facts(module, 'ovirt_permissions', permissions),
         )
     except Exception as e:
         module.fail_json(msg=str(e), exception=traceback.format_exc())
     finally:
-        connection.close(logout=False)
+        if connection is not None:
+            connection.close(logout=False)
 
 
 if __name__ == '__main__':
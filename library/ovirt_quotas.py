@@ -30,12 +30,12 @@ from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.ovirt import (
     BaseModule,
     check_sdk,
-    create_connection,
     equal,
     get_link_name,
     ovirt_full_argument_spec,
     search_by_name,
 )
+from ansible.module_utils.ovirt_connection import create_connection
 
 
 DOCUMENTATION = '''
@@ -235,5 +235,6 @@ def main():
 
 from ansible.module_utils.basic import *
 from ansible.module_utils.ovirt import *
+from ansible.module_utils.ovirt_connection import create_connection
 if __name__ == "__main__":
     main()
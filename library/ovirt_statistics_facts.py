@@ -0,0 +1,230 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016 Red Hat, Inc.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import time
+import traceback
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.ovirt import (
+    check_sdk,
+    ovirt_full_argument_spec,
+)
+from ansible.module_utils.ovirt_connection import create_connection
+from ansible.module_utils.ovirt_statistics import (
+    ENTITY_SERVICES,
+    HAS_NUMPY,
+    RingBuffer,
+    aggregate,
+    fetch_statistics,
+    to_matrix,
+)
+
+
+DOCUMENTATION = '''
+---
+module: ovirt_statistics_facts
+short_description: Retrieve aggregated statistics of oVirt VMs or hosts
+author: "Ondra Machacek (@machacekondra)"
+version_added: "2.3"
+description:
+    - "Retrieve statistics, like CPU, memory or network usage, of many oVirt VMs or hosts, and return
+       their aggregates: sum, minimum, maximum, mean and percentiles of every statistic, entities with
+       the highest values, and sums per cluster."
+notes:
+    - "This module creates a new top-level C(ovirt_statistics) fact, which
+       contains the aggregated statistics."
+    - "Statistics of the entities are fetched concurrently, number of concurrent connections to the engine
+       can be limited by C(connections) parameter of the M(ovirt_auth) module. Concurrent requests
+       require oVirt Python SDK 4.1 or higher."
+    - "If NumPy Python module is available the aggregates are computed in vectorized form,
+       which is much faster for thousands of entities."
+options:
+    entity_type:
+      description:
+        - "Type of the entities, which statistics are retrieved."
+      choices: ['vm', 'host']
+      default: vm
+    pattern:
+      description:
+        - "Search term which is accepted by oVirt search backend, selecting the entities."
+        - "For example to retrieve statistics of VMs of cluster west use following pattern: cluster=west"
+    statistics:
+      description:
+        - "List of names of the statistics to aggregate, for example I(cpu.current.total) or I(memory.used).
+           By default all statistics reported by the engine are aggregated."
+    percentiles:
+      description:
+        - "List of percentiles of every statistic to compute."
+      default: [50, 95, 99]
+    top:
+      description:
+        - "Number of entities with the highest values of every statistic to return."
+      default: 10
+    window:
+      description:
+        - "Number of seconds to sample the statistics. The statistics are sampled every C(interval) seconds,
+           and the mean of the samples of every entity is aggregated."
+        - "By default the statistics are sampled only once."
+      default: 0
+    interval:
+      description:
+        - "Number of seconds between the samples."
+      default: 10
+    buffer_size:
+      description:
+        - "Maximum number of samples kept in memory. If the C(window) contains more samples,
+           only the latest samples are aggregated."
+      default: 10
+extends_documentation_fragment: ovirt
+'''
+
+EXAMPLES = '''
+# Examples don't contain auth parameter for simplicity,
+# look at ovirt_auth module to see how to reuse authentication:
+
+# Gather CPU and memory statistics of all VMs of cluster west, and print
+# 95th percentile of the CPU usage and the VMs with the highest CPU usage:
+- ovirt_statistics_facts:
+    pattern: cluster=west
+    statistics:
+      - cpu.current.total
+      - memory.used
+- debug:
+    msg: "{{ ovirt_statistics.statistics['cpu.current.total'].percentiles.p95 }}"
+- debug:
+    var: ovirt_statistics.statistics['cpu.current.total'].top
+
+# Sample memory usage of all hosts every 30 seconds for 10 minutes, and
+# print the mean memory used per cluster:
+- ovirt_statistics_facts:
+    entity_type: host
+    statistics:
+      - memory.used
+    window: 600
+    interval: 30
+    buffer_size: 21
+- debug:
+    var: ovirt_statistics.statistics['memory.used'].groups
+'''
+
+RETURN = '''
+ovirt_statistics:
+    description: "Dictionary with aggregated statistics. Contains C(entity_type), C(count) of the entities,
+                  number of aggregated C(samples), C(vectorized) flag which is I(true) if NumPy was used,
+                  and C(statistics) dictionary keyed by statistic name. Every statistic contains its C(unit),
+                  C(sum), C(min), C(max), C(mean), C(percentiles) keyed by percentile, for example I(p95),
+                  C(top) list of entities with the highest values, and C(groups) dictionary of C(sum), C(count)
+                  and C(mean) of the statistic per cluster."
+    returned: On success.
+    type: dict
+'''
+
+
+def _sample(connection, module, entities, names, units):
+    samples, sample_units = fetch_statistics(
+        connection, module.params['entity_type'], entities,
+    )
+    units.update(sample_units)
+    if names is None:
+        names = sorted(set(name for sample in samples for name in sample))
+    return to_matrix(samples, names), names
+
+
+def main():
+    argument_spec = ovirt_full_argument_spec(
+        entity_type=dict(default='vm', choices=sorted(ENTITY_SERVICES)),
+        pattern=dict(default='', required=False),
+        statistics=dict(default=None, type='list'),
+        percentiles=dict(default=[50, 95, 99], type='list'),
+        top=dict(default=10, type='int'),
+        window=dict(default=0, type='int'),
+        interval=dict(default=10, type='int'),
+        buffer_size=dict(default=10, type='int'),
+    )
+    module = AnsibleModule(argument_spec)
+    check_sdk(module)
+
+    try:
+        percentiles = [float(p) for p in module.params['percentiles']]
+    except ValueError:
+        module.fail_json(msg="Percentiles must be numbers: %s" % module.params['percentiles'])
+    if any(p < 0 or p > 100 for p in percentiles):
+        module.fail_json(msg="Percentiles must be between 0 and 100.")
+    if module.params['buffer_size'] < 1 or module.params['interval'] < 1:
+        module.fail_json(msg="The buffer_size and interval parameters must be positive.")
+
+    connection = None
+    try:
+        auth = module.params.pop('auth')
+        connection = create_connection(auth)
+        system_service = connection.system_service()
+        collection_service = ENTITY_SERVICES[module.params['entity_type']][0]
+        entities = getattr(system_service, collection_service)().list(
+            search=module.params['pattern'] or None,
+        )
+        clusters = dict(
+            (c.id, c.name) for c in system_service.clusters_service().list()
+        )
+        groups = [
+            clusters.get(e.cluster.id, e.cluster.id) if e.cluster is not None else ''
+            for e in entities
+        ]
+
+        names = module.params['statistics']
+        units = {}
+        buffer = RingBuffer(module.params['buffer_size'])
+        deadline = time.time() + module.params['window']
+        while True:
+            matrix, names = _sample(connection, module, entities, names, units)
+            buffer.append(matrix)
+            if time.time() + module.params['interval'] > deadline:
+                break
+            time.sleep(module.params['interval'])
+
+        module.exit_json(
+            changed=False,
+            ansible_facts=dict(
+                ovirt_statistics=dict(
+                    entity_type=module.params['entity_type'],
+                    count=len(entities),
+                    samples=len(buffer),
+                    vectorized=HAS_NUMPY,
+                    statistics=aggregate(
+                        buffer.mean(),
+                        names,
+                        units,
+                        entities,
+                        groups,
+                        percentiles,
+                        module.params['top'],
+                    ) if entities else {},
+                ),
+            ),
+        )
+    except Exception as e:
+        module.fail_json(msg=str(e), exception=traceback.format_exc())
+    finally:
+        if connection is not None:
+            connection.close(logout=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -26,17 +26,30 @@ try:
 except ImportError:
     pass
 
+import time
 import traceback
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.ovirt import (
     BaseModule,
     check_sdk,
-    create_connection,
     ovirt_full_argument_spec,
     search_by_name,
     wait,
 )
+from ansible.module_utils.ovirt_bulk import (
+    BulkResults,
+    ModuleSpec,
+    Slots,
+    create_concurrently,
+    merge_specs,
+    run_concurrently,
+    run_waves,
+    search_by_ids,
+    search_by_names,
+    wait_all,
+)
+from ansible.module_utils.ovirt_connection import create_connection
 
 
 DOCUMENTATION = '''
@@ -51,6 +64,7 @@ options:
     name:
         description:
             - "Name of the the storage domain to manage."
+            - "It's required, unless C(storage_domains) are specified."
     state:
         description:
             - "Should the storage domain be present/absent/maintenance/unattached"
@@ -65,6 +79,7 @@ options:
     data_center:
         description:
             - "Data center name where storage domain should be attached."
+            - "It's required, unless C(storage_domains) specify their data centers."
     domain_function:
         description:
             - "Function of the storage domain."
@@ -114,6 +129,27 @@ options:
         description:
             - "If I(True) storage domain will be removed after removing it from oVirt."
             - "This parameter is relevant only when C(state) is I(absent)."
+    storage_domains:
+        description:
+            - "List of storage domains to create, attach and activate in one task. Every storage domain is described
+               by dictionary of C(name), C(description), C(comment), C(data_center), C(domain_function), C(host),
+               C(nfs), C(iscsi), C(posixfs), C(glusterfs) and C(fcp) parameters of this module. Parameters of the
+               module, which aren't specified in the dictionary, are used as defaults."
+            - "Only C(state) I(present) is supported. Missing storage domains are created concurrently, and then
+               attached to their data centers and activated concurrently. Storage domains in transition, like
+               I(locked), I(activating) or I(preparing_for_maintenance), are waited for first. All storage domains
+               of one data center are polled by one request."
+    concurrency:
+        description:
+            - "Maximum number of pending requests, when C(storage_domains) are managed."
+        default: 10
+    max_per_data_center:
+        description:
+            - "Maximum number of storage domains attached or activated at a time in one data center, when
+               C(storage_domains) are managed. I(0) means no limit."
+            - "Storage domains of data centers which aren't up are attached one at a time, so the first data storage
+               domain becomes the master storage domain."
+        default: 0
 extends_documentation_fragment: ovirt
 '''
 
@@ -164,6 +200,27 @@ EXAMPLES = '''
     state: absent
     name: mystorage_domain
     format: true
+
+# Create, attach and activate NFS storage domains of data center dr, at most
+# 5 requests at a time:
+- ovirt_storage_domains:
+    host: myhost
+    data_center: dr
+    concurrency: 5
+    storage_domains:
+      - name: dr_data1
+        nfs:
+          address: 10.34.63.199
+          path: /path/data1
+      - name: dr_data2
+        nfs:
+          address: 10.34.63.199
+          path: /path/data2
+      - name: dr_iso
+        domain_function: iso
+        nfs:
+          address: 10.34.63.199
+          path: /path/iso
 '''
 
 RETURN = '''
@@ -176,6 +233,13 @@ storage domain:
     description: "Dictionary of all the storage domain attributes. Storage domain attributes can be found on your oVirt instance
                   at following url: https://ovirt.example.com/ovirt-engine/api/model#types/storage_domain."
     returned: On success if storage domain is found.
+storage_domains:
+    description: "List of dictionaries describing the storage domains of C(storage_domains) parameter. Every dictionary
+                  contains C(name), C(id), C(changed) flag, C(error) message if the storage domain failed, and C(timings)
+                  dictionary with number of seconds since the start of the task, when the storage domain was C(created),
+                  C(attached) and C(active)."
+    returned: When C(storage_domains) parameter is specified.
+    type: list
 '''
 
 
@@ -361,16 +425,207 @@ def control_state(sd_module):
         )
 
 
+def in_transition(sd):
+    # Storage domains in these states are waited for by control_state:
+    return sd is not None and sd.status in [
+        sdstate.LOCKED,
+        sdstate.ACTIVATING,
+        sdstate.DETACHING,
+        sdstate.PREPARING_FOR_MAINTENANCE,
+    ]
+
+
+BULK_PARAMETERS = [
+    'name', 'description', 'comment', 'data_center', 'domain_function', 'host',
+    'nfs', 'iscsi', 'posixfs', 'glusterfs', 'fcp',
+]
+
+
+def bulk_present(connection, module, storage_domains_service):
+    """
+    Create, attach and activate all storage domains of `storage_domains`
+    parameter. Storage domains in transition are waited for first, as by
+    `control_state`. Missing storage domains are created concurrently, and
+    then attached and activated concurrently, at most `concurrency` requests
+    are pending at a time. Storage domains attached to data centers are
+    polled by one request per data center per poll.
+    """
+    concurrency = module.params['concurrency']
+    specs = merge_specs(
+        module,
+        'storage_domains',
+        BULK_PARAMETERS,
+        required=('name', 'data_center'),
+        kind='storage domain',
+    )
+    names = [spec['name'] for spec in specs]
+    specs_by_name = dict((spec['name'], spec) for spec in specs)
+    results = BulkResults(names)
+
+    dcs_service = connection.system_service().data_centers_service()
+    dcs = search_by_names(dcs_service, [spec['data_center'] for spec in specs])
+    attached_services = dict(
+        (dc.id, dcs_service.data_center_service(dc.id).storage_domains_service())
+        for dc in dcs.values()
+    )
+    for spec in specs:
+        if spec['data_center'] not in dcs:
+            results.fail(spec['name'], "Data center '%s' was not found." % spec['data_center'])
+    dc_ids = dict(
+        (spec['name'], dcs[spec['data_center']].id)
+        for spec in specs if spec['data_center'] in dcs
+    )
+
+    def list_attached(ids):
+        # Storage domains in data centers, one request per data center:
+        ids = set(ids)
+        dc_list = sorted(set(
+            dc_id for name, dc_id in dc_ids.items() if results[name]['id'] in ids
+        ))
+        listings = run_concurrently(
+            [
+                lambda dc_id=dc_id: attached_services[dc_id].list(wait=False)
+                for dc_id in dc_list
+            ],
+            concurrency,
+        )
+        entities = []
+        for dc_id, (sds, error, _) in zip(dc_list, listings):
+            if error is not None:
+                raise error
+            entities.extend(sd for sd in sds if sd.id in ids)
+        return entities
+
+    def settle(list_entities, sds):
+        # Wait for the storage domains in transition by one request per poll,
+        # return `True` if any storage domain was waited for:
+        waiting = [sd.id for sd in sds if in_transition(sd)]
+        if not waiting or module.check_mode:
+            return False
+        _, errors = wait_all(
+            list_entities=list_entities,
+            ids=waiting,
+            condition=lambda sd: sd is None or not in_transition(sd),
+            fail_condition=lambda sd: failed_state(sd),
+            timeout=module.params['timeout'],
+            poll_interval=module.params['poll_interval'],
+        )
+        for sd in sds:
+            if sd.id in errors:
+                results.fail(sd.name, errors[sd.id])
+        return True
+
+    existing = search_by_names(storage_domains_service, names)
+    if settle(search_by_ids(storage_domains_service), existing.values()):
+        existing = search_by_names(storage_domains_service, names)
+    for name, sd in existing.items():
+        results[name]['id'] = sd.id
+        if failed_state(sd):
+            results.fail(name, "Not possible to manage storage domain '%s'." % name)
+
+    # Create missing storage domains:
+    create_concurrently(
+        module,
+        results,
+        [spec for spec in specs if spec['name'] not in existing and 'error' not in results[spec['name']]],
+        build=lambda spec: StorageDomainModule(
+            connection=connection,
+            module=ModuleSpec(module, spec),
+            service=storage_domains_service,
+        ).build_entity(),
+        add=lambda entity, spec: storage_domains_service.add(entity, wait=False),
+    )
+
+    # Attach and activate the storage domains, which aren't active:
+    managed = [name for name in names if 'error' not in results[name] and results[name]['id']]
+    attached = dict((sd.id, sd) for sd in list_attached([results[name]['id'] for name in managed]))
+    if settle(list_attached, [sd for sd in attached.values() if sd.name in managed]):
+        attached = dict((sd.id, sd) for sd in list_attached([results[name]['id'] for name in managed]))
+
+    steps = {}
+    names_by_id = {}
+    for name in managed:
+        sd_id = results[name]['id']
+        sd = attached.get(sd_id)
+        if 'error' in results[name]:
+            continue
+        if sd is not None and failed_state(sd):
+            results.fail(name, "Not possible to manage storage domain '%s'." % name)
+        elif sd is None:
+            steps[sd_id] = 'attach'
+        elif sd.status == sdstate.MAINTENANCE:
+            steps[sd_id] = 'activate'
+        if sd_id in steps:
+            names_by_id[sd_id] = name
+            results[name]['changed'] = True
+
+    def admit(sd_id, slots):
+        keys = [('data_center', dc_ids[names_by_id[sd_id]])]
+        if not slots.available(keys):
+            return None
+        attached_service = attached_services[keys[0][1]]
+        if steps[sd_id] == 'attach':
+            return keys, lambda: attached_service.add(otypes.StorageDomain(id=sd_id), wait=False)
+        return keys, lambda: attached_service.storage_domain_service(sd_id).activate(wait=False)
+
+    def progress(sd):
+        timings = results[names_by_id[sd.id]]['timings']
+        if steps[sd.id] == 'attach' and 'attached' not in timings:
+            timings['attached'] = results.elapsed(time.time())
+        # Storage domain which ends up in maintenance after attach is activated:
+        if steps[sd.id] == 'attach' and sd.status == sdstate.MAINTENANCE:
+            attached_services[dc_ids[names_by_id[sd.id]]].storage_domain_service(sd.id).activate()
+            steps[sd.id] = 'activate'
+
+    def condition(sd):
+        if sd is not None and sd.status == sdstate.ACTIVE:
+            results[names_by_id[sd.id]]['timings']['active'] = results.elapsed(time.time())
+            return True
+        return False
+
+    if not module.check_mode and steps:
+        _, _, errors = run_waves(
+            # Data storage domains are attached first, because the data center
+            # must have an active data storage domain to attach the others:
+            ids=sorted(
+                steps,
+                key=lambda sd_id: (specs_by_name[names_by_id[sd_id]]['domain_function'] != 'data', names_by_id[sd_id]),
+            ),
+            admit=admit,
+            list_entities=list_attached,
+            condition=condition,
+            fail_condition=lambda sd: sd is not None and failed_state(sd),
+            progress=progress,
+            limit=concurrency,
+            slots=Slots(
+                dict(
+                    data_center=dict(
+                        (
+                            dc.id,
+                            module.params['max_per_data_center'] if dc.status == otypes.DataCenterStatus.UP else 1,
+                        ) for dc in dcs.values()
+                    ),
+                ),
+            ),
+            timeout=module.params['timeout'],
+            poll_interval=module.params['poll_interval'],
+        )
+        for sd_id, error in errors.items():
+            results.fail(names_by_id[sd_id], error)
+
+    return results.report(module, 'storage_domains', 'manage', 'storage domains')
+
+
 def main():
     argument_spec = ovirt_full_argument_spec(
         state=dict(
             choices=['present', 'absent', 'maintenance', 'unattached'],
             default='present',
         ),
-        name=dict(required=True),
+        name=dict(default=None),
         description=dict(default=None),
         comment=dict(default=None),
-        data_center=dict(required=True),
+        data_center=dict(default=None),
         domain_function=dict(choices=['data', 'iso', 'export'], default='data', aliases=['type']),
         host=dict(default=None),
         nfs=dict(default=None, type='dict'),
@@ -380,16 +635,27 @@ def main():
         fcp=dict(default=None, type='dict'),
         destroy=dict(type='bool', default=False),
         format=dict(type='bool', default=False),
+        storage_domains=dict(default=None, type='list'),
+        concurrency=dict(default=10, type='int'),
+        max_per_data_center=dict(default=0, type='int'),
     )
     module = AnsibleModule(
         argument_spec=argument_spec,
         supports_check_mode=True,
     )
     check_sdk(module)
+    if module.params['storage_domains']:
+        if module.params['state'] != 'present':
+            module.fail_json(msg="Parameter storage_domains is supported only with state present.")
+    elif module.params['name'] is None or module.params['data_center'] is None:
+        module.fail_json(msg="Parameters name and data_center are required, unless storage_domains are specified.")
 
     try:
         connection = create_connection(module.params.pop('auth'))
         storage_domains_service = connection.system_service().storage_domains_service()
+        if module.params['storage_domains']:
+            module.exit_json(**bulk_present(connection, module, storage_domains_service))
+
         storage_domains_module = StorageDomainModule(
             connection=connection,
             module=module,
@@ -31,7 +31,6 @@ from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.ovirt import (
     BaseModule,
     check_sdk,
-    create_connection,
     equal,
     get_dict_of_struct,
     get_link_name,
@@ -39,6 +38,7 @@ from ansible.module_utils.ovirt import (
     search_by_attributes,
     search_by_name,
 )
+from ansible.module_utils.ovirt_connection import create_connection
 
 
 DOCUMENTATION = '''
@@ -31,9 +31,9 @@ from ansible.module_utils.ovirt import (
     BaseModule,
     check_sdk,
     check_params,
-    create_connection,
     ovirt_full_argument_spec,
 )
+from ansible.module_utils.ovirt_connection import create_connection
 
 
 DOCUMENTATION = '''
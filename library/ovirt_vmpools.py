@@ -31,12 +31,13 @@ from ansible.module_utils.ovirt import (
     BaseModule,
     check_params,
     check_sdk,
-    create_connection,
     equal,
     get_link_name,
     ovirt_full_argument_spec,
     wait,
 )
+from ansible.module_utils.ovirt_connection import create_connection
+from ansible.module_utils.ovirt_templates import TemplateIndex
 
 
 DOCUMENTATION = '''
@@ -89,6 +90,12 @@ options:
         description:
             - "Number of VMs in the pool."
             - "Default value is set by engine."
+    template_index_path:
+        description:
+            - "Path of the directory, where the index of names and version numbers of all templates is stored.
+               If specified, the latest version of the C(template) is resolved from the index, which is stored
+               per engine user, shared by subsequent tasks, and rebuilt when the engine logs an event related to a template."
+            - "For example I(~/.ansible/ovirt_template_index)."
 extends_documentation_fragment: ovirt
 '''
 
@@ -126,6 +133,19 @@ vm_pool:
 
 class VmPoolsModule(BaseModule):
 
+    def __init__(self, *args, **kwargs):
+        self._template_index = kwargs.pop('template_index', None)
+        super(VmPoolsModule, self).__init__(*args, **kwargs)
+
+    def __get_template(self):
+        if self._template_index is None:
+            return otypes.Template(name=self._module.params['template'])
+
+        template_id = self._template_index.template_id(self._module.params['template'])
+        if template_id is None:
+            raise Exception("Template '%s' was not found." % self._module.params['template'])
+        return otypes.Template(id=template_id)
+
     def build_entity(self):
         return otypes.VmPool(
             name=self._module.params['name'],
@@ -134,9 +154,7 @@ class VmPoolsModule(BaseModule):
             cluster=otypes.Cluster(
                 name=self._module.params['cluster']
             ) if self._module.params['cluster'] else None,
-            template=otypes.Template(
-                name=self._module.params['template']
-            ) if self._module.params['template'] else None,
+            template=self.__get_template() if self._module.params['template'] else None,
             max_user_vms=self._module.params['vm_per_user'],
             prestarted_vms=self._module.params['prestarted'],
             size=self._module.params['vm_count'],
@@ -171,6 +189,7 @@ def main():
         prestarted=dict(default=None, type='int'),
         vm_count=dict(default=None, type='int'),
         type=dict(default=None, choices=['automatic', 'manual']),
+        template_index_path=dict(default=None),
     )
     module = AnsibleModule(
         argument_spec=argument_spec,
@@ -180,12 +199,16 @@ def main():
     check_params(module)
 
     try:
-        connection = create_connection(module.params.pop('auth'))
+        auth = module.params.pop('auth')
+        connection = create_connection(auth)
         vm_pools_service = connection.system_service().vm_pools_service()
         vm_pools_module = VmPoolsModule(
             connection=connection,
             module=module,
             service=vm_pools_service,
+            template_index=TemplateIndex(
+                connection, auth, module.params['template_index_path'],
+            ) if module.params['template_index_path'] else None,
         )
 
         state = module.params['state']
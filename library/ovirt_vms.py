@@ -19,6 +19,8 @@
 # along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import time
+
 try:
     import ovirtsdk4 as sdk
     import ovirtsdk4.types as otypes
@@ -26,6 +28,25 @@ except ImportError:
     pass
 
 from ansible.module_utils.ovirt import *
+from ansible.module_utils.ovirt_bulk import (
+    BulkResults,
+    ModuleSpec,
+    Slots,
+    create_concurrently,
+    merge_specs,
+    run_concurrently,
+    run_waves,
+    search_by_ids,
+    search_by_names,
+    search_by_terms,
+    wait_all,
+)
+from ansible.module_utils.ovirt_connection import (
+    RequestCounter,
+    create_connection,
+)
+from ansible.module_utils.ovirt_names import EntityCache
+from ansible.module_utils.ovirt_templates import TemplateIndex
 
 
 DOCUMENTATION = '''
@@ -201,6 +222,58 @@ options:
             - "C(nic_gateway) - If boot protocol is static, set this gateway to network interface of Virtual Machine."
             - "C(nic_name) - Set name to network interface of Virtual Machine."
             - "C(nic_on_boot) - If I(True) network interface will be set to start on boot."
+    vms:
+        description:
+            - "List of Virtual Machines to provision in one task. Every Virtual Machine is described by dictionary
+               of the parameters of this module, for example C(name), C(template), C(memory), C(nics) or C(cloud_init).
+               Parameters of the module, which aren't specified in the dictionary, are used as defaults."
+            - "C(state) of every Virtual Machine can be I(present), I(running) or I(stopped). Missing Virtual Machines
+               are created, and if C(state) is I(present) or I(running), the created Virtual Machines and the existing
+               Virtual Machines, which are down, suspended or paused, are started. If C(state) is I(stopped), the existing
+               Virtual Machines, which aren't down, are shut down, or powered off if C(force) is I(true) or they are
+               suspended or paused. Existing Virtual Machines aren't updated."
+            - "Templates, vNIC profiles and disks are looked up once for all Virtual Machines, the Virtual Machines
+               are created and started concurrently, and their status is polled by one request for all of them."
+        version_added: "2.3"
+    concurrency:
+        description:
+            - "Maximum number of pending create, start or stop requests, when C(vms) are provisioned."
+            - "Also maximum number of pending requests attaching the missing C(disks) and C(nics) of the VM."
+        default: 10
+        version_added: "2.3"
+    template_index_path:
+        description:
+            - "Path of the directory, where the index of names and version numbers of all templates is stored.
+               If specified, the C(template) is resolved from the index, instead of listing all versions of
+               the template. The index is stored per engine user, shared by subsequent tasks, and rebuilt when the engine logs an event
+               related to a template, or when the template isn't found in the index."
+            - "For example I(~/.ansible/ovirt_template_index)."
+        version_added: "2.3"
+    start_priority:
+        description:
+            - "Priority of starting of the Virtual Machine, when C(vms) are provisioned. Virtual Machines with higher
+               priority are started first, Virtual Machines of the same priority are ordered by their high availability,
+               highly available Virtual Machines are started first, by their high availability priority."
+            - "Used only when C(start_per_host) or C(start_per_storage_domain) is specified."
+        version_added: "2.3"
+    start_per_host:
+        description:
+            - "Maximum number of Virtual Machines of C(vms), which are powering up on one host at a time.
+               Virtual Machines, which aren't pinned to a C(host), are started only on hosts of their cluster,
+               which have free capacity."
+            - "If this parameter or C(start_per_storage_domain) is specified, the Virtual Machines are started in waves,
+               at most C(concurrency) Virtual Machines are powering up at a time, and the next Virtual Machine is
+               started as soon as one is I(up). The module always waits for all Virtual Machines to be I(up)."
+            - "By default the number of Virtual Machines powering up on one host isn't limited."
+        default: 0
+        version_added: "2.3"
+    start_per_storage_domain:
+        description:
+            - "Maximum number of Virtual Machines of C(vms) with disks on the same storage domain, which are
+               powering up at a time."
+            - "By default the number of Virtual Machines powering up per storage domain isn't limited."
+        default: 0
+        version_added: "2.3"
 notes:
     - "If VM is in I(UNASSIGNED) or I(UNKNOWN) state before any operation, the module will fail.
        If VM is in I(IMAGE_LOCKED) state before any operation, we try to wait for VM to be I(DOWN).
@@ -345,6 +418,40 @@ ovirt_vms:
 ovirt_vms:
     state: absent
     name: myvm
+
+# Create and run VMs web1 and web2 from template rhel7, and VM db1 from template
+# rhel7_db in cluster mycluster, with at most 20 create or start requests pending:
+ovirt_vms:
+    cluster: mycluster
+    template: rhel7
+    memory: 2GiB
+    concurrency: 20
+    timeout: 1800
+    vms:
+      - name: web1
+      - name: web2
+      - name: db1
+        template: rhel7_db
+        memory: 8GiB
+        nics:
+          - name: nic1
+            profile_name: db_network
+
+# Start VMs after maintenance, at most 2 VMs powering up per host and 10 per
+# storage domain, database VMs first:
+- ovirt_vms:
+    state: running
+    concurrency: 50
+    start_per_host: 2
+    start_per_storage_domain: 10
+    timeout: 3600
+    vms:
+      - name: db1
+        start_priority: 10
+      - name: db2
+        start_priority: 10
+      - name: web1
+      - name: web2
 '''
 
 
@@ -358,28 +465,111 @@ vm:
     description: "Dictionary of all the VM attributes. VM attributes can be found on your oVirt instance
                   at following url: https://ovirt.example.com/ovirt-engine/api/model#types/vm."
     returned: On success if VM is found.
+vms:
+    description: "List of dictionaries describing the VMs provisioned by C(vms) parameter. Every dictionary contains
+                  C(name), C(id), C(changed), C(error) message if provisioning of the VM failed, and C(timings)
+                  dictionary with number of seconds since the start of the task, when the VM was C(created),
+                  C(down) after creation, C(started) and C(up), or C(stopped) and C(down) if they were stopped."
+    returned: When C(vms) parameter is specified.
+    type: list
+api_calls:
+    description: "Number of requests sent to the oVirt engine API by the task. Templates, disks and vNIC profiles
+                  referenced by the task, and names of the linked entities, are looked up only once per task."
+    returned: On success.
+    type: int
+    sample: 12
 '''
 
 
-class VmsModule(BaseModule):
+# States which can be used for VMs provisioned by `vms` parameter:
+BULK_STATES = ['present', 'running', 'stopped']
 
-    def __get_template_with_version(self):
+# Parameters which are common to all VMs provisioned by `vms` parameter,
+# and can't be specified per VM:
+BULK_COMMON_PARAMETERS = [
+    'auth', 'vms', 'concurrency', 'id', 'wait', 'timeout', 'poll_interval',
+    'fetch_nested', 'nested_attributes', 'template_index_path',
+    'start_per_host', 'start_per_storage_domain',
+]
+
+
+class VmLookups(object):
+    """
+    Lookups of the entities referenced by the parameters of VMs, shared by
+    all VMs managed by the module, so every entity is fetched only once.
+    """
+
+    def __init__(self, connection, template_index=None):
+        self._cache = EntityCache(connection)
+        self._template_index = template_index
+
+    def prefetch(self, specs, templates=True):
+        """
+        Look up templates, disks and vNIC profiles referenced by the VM
+        specifications, by one search query per entity type. Templates are
+        looked up only if `templates` is `True`.
+        """
+        if templates and self._template_index is None:
+            self._cache.prefetch('Template', [spec.get('template') for spec in specs])
+        self._cache.prefetch('Disk', [
+            disk.get('name')
+            for spec in specs
+            for disk in spec.get('disks') or [] if disk.get('id') is None
+        ])
+        self._cache.prefetch('VnicProfile', [
+            nic.get('profile_name')
+            for spec in specs
+            for nic in spec.get('nics') or []
+        ])
+
+    def template(self, name, version=None):
         """
         oVirt in version 4.1 doesn't support search by template+version_number,
         so we need to list all templates with specific name and then iterate
         throught it's version until we find the version we look for.
         """
+        if self._template_index is not None:
+            template_id = self._template_index.template_id(name, version)
+            return otypes.Template(id=template_id, name=name) if template_id else None
+
+        templates = self._cache.all('Template', name)
+        if version:
+            templates = [
+                t for t in templates
+                if t.version.version_number == version
+            ]
+        elif templates:
+            # Use the latest version of the template by default:
+            templates = [max(templates, key=lambda t: t.version.version_number if t.version else 0)]
+        return templates[0] if templates else None
+
+    def vnic_profile(self, name):
+        profile = self._cache.get('VnicProfile', name)
+        if profile is None:
+            raise Exception("vNIC profile '%s' was not found." % name)
+        return profile
+
+    def disk(self, name):
+        return self._cache.get('Disk', name)
+
+    def name(self, link):
+        return self._cache.name(link)
+
+
+class VmsModule(BaseModule):
+
+    def __init__(self, *args, **kwargs):
+        lookups = kwargs.pop('lookups', None)
+        super(VmsModule, self).__init__(*args, **kwargs)
+        self._lookups = lookups or VmLookups(self._connection)
+
+    def __get_template_with_version(self):
         template = None
         if self._module.params['template']:
-            templates_service = self._connection.system_service().templates_service()
-            templates = templates_service.list(search='name=%s' % self._module.params['template'])
-            if self._module.params['template_version']:
-                templates = [
-                    t for t in templates
-                    if t.version.version_number == self._module.params['template_version']
-                ]
-            if templates:
-                template = templates[0]
+            template = self._lookups.template(
+                self._module.params['template'],
+                self._module.params['template_version'],
+            )
 
         return template
 
@@ -431,7 +621,7 @@ class VmsModule(BaseModule):
 
     def update_check(self, entity):
         return (
-            equal(self._module.params.get('cluster'), get_link_name(self._connection, entity.cluster)) and
+            equal(self._module.params.get('cluster'), self._lookups.name(entity.cluster)) and
             equal(convert_to_bytes(self._module.params['memory']), entity.memory) and
             equal(convert_to_bytes(self._module.params['memory_guaranteed']), entity.memory_policy.guaranteed) and
             equal(self._module.params.get('cpu_cores'), entity.cpu.topology.cores) and
@@ -530,8 +720,7 @@ class VmsModule(BaseModule):
         if vm_host is not None:
             # In case VM is preparing to be UP, wait to be up, to migrate it:
             if entity.status == otypes.VmStatus.UP:
-                hosts_service = self._connection.system_service().hosts_service()
-                current_vm_host = hosts_service.host_service(entity.host.id).get().name
+                current_vm_host = self._lookups.name(entity.host)
                 if vm_host != current_vm_host:
                     if not self._module.check_mode:
                         vm_service.migrate(host=otypes.Host(name=vm_host))
@@ -548,65 +737,85 @@ class VmsModule(BaseModule):
             timeout=self._module.params['timeout'],
         )
 
+    def __add_concurrently(self, service, entities):
+        results = run_concurrently(
+            [lambda entity=entity: service.add(entity, wait=False) for entity in entities],
+            self._module.params['concurrency'],
+        )
+        for _, error, _ in results:
+            if error is not None:
+                raise error
+
     def __attach_disks(self, entity):
-        disks_service = self._connection.system_service().disks_service()
+        if not self._module.params['disks']:
+            return
 
+        # List attached disks once, and attach the missing disks concurrently:
+        disk_attachments_service = self._service.service(entity.id).disk_attachments_service()
+        attached = set(attachment.id for attachment in disk_attachments_service.list())
+        missing = []
         for disk in self._module.params['disks']:
             # If disk ID is not specified, find disk by name:
             disk_id = disk.get('id')
             if disk_id is None:
                 disk_id = getattr(
-                    search_by_name(
-                        service=disks_service,
-                        name=disk.get('name')
-                    ),
+                    self._lookups.disk(disk.get('name')),
                     'id',
                     None
                 )
+                if disk_id is None:
+                    raise Exception("Disk '%s' was not found." % disk.get('name'))
 
-            # Attach disk to VM:
-            disk_attachments_service = self._service.service(entity.id).disk_attachments_service()
-            if disk_attachments_service.attachment_service(disk_id).get() is None:
-                if not self._module.check_mode:
-                    disk_attachments_service.add(
-                        otypes.DiskAttachment(
-                            disk=otypes.Disk(
-                                id=disk_id,
-                            ),
-                            active=disk.get('activate', True),
-                            interface=otypes.DiskInterface(
-                                disk.get('interface', 'virtio')
-                            ),
-                            bootable=disk.get('bootable', False),
-                        )
+            if disk_id not in attached:
+                attached.add(disk_id)
+                missing.append(
+                    otypes.DiskAttachment(
+                        disk=otypes.Disk(
+                            id=disk_id,
+                        ),
+                        active=disk.get('activate', True),
+                        interface=otypes.DiskInterface(
+                            disk.get('interface', 'virtio')
+                        ),
+                        bootable=disk.get('bootable', False),
                     )
-                self.changed = True
+                )
+
+        if missing:
+            if not self._module.check_mode:
+                self.__add_concurrently(disk_attachments_service, missing)
+            self.changed = True
 
     def __attach_nics(self, entity):
-        # Attach NICs to VM, if specified:
-        vnic_profiles_service = self._connection.system_service().vnic_profiles_service()
+        if not self._module.params['nics']:
+            return
+
+        # Attach NICs to VM, if specified, NICs of the VM are listed once:
         nics_service = self._service.service(entity.id).nics_service()
+        existing = set(nic.name for nic in nics_service.list())
+        missing = []
         for nic in self._module.params['nics']:
-            if search_by_name(nics_service, nic.get('name')) is None:
-                if not self._module.check_mode:
-                    nics_service.add(
-                        otypes.Nic(
-                            name=nic.get('name'),
-                            interface=otypes.NicInterface(
-                                nic.get('interface', 'virtio')
-                            ),
-                            vnic_profile=otypes.VnicProfile(
-                                id=search_by_name(
-                                    vnic_profiles_service,
-                                    nic.get('profile_name'),
-                                ).id
-                            ) if nic.get('profile_name') else None,
-                            mac=otypes.Mac(
-                                address=nic.get('mac_address')
-                            ) if nic.get('mac_address') else None,
-                        )
+            if nic.get('name') not in existing:
+                existing.add(nic.get('name'))
+                missing.append(
+                    otypes.Nic(
+                        name=nic.get('name'),
+                        interface=otypes.NicInterface(
+                            nic.get('interface', 'virtio')
+                        ),
+                        vnic_profile=otypes.VnicProfile(
+                            id=self._lookups.vnic_profile(nic.get('profile_name')).id,
+                        ) if nic.get('profile_name') else None,
+                        mac=otypes.Mac(
+                            address=nic.get('mac_address')
+                        ) if nic.get('mac_address') else None,
                     )
-                self.changed = True
+                )
+
+        if missing:
+            if not self._module.check_mode:
+                self.__add_concurrently(nics_service, missing)
+            self.changed = True
 
 
 def _get_initialization(sysprep, cloud_init):
@@ -646,6 +855,401 @@ def _get_initialization(sysprep, cloud_init):
     return  initialization
 
 
+def _bulk_specs(module):
+    """
+    Merge specifications of the VMs with the parameters of the module.
+    """
+    specs = merge_specs(
+        module,
+        'vms',
+        allowed=set(module.argument_spec) - set(BULK_COMMON_PARAMETERS),
+        kind='VM',
+    )
+    for params in specs:
+        if params['state'] not in BULK_STATES:
+            module.fail_json(
+                msg="State of VM '%s' must be one of %s." % (params['name'], ', '.join(BULK_STATES))
+            )
+        if params.get('cd_iso') is not None:
+            module.fail_json(msg="Parameter cd_iso isn't supported with vms parameter.")
+
+    return specs
+
+
+def _start_vm(vms_service, vm_id, spec, hosts=None):
+    """
+    Send start request of the VM and return its future. The VM is started
+    on the host of its `host` parameter, or on one of `hosts` if specified.
+    """
+    if spec['host']:
+        hosts = [otypes.Host(name=spec['host'])]
+    return vms_service.vm_service(vm_id).start(
+        use_cloud_init=spec['cloud_init'] is not None,
+        use_sysprep=spec['sysprep'] is not None,
+        vm=otypes.Vm(
+            placement_policy=otypes.VmPlacementPolicy(
+                hosts=hosts,
+            ) if hosts else None,
+            initialization=_get_initialization(spec['sysprep'], spec['cloud_init']),
+        ),
+        wait=False,
+    )
+
+
+def _start_order(spec, entity):
+    """
+    Key of the order in which VMs are started, VMs with higher `start_priority`
+    first, then highly available VMs by their high availability priority.
+    """
+    ha = entity.high_availability if entity is not None else None
+    highly_available = bool(ha is not None and ha.enabled) or bool(spec['high_availability'])
+    return (
+        -(spec['start_priority'] or 0),
+        not highly_available,
+        -((ha.priority or 0) if highly_available and ha is not None else 0),
+    )
+
+
+def _storage_domains(connection, vms_service, vm_ids, limit):
+    """
+    Return dictionary of IDs of storage domains of the disks of the VMs,
+    keyed by VM ID. Disk attachments of the VMs are listed concurrently,
+    and the disks are searched by one query.
+    """
+    attachments = run_concurrently(
+        [
+            lambda vm_id=vm_id: vms_service.vm_service(vm_id).disk_attachments_service().list(wait=False)
+            for vm_id in vm_ids
+        ],
+        limit,
+    )
+    disk_ids = dict(
+        (vm_id, [a.disk.id for a in result or [] if a.disk is not None])
+        for vm_id, (result, _, _) in zip(vm_ids, attachments)
+    )
+    disks = dict(
+        (disk.id, disk) for disk in search_by_terms(
+            connection.system_service().disks_service(),
+            'id',
+            [disk_id for ids in disk_ids.values() for disk_id in ids],
+        )
+    )
+    return dict(
+        (
+            vm_id,
+            sorted(set(
+                sd.id
+                for disk_id in ids if disk_id in disks
+                for sd in disks[disk_id].storage_domains or []
+            )),
+        ) for vm_id, ids in disk_ids.items()
+    )
+
+
+def _start_failed():
+    """
+    Return fail condition of the started VMs. VM failed if it's not found,
+    if it's in state which isn't part of the start, or if it's back in its
+    state before the start after it was seen starting.
+    """
+    seen_starting = set()
+
+    def fail_condition(vm):
+        if vm is None:
+            return True
+        if vm.status in [
+            otypes.VmStatus.WAIT_FOR_LAUNCH,
+            otypes.VmStatus.POWERING_UP,
+            otypes.VmStatus.RESTORING_STATE,
+            otypes.VmStatus.REBOOT_IN_PROGRESS,
+        ]:
+            seen_starting.add(vm.id)
+            return False
+        if vm.status in [
+            otypes.VmStatus.DOWN,
+            otypes.VmStatus.SUSPENDED,
+            otypes.VmStatus.PAUSED,
+        ]:
+            # The engine may not process the start request yet:
+            return vm.id in seen_starting
+        return vm.status != otypes.VmStatus.UP
+
+    return fail_condition
+
+
+def _schedule_starts(connection, module, vms_service, specs, entities):
+    """
+    Start the VMs in waves, so at most `start_per_host` VMs are powering up
+    on every host, and at most `start_per_storage_domain` VMs which have disks
+    on the same storage domain are powering up at a time. The next VM is
+    started as soon as one of the VMs is up.
+
+    :param specs: dictionary of specifications of the VMs keyed by VM ID
+    :param entities: dictionary of the VMs keyed by VM ID
+    :return: tuple of dictionaries of seconds since the call, when the VMs
+             were started and up, and dictionary of error messages, all keyed
+             by VM ID
+    """
+    limit = module.params['concurrency']
+    hosts = [
+        host for host in connection.system_service().hosts_service().list()
+        if host.status == otypes.HostStatus.UP
+    ]
+    host_ids = dict((host.name, host.id) for host in hosts)
+    cluster_hosts = {}
+    for host in hosts:
+        cluster_hosts.setdefault(host.cluster.id, []).append(host.id)
+    storage_domains = _storage_domains(
+        connection, vms_service, list(specs), limit,
+    ) if module.params['start_per_storage_domain'] else {}
+
+    def admit(vm_id, slots):
+        spec = specs[vm_id]
+        entity = entities.get(vm_id)
+        cluster_id = entity.cluster.id if entity is not None and entity.cluster else None
+        keys = [('storage_domain', sd) for sd in storage_domains.get(vm_id, [])]
+        candidates = None
+        if spec['host']:
+            keys.append(('host', host_ids.get(spec['host'], spec['host'])))
+        elif cluster_id in cluster_hosts:
+            # The host is chosen by the engine, so the VM reserves capacity of
+            # its cluster, and is scheduled only to the hosts which aren't full:
+            keys.append(('cluster', cluster_id))
+            cluster = cluster_hosts[cluster_id]
+            candidates = [host_id for host_id in cluster if not slots.full(('host', host_id))]
+            if not candidates:
+                return None
+            if len(candidates) == len(cluster):
+                candidates = None
+
+        if not slots.available(keys):
+            return None
+        return keys, lambda: _start_vm(
+            vms_service,
+            vm_id,
+            spec,
+            [otypes.Host(id=host_id) for host_id in candidates] if candidates else None,
+        )
+
+    return run_waves(
+        ids=sorted(specs, key=lambda vm_id: _start_order(specs[vm_id], entities.get(vm_id))),
+        admit=admit,
+        list_entities=search_by_ids(vms_service),
+        condition=lambda vm: vm is not None and vm.status == otypes.VmStatus.UP,
+        fail_condition=_start_failed(),
+        observed_keys=lambda vm: [('host', vm.host.id)] if vm.host is not None else [],
+        limit=limit,
+        slots=Slots(
+            dict(
+                host=module.params['start_per_host'],
+                cluster=dict(
+                    (cluster_id, module.params['start_per_host'] * len(host_ids))
+                    for cluster_id, host_ids in cluster_hosts.items()
+                ),
+                storage_domain=module.params['start_per_storage_domain'],
+            )
+        ),
+        timeout=module.params['timeout'],
+        poll_interval=module.params['poll_interval'],
+    )
+
+
+def bulk_provision(connection, module, vms_service, lookups):
+    """
+    Provision all VMs of `vms` parameter. Missing VMs are created concurrently,
+    and VMs which should run are started concurrently, at most `concurrency`
+    requests are pending at a time. Status of all VMs is polled by one search
+    query per poll.
+    """
+    specs = _bulk_specs(module)
+    limit = module.params['concurrency']
+    lookups.prefetch(specs)
+    existing = search_by_names(vms_service, [spec['name'] for spec in specs])
+    entities = dict(existing)
+    modules = dict(
+        (
+            spec['name'],
+            VmsModule(
+                connection=connection,
+                module=ModuleSpec(module, spec),
+                service=vms_service,
+                lookups=lookups,
+            ),
+        ) for spec in specs
+    )
+    results = BulkResults([spec['name'] for spec in specs], existing)
+    elapsed = results.elapsed
+    fail = results.fail
+
+    def build(spec):
+        vms_module = modules[spec['name']]
+        # Sets template to Blank, if not specified:
+        vms_module.pre_create(None)
+        return vms_module.build_entity()
+
+    # Create the missing VMs:
+    creating = [spec for spec in specs if spec['name'] not in existing]
+    created = create_concurrently(
+        module,
+        results,
+        creating,
+        build=build,
+        add=lambda entity, spec: vms_service.add(
+            entity,
+            clone=spec['clone'],
+            clone_permissions=spec['clone_permissions'],
+            wait=False,
+        ),
+    )
+    entities.update(created)
+    for name, entity in created.items():
+        try:
+            # Attach disks and NICs:
+            modules[name].post_create(entity)
+        except Exception as e:
+            fail(name, e)
+    for spec in creating:
+        results[spec['name']]['changed'] = 'error' not in results[spec['name']]
+
+    # Start the VMs which should run, the created VMs must be down first:
+    running = [
+        spec for spec in specs
+        if spec['state'] != 'stopped' and 'error' not in results[spec['name']] and (
+            spec['name'] not in existing or existing[spec['name']].status in [
+                otypes.VmStatus.DOWN,
+                otypes.VmStatus.SUSPENDED,
+                otypes.VmStatus.PAUSED,
+            ]
+        )
+    ]
+    created_ids = [
+        results[spec['name']]['id'] for spec in creating
+        if 'error' not in results[spec['name']] and results[spec['name']]['id']
+    ]
+    if not module.check_mode and created_ids and (module.params['wait'] or running):
+        phase = time.time()
+        down, errors = wait_all(
+            list_entities=search_by_ids(vms_service),
+            ids=created_ids,
+            condition=lambda vm: vm is not None and vm.status == otypes.VmStatus.DOWN,
+            fail_condition=lambda vm: vm is None,
+            timeout=module.params['timeout'],
+            poll_interval=module.params['poll_interval'],
+        )
+        for result in results.values():
+            if result['id'] in down:
+                result['timings']['down'] = elapsed(phase + down[result['id']])
+            elif result['id'] in errors:
+                fail(result['name'], errors[result['id']])
+
+    running = [spec for spec in running if 'error' not in results[spec['name']]]
+    if not module.check_mode and (module.params['start_per_host'] or module.params['start_per_storage_domain']):
+        phase = time.time()
+        sent, up, errors = _schedule_starts(
+            connection,
+            module,
+            vms_service,
+            dict((results[spec['name']]['id'], spec) for spec in running),
+            dict(
+                (results[spec['name']]['id'], entities.get(spec['name']))
+                for spec in running
+            ),
+        )
+        for result in results.values():
+            if result['id'] in sent:
+                result['timings']['started'] = elapsed(phase + sent[result['id']])
+            if result['id'] in up:
+                result['timings']['up'] = elapsed(phase + up[result['id']])
+            elif result['id'] in errors:
+                fail(result['name'], errors[result['id']])
+    elif not module.check_mode:
+        calls = [
+            (
+                spec,
+                lambda spec=spec: _start_vm(vms_service, results[spec['name']]['id'], spec),
+            ) for spec in running
+        ]
+        for (spec, _), (_, error, timestamp) in zip(calls, run_concurrently([call for _, call in calls], limit)):
+            if error is not None:
+                fail(spec['name'], error)
+            else:
+                results[spec['name']]['timings']['started'] = elapsed(timestamp)
+
+        started_ids = [
+            results[spec['name']]['id'] for spec in running
+            if 'error' not in results[spec['name']]
+        ]
+        if started_ids and module.params['wait']:
+            phase = time.time()
+            up, errors = wait_all(
+                list_entities=search_by_ids(vms_service),
+                ids=started_ids,
+                condition=lambda vm: vm is not None and vm.status == otypes.VmStatus.UP,
+                fail_condition=_start_failed(),
+                timeout=module.params['timeout'],
+                poll_interval=module.params['poll_interval'],
+            )
+            for result in results.values():
+                if result['id'] in up:
+                    result['timings']['up'] = elapsed(phase + up[result['id']])
+                elif result['id'] in errors:
+                    fail(result['name'], errors[result['id']])
+    for spec in running:
+        if 'error' not in results[spec['name']]:
+            results[spec['name']]['changed'] = True
+
+    # Stop the existing VMs which should be stopped, running VMs are shut down
+    # unless `force` is specified, suspended and paused VMs are powered off:
+    stopping = [
+        spec for spec in specs
+        if spec['state'] == 'stopped' and 'error' not in results[spec['name']] and
+        spec['name'] in existing and existing[spec['name']].status != otypes.VmStatus.DOWN
+    ]
+    for spec in stopping:
+        results[spec['name']]['changed'] = True
+    if not module.check_mode and stopping:
+        calls = [
+            (
+                spec,
+                lambda spec=spec: getattr(
+                    vms_service.vm_service(results[spec['name']]['id']),
+                    'stop' if spec['force'] or existing[spec['name']].status in [
+                        otypes.VmStatus.SUSPENDED,
+                        otypes.VmStatus.PAUSED,
+                    ] else 'shutdown',
+                )(wait=False),
+            ) for spec in stopping
+        ]
+        for (spec, _), (_, error, timestamp) in zip(calls, run_concurrently([call for _, call in calls], limit)):
+            if error is not None:
+                results[spec['name']]['changed'] = False
+                fail(spec['name'], error)
+            else:
+                results[spec['name']]['timings']['stopped'] = elapsed(timestamp)
+
+        stopped_ids = [
+            results[spec['name']]['id'] for spec in stopping
+            if 'error' not in results[spec['name']]
+        ]
+        if stopped_ids and module.params['wait']:
+            phase = time.time()
+            down, errors = wait_all(
+                list_entities=search_by_ids(vms_service),
+                ids=stopped_ids,
+                condition=lambda vm: vm is not None and vm.status == otypes.VmStatus.DOWN,
+                fail_condition=lambda vm: vm is None,
+                timeout=module.params['timeout'],
+                poll_interval=module.params['poll_interval'],
+            )
+            for result in results.values():
+                if result['id'] in down:
+                    result['timings']['down'] = elapsed(phase + down[result['id']])
+                elif result['id'] in errors:
+                    fail(result['name'], errors[result['id']])
+
+    return results.report(module, 'vms', 'provision', 'VMs')
+
+
 def control_state(vm, vms_service, module):
     if vm is None:
         return
@@ -734,24 +1338,48 @@ def main():
         host=dict(default=None),
         clone=dict(type='bool', default=False),
         clone_permissions=dict(type='bool', default=False),
+        vms=dict(default=None, type='list'),
+        concurrency=dict(default=10, type='int'),
+        template_index_path=dict(default=None),
+        start_priority=dict(default=None, type='int'),
+        start_per_host=dict(default=0, type='int'),
+        start_per_storage_domain=dict(default=0, type='int'),
     )
     module = AnsibleModule(
         argument_spec=argument_spec,
         supports_check_mode=True,
     )
     check_sdk(module)
-    check_params(module)
+    if not module.params['vms']:
+        check_params(module)
 
     try:
         state = module.params['state']
-        connection = create_connection(module.params.pop('auth'))
+        auth = module.params.pop('auth')
+        connection = create_connection(auth)
+        requests = RequestCounter(connection)
         vms_service = connection.system_service().vms_service()
+        lookups = VmLookups(
+            connection,
+            template_index=TemplateIndex(
+                connection, auth, module.params['template_index_path'],
+            ) if module.params['template_index_path'] else None,
+        )
+        if module.params['vms']:
+            ret = bulk_provision(connection, module, vms_service, lookups)
+            module.exit_json(api_calls=requests.count, **ret)
+
         vms_module = VmsModule(
             connection=connection,
             module=module,
             service=vms_service,
+            lookups=lookups,
         )
         vm = vms_module.search_entity()
+        # Removed VM doesn't need any lookups, and the template is needed
+        # mostly to create the missing VM:
+        if state != 'absent':
+            lookups.prefetch([module.params], templates=vm is None)
 
         control_state(vm, vms_service, module)
         if state == 'present' or state == 'running' or state == 'next_run':
@@ -837,7 +1465,7 @@ def main():
         elif state == 'absent':
             ret = vms_module.remove()
 
-        module.exit_json(**ret)
+        module.exit_json(api_calls=requests.count, **ret)
     except Exception as e:
         module.fail_json(msg=str(e))
     finally:
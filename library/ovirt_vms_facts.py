@@ -24,9 +24,17 @@ import traceback
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.ovirt import (
     check_sdk,
-    create_connection,
-    get_dict_of_struct,
-    ovirt_full_argument_spec,
+)
+from ansible.module_utils.ovirt_connection import create_connection
+from ansible.module_utils.ovirt_export import export_facts
+from ansible.module_utils.ovirt_facts import (
+    DeltaTracker,
+    FactsCache,
+    get_dict_of_entity,
+    list_pages,
+    list_params,
+    ovirt_facts_argument_spec,
+    write_json_lines,
 )
 
 
@@ -47,6 +55,76 @@ options:
         - "Search term which is accepted by oVirt search backend."
         - "For example to search VM X from cluster Y use following pattern:
            name=X and cluster=Y"
+    page_size:
+      description:
+        - "Number of VMs fetched from the engine by a single request. If set, VMs are fetched
+           and processed page by page, so only a single page of VMs is held in memory."
+        - "Pages are sorted by VM name, unless C(pattern) contains its own I(sortby) clause."
+        - "By default all VMs are fetched by a single request."
+      default: 0
+    output_path:
+      description:
+        - "Path of the file where the VMs are written in JSON Lines format, one VM per line,
+           instead of returning them in the C(ovirt_vms) fact."
+        - "The VMs are written as they are fetched, so it's useful together with C(page_size)
+           for large number of VMs."
+        - "Facts are never cached, when this parameter is used."
+    fetch_nested:
+      description:
+        - "If I(true) the links of the returned entities are followed, and the attributes specified
+           in C(nested_attributes) of the linked entities are returned. Every link is followed by
+           a separate request, consider using C(follow) instead."
+      default: true
+    nested_attributes:
+      description:
+        - "List of the attributes of the linked entities, which are returned if C(fetch_nested) is I(true)."
+      default: ["name", "description"]
+    fields:
+      description:
+        - "List of the attributes of the entities, which should be returned. By default all attributes are returned."
+        - "Links of the attributes which aren't listed are never followed, even if C(fetch_nested) is I(true)."
+    follow:
+      description:
+        - "List of the links which the engine should follow, returning the linked entities inlined
+           in the same response, for example I(nics) or I(disk_attachments.disk)."
+        - "This parameter requires oVirt engine and Python SDK 4.2 or higher."
+    delta:
+      description:
+        - "If I(true) the module returns only VMs which were added, changed or removed since
+           the previous run of the module by the same user with the same search parameters, in the C(ovirt_vms_delta) fact."
+        - "The module stores locally a snapshot of the VMs and the index of the last processed engine event,
+           so it fetches only VMs referenced by newer events. The first run returns all VMs as added."
+      default: false
+    delta_path:
+      description:
+        - "Directory where the snapshots of the VMs are stored, if C(delta) is I(true)."
+      default: "~/.ansible/ovirt_facts_delta"
+    cache_ttl:
+      description:
+        - "Number of seconds the gathered facts are cached locally. Subsequent tasks gathering
+           the same facts get them from the cache, without querying the engine. Facts are cached
+           per engine URL, user, module and search parameters."
+        - "By default the facts aren't cached."
+      default: 0
+    cache_path:
+      description:
+        - "Directory where the cached facts are stored."
+      default: "~/.ansible/ovirt_facts_cache"
+    cache_invalidate:
+      description:
+        - "If I(true) all cached facts of this module for the engine are removed, before the facts are gathered."
+      default: false
+    export_path:
+      description:
+        - "Path of the file, where the facts are exported in compact columnar format, instead of returning them.
+           Strings repeated across the entities, like names of clusters, are stored only once.
+           Only the summary of the export is returned as C(ovirt_vms_export) fact."
+        - "Exported facts can be loaded by C(ovirt_export_load) filter."
+    export_format:
+      description:
+        - "Format of the file specified by C(export_path), I(msgpack) requires msgpack Python module."
+      choices: ['json', 'msgpack']
+      default: json
 extends_documentation_fragment: ovirt
 '''
 
@@ -60,45 +138,166 @@ EXAMPLES = '''
     pattern: name=centos* and cluster=west
 - debug:
     var: ovirt_vms
+
+# Gather facts about all VMs of cluster C(west) and cache them for 10 minutes,
+# so other tasks gathering the same facts don't query the engine again:
+- ovirt_vms_facts:
+    pattern: cluster=west
+    cache_ttl: 600
+
+# Drop cached facts about VMs, after the VMs were changed, and gather fresh facts:
+- ovirt_vms_facts:
+    pattern: cluster=west
+    cache_ttl: 600
+    cache_invalidate: true
+
+# Write all VMs to a JSON Lines file, fetching 500 VMs per request:
+- ovirt_vms_facts:
+    page_size: 500
+    output_path: /tmp/ovirt_vms.jsonl
+
+# Gather facts only about VMs of cluster C(west), which were added, changed
+# or removed since the previous run of this task:
+- ovirt_vms_facts:
+    pattern: cluster=west
+    delta: true
+- debug:
+    var: ovirt_vms_delta
+
+# Gather only name, host, cluster and IP addresses of all VMs of cluster C(west),
+# with the host, cluster and reported devices inlined by the engine in the same response:
+- ovirt_vms_facts:
+    pattern: cluster=west
+    fields:
+      - name
+      - host
+      - cluster
+      - reported_devices
+    fetch_nested: false
+    follow:
+      - host
+      - cluster
+      - reported_devices
+
+# Export all VMs into compact file, and load them later only where needed:
+- ovirt_vms_facts:
+    fetch_nested: false
+    export_path: /tmp/ovirt_vms.json
+- debug:
+    msg: "{{ item.name }}"
+  with_items: "{{ (ovirt_vms_export.path | ovirt_export_load).ovirt_vms }}"
 '''
 
 RETURN = '''
 ovirt_vms:
     description: "List of dictionaries describing the VMs. VM attribues are mapped to dictionary keys,
                   all VMs attributes can be found at following url: https://ovirt.example.com/ovirt-engine/api/model#types/vm."
-    returned: On success.
+    returned: On success, if C(output_path) isn't specified.
     type: list
+output_path:
+    description: Path of the JSON Lines file with the VMs.
+    returned: On success, if C(output_path) is specified.
+    type: str
+    sample: /tmp/ovirt_vms.jsonl
+count:
+    description: Number of the VMs written to the C(output_path) file.
+    returned: On success, if C(output_path) is specified.
+    type: int
+    sample: 8000
+ovirt_vms_delta:
+    description: "Dictionary with lists of the VMs which were I(added), I(changed) or I(removed) since the previous run.
+                  Every VM is described by the same dictionary as in the C(ovirt_vms) fact."
+    returned: On success, if C(delta) is I(true).
+    type: dict
+ovirt_vms_export:
+    description: "Summary of the export, if C(export_path) is specified. Contains C(path), C(format), C(size) of the file
+                  and C(counts) of the exported entities."
+    returned: When C(export_path) is specified.
+    type: dict
 '''
 
 
+def _vms(connection, module):
+    """
+    Generator of dictionaries describing the VMs, fetched page by page if paging is enabled.
+    """
+    vms_service = connection.system_service().vms_service()
+    for vm in list_pages(
+        vms_service,
+        search=module.params['pattern'],
+        page_size=module.params['page_size'],
+        **list_params(module)
+    ):
+        yield get_dict_of_entity(connection, module, vm)
+
+
 def main():
-    argument_spec = ovirt_full_argument_spec(
+    argument_spec = ovirt_facts_argument_spec(
         pattern=dict(default='', required=False),
+        page_size=dict(default=0, type='int'),
+        output_path=dict(default=None),
+        fetch_nested=dict(default=True, type='bool'),
+        nested_attributes=dict(default=['name', 'description'], type='list'),
+        delta=dict(default=False, type='bool'),
+        delta_path=dict(default=None),
+    )
+    module = AnsibleModule(
+        argument_spec,
+        mutually_exclusive=[
+            ['delta', 'output_path'],
+            ['delta', 'export_path'],
+            ['output_path', 'export_path'],
+        ],
     )
-    module = AnsibleModule(argument_spec)
     check_sdk(module)
 
+    connection = None
     try:
-        connection = create_connection(module.params.pop('auth'))
-        vms_service = connection.system_service().vms_service()
-        vms = vms_service.list(search=module.params['pattern'])
+        auth = module.params.pop('auth')
+        output_path = module.params['output_path']
+        if output_path:
+            connection = create_connection(auth)
+            count = write_json_lines(output_path, _vms(connection, module))
+            module.exit_json(
+                changed=False,
+                output_path=output_path,
+                count=count,
+            )
+
+        if module.params['delta']:
+            connection = create_connection(auth)
+            delta_tracker = DeltaTracker(module, auth, 'ovirt_vms_facts')
+            module.exit_json(
+                changed=False,
+                ansible_facts=dict(
+                    ovirt_vms_delta=delta_tracker.delta(
+                        connection=connection,
+                        service=connection.system_service().vms_service(),
+                        event_attribute='vm',
+                        convert=lambda vm: get_dict_of_entity(connection, module, vm),
+                        search=module.params['pattern'],
+                        page_size=module.params['page_size'],
+                        **list_params(module)
+                    ),
+                ),
+            )
+
+        facts_cache = FactsCache(module, auth, 'ovirt_vms_facts')
+        ovirt_vms = facts_cache.get()
+        if ovirt_vms is None:
+            connection = create_connection(auth)
+            ovirt_vms = list(_vms(connection, module))
+            facts_cache.put(ovirt_vms)
+
         module.exit_json(
             changed=False,
-            ansible_facts=dict(
-                ovirt_vms=[
-                    get_dict_of_struct(
-                        struct=c,
-                        connection=connection,
-                        fetch_nested=1,
-                        attributes=['name', 'description'],
-                    ) for c in vms
-                ],
-            ),
+            ansible_facts=export_facts(module, 'ovirt_vms', ovirt_vms),
         )
     except Exception as e:
         module.fail_json(msg=str(e), exception=traceback.format_exc())
     finally:
-        connection.close(logout=False)
+        if connection is not None:
+            connection.close(logout=False)
 
 
 if __name__ == '__main__':
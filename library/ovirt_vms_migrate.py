@@ -0,0 +1,314 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016 Red Hat, Inc.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+try:
+    import ovirtsdk4.types as otypes
+except ImportError:
+    pass
+
+import traceback
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.ovirt import (
+    check_sdk,
+    ovirt_full_argument_spec,
+)
+from ansible.module_utils.ovirt_bulk import (
+    Slots,
+    run_waves,
+    search_by_ids,
+    search_by_names,
+)
+from ansible.module_utils.ovirt_connection import create_connection
+
+
+DOCUMENTATION = '''
+---
+module: ovirt_vms_migrate
+short_description: Module to migrate many Virtual Machines concurrently in oVirt
+version_added: "2.3"
+author: "Ondra Machacek (@machacekondra)"
+description:
+    - "Module to evacuate a host, or to migrate a list of Virtual Machines in oVirt. Migrations run concurrently,
+       limited per source and per destination host, and all migrating Virtual Machines are polled by one request."
+options:
+    source_host:
+        description:
+            - "Name of the host to evacuate. All Virtual Machines running on the host are migrated."
+            - "One of C(source_host) or C(vms) is required."
+    vms:
+        description:
+            - "List of names of the Virtual Machines to migrate."
+    destination_hosts:
+        description:
+            - "List of names of the hosts, where the Virtual Machines should be migrated."
+            - "By default the Virtual Machines are migrated to the other hosts of their cluster, which are up."
+            - "Every Virtual Machine is migrated to the destination host with the least number of migrations in
+               progress, and then with the most memory available for scheduling."
+    max_per_source:
+        description:
+            - "Maximum number of migrations in progress from one host."
+        default: 2
+    max_per_destination:
+        description:
+            - "Maximum number of migrations in progress to one host."
+        default: 2
+    bandwidth_per_migration:
+        description:
+            - "Bandwidth in Mbps required by one migration. If the cluster of the source host has custom migration
+               bandwidth, the number of migrations in progress from one host is limited also by the cluster bandwidth
+               divided by this bandwidth."
+    force:
+        description:
+            - "If I(true) Virtual Machines pinned to their host are migrated too."
+        default: false
+extends_documentation_fragment: ovirt
+'''
+
+EXAMPLES = '''
+# Examples don't contain auth parameter for simplicity,
+# look at ovirt_auth module to see how to reuse authentication:
+
+# Evacuate host myhost, at most 4 migrations from the host at a time:
+- ovirt_vms_migrate:
+    source_host: myhost
+    max_per_source: 4
+    timeout: 3600
+
+# Migrate VMs web1 and web2 to hosts host2 or host3:
+- ovirt_vms_migrate:
+    vms:
+      - web1
+      - web2
+    destination_hosts:
+      - host2
+      - host3
+'''
+
+RETURN = '''
+vms:
+    description: "List of dictionaries describing the migrated Virtual Machines. Every dictionary contains C(name), C(id),
+                  C(source) and C(destination) host name, C(duration) of the migration in seconds, and C(error) message
+                  if the migration failed."
+    returned: On success.
+    type: list
+'''
+
+
+def _destinations(clusters_hosts, module, vm):
+    destination_hosts = module.params['destination_hosts']
+    return [
+        host for host in clusters_hosts.get(vm.cluster.id, [])
+        if host.id != vm.host.id and (
+            destination_hosts is None or host.name in destination_hosts
+        )
+    ]
+
+
+def _source_limits(clusters, hosts, module):
+    """
+    Return limits of the migrations in progress per source host, keyed by
+    host ID, the limit is lowered by the migration bandwidth of the cluster.
+    """
+    limits = {}
+    for host in hosts:
+        limit = module.params['max_per_source']
+        cluster = clusters.get(host.cluster.id)
+        bandwidth = cluster.migration.bandwidth if cluster is not None and cluster.migration else None
+        if (
+            module.params['bandwidth_per_migration'] and
+            bandwidth is not None and
+            bandwidth.assignment_method == otypes.MigrationBandwidthAssignmentMethod.CUSTOM and
+            bandwidth.custom_value
+        ):
+            limit = min(limit, max(1, bandwidth.custom_value // module.params['bandwidth_per_migration']))
+        limits[host.id] = limit
+    return limits
+
+
+def migrate(connection, module):
+    system_service = connection.system_service()
+    vms_service = system_service.vms_service()
+    hosts = system_service.hosts_service().list()
+    hosts_by_id = dict((host.id, host) for host in hosts)
+    up_hosts = [host for host in hosts if host.status == otypes.HostStatus.UP]
+    clusters_hosts = {}
+    for host in up_hosts:
+        clusters_hosts.setdefault(host.cluster.id, []).append(host)
+    clusters = dict((c.id, c) for c in system_service.clusters_service().list())
+
+    if module.params['source_host']:
+        vms = vms_service.list(search='host=%s' % module.params['source_host'])
+        vms = [vm for vm in vms if vm.host is not None and hosts_by_id[vm.host.id].name == module.params['source_host']]
+    else:
+        found = search_by_names(vms_service, module.params['vms'])
+        missing = [name for name in module.params['vms'] if name not in found]
+        if missing:
+            raise Exception("Virtual Machines %s were not found." % ', '.join(missing))
+        vms = [found[name] for name in module.params['vms']]
+
+    vms = dict((vm.id, vm) for vm in vms)
+    results = dict(
+        (
+            vm.id,
+            dict(
+                name=vm.name,
+                id=vm.id,
+                source=getattr(hosts_by_id.get(vm.host.id), 'name', None) if vm.host else None,
+            ),
+        ) for vm in vms.values()
+    )
+    # Virtual Machines already running on one of the destinations are left:
+    destination_hosts = module.params['destination_hosts'] or []
+    vms = dict(
+        (vm.id, vm) for vm in vms.values()
+        if results[vm.id]['source'] not in destination_hosts
+    )
+    results = dict((vm_id, results[vm_id]) for vm_id in vms)
+    migrating = [vm.id for vm in vms.values() if vm.status == otypes.VmStatus.UP]
+    for vm in vms.values():
+        if vm.status != otypes.VmStatus.UP:
+            results[vm.id]['error'] = "Virtual Machine isn't up, it's %s." % vm.status
+
+    if module.check_mode or not migrating:
+        return dict(
+            changed=bool(migrating),
+            vms=[results[vm_id] for vm_id in sorted(results, key=lambda i: results[i]['name'])],
+        )
+
+    # Memory available for scheduling on the destinations, lowered by the
+    # memory of the Virtual Machines migrated to them:
+    free_memory = dict((host.id, host.max_scheduling_memory or 0) for host in up_hosts)
+    sources = dict((vm.id, vm.host.id) for vm in vms.values())
+    seen_migrating = set()
+
+    def admit(vm_id, slots):
+        vm = vms[vm_id]
+        source = ('source', vm.host.id)
+        if slots.full(source):
+            return None
+
+        candidates = [
+            host for host in _destinations(clusters_hosts, module, vm)
+            if not slots.full(('destination', host.id)) and free_memory[host.id] >= (vm.memory or 0)
+        ]
+        if not candidates:
+            if not _destinations(clusters_hosts, module, vm):
+                raise Exception("There is no destination host for the Virtual Machine.")
+            return None
+
+        destination = min(
+            candidates,
+            key=lambda host: (slots.used(('destination', host.id)), -free_memory[host.id], host.name),
+        )
+        free_memory[destination.id] -= vm.memory or 0
+        results[vm_id]['destination'] = destination.name
+        return [source, ('destination', destination.id)], lambda: vms_service.vm_service(vm_id).migrate(
+            host=otypes.Host(id=destination.id),
+            force=module.params['force'],
+            wait=False,
+        )
+
+    def condition(vm):
+        return (
+            vm is not None and
+            vm.status == otypes.VmStatus.UP and
+            vm.host is not None and
+            vm.host.id != sources[vm.id]
+        )
+
+    def fail_condition(vm):
+        if vm is None or vm.status not in [otypes.VmStatus.UP, otypes.VmStatus.MIGRATING]:
+            return True
+        if vm.status == otypes.VmStatus.MIGRATING:
+            seen_migrating.add(vm.id)
+            return False
+        # Virtual Machine is up on the source host after migration:
+        return vm.id in seen_migrating
+
+    sent, done, errors = run_waves(
+        ids=migrating,
+        admit=admit,
+        list_entities=search_by_ids(vms_service),
+        condition=condition,
+        fail_condition=fail_condition,
+        limit=len(migrating),
+        slots=Slots(
+            dict(
+                source=_source_limits(clusters, hosts, module),
+                destination=module.params['max_per_destination'],
+            )
+        ),
+        timeout=module.params['timeout'],
+        poll_interval=module.params['poll_interval'],
+    )
+    for vm_id in migrating:
+        if vm_id in done:
+            results[vm_id]['duration'] = round(done[vm_id] - sent[vm_id], 3)
+        elif vm_id in errors:
+            results[vm_id]['error'] = errors[vm_id]
+
+    return dict(
+        changed=bool(done),
+        vms=[results[vm_id] for vm_id in sorted(results, key=lambda i: results[i]['name'])],
+    )
+
+
+def main():
+    argument_spec = ovirt_full_argument_spec(
+        source_host=dict(default=None),
+        vms=dict(default=None, type='list'),
+        destination_hosts=dict(default=None, type='list'),
+        max_per_source=dict(default=2, type='int'),
+        max_per_destination=dict(default=2, type='int'),
+        bandwidth_per_migration=dict(default=None, type='int'),
+        force=dict(default=False, type='bool'),
+    )
+    module = AnsibleModule(
+        argument_spec=argument_spec,
+        supports_check_mode=True,
+        required_one_of=[['source_host', 'vms']],
+        mutually_exclusive=[['source_host', 'vms']],
+    )
+    check_sdk(module)
+
+    connection = None
+    try:
+        connection = create_connection(module.params.pop('auth'))
+        ret = migrate(connection, module)
+        failed = [vm for vm in ret['vms'] if 'error' in vm]
+        if failed:
+            module.fail_json(
+                msg="Failed to migrate %d of %d Virtual Machines: %s" % (
+                    len(failed), len(ret['vms']), ', '.join(vm['name'] for vm in failed),
+                ),
+                **ret
+            )
+        module.exit_json(**ret)
+    except Exception as e:
+        module.fail_json(msg=str(e), exception=traceback.format_exc())
+    finally:
+        if connection is not None:
+            connection.close(logout=False)
+
+
+if __name__ == '__main__':
+    main()
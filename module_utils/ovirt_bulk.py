@@ -0,0 +1,573 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016 Red Hat, Inc.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Helpers of the modules, which manage many entities in one task. Requests
+are sent asynchronously, with bounded number of pending requests, and the
+entities are waited for by polling all of them with one request per poll.
+"""
+
+import collections
+import copy
+import json
+import os
+import time
+
+from ansible.module_utils.basic import BOOLEANS_FALSE, BOOLEANS_TRUE
+from ansible.module_utils.ovirt_facts import search_by_terms
+from ansible.module_utils.six import integer_types, string_types
+
+
+def search_by_names(service, names):
+    """
+    Return dictionary of entities keyed by name, of the entities which
+    names are in `names`.
+    """
+    return dict(
+        (e.name, e) for e in search_by_terms(service, 'name', names)
+        if e.name in names
+    )
+
+
+def search_by_ids(service):
+    """
+    Return function listing entities of the service by their IDs, usable
+    as `list_entities` parameter of `wait_all`.
+    """
+    return lambda ids: search_by_terms(service, 'id', ids)
+
+
+class ModuleSpec(object):
+    """
+    Ansible module of one entity of the list of entities managed by the
+    module, its `params` are the parameters of the module overridden by the
+    specification of the entity.
+    """
+
+    def __init__(self, module, params):
+        self._module = module
+        self.params = params
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, string_types):
+        value = value.lower()
+    if value in BOOLEANS_TRUE:
+        return True
+    if value in BOOLEANS_FALSE:
+        return False
+    raise TypeError('%s cannot be converted to a bool' % value)
+
+
+def _to_list(value):
+    if isinstance(value, list):
+        return value
+    if isinstance(value, string_types):
+        return value.split(',')
+    if isinstance(value, integer_types + (float,)) and not isinstance(value, bool):
+        return [str(value)]
+    raise TypeError('%s cannot be converted to a list' % type(value))
+
+
+def _to_dict(value):
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, string_types) and value.startswith('{'):
+        return json.loads(value)
+    raise TypeError('%s cannot be converted to a dict' % type(value))
+
+
+def _to_int(value):
+    if isinstance(value, integer_types) and not isinstance(value, bool):
+        return value
+    if isinstance(value, string_types):
+        return int(value)
+    raise TypeError('%s cannot be converted to an int' % type(value))
+
+
+def _to_float(value):
+    if isinstance(value, float):
+        return value
+    if isinstance(value, string_types + integer_types) and not isinstance(value, bool):
+        return float(value)
+    raise TypeError('%s cannot be converted to a float' % type(value))
+
+
+def _to_str(value):
+    return value if isinstance(value, string_types) else str(value)
+
+
+# Conversions of the parameter values of one entity, by the type of the
+# parameter of the module, done the same way as `AnsibleModule` converts
+# the parameters of the module:
+SPEC_TYPES = {
+    'bool': _to_bool,
+    'dict': _to_dict,
+    'float': _to_float,
+    'int': _to_int,
+    'list': _to_list,
+    'path': lambda value: os.path.expanduser(os.path.expandvars(_to_str(value))),
+    'raw': lambda value: value,
+    'str': _to_str,
+}
+
+
+def _check_spec_value(module, kind, name, key, value):
+    """
+    Convert value of the parameter of one entity to the type of the parameter
+    of the module and check its choices, as the module does for its own
+    parameters.
+    """
+    if value is None:
+        return value
+
+    spec = module.argument_spec.get(key, {})
+    wanted = spec.get('type') or 'str'
+    if wanted not in SPEC_TYPES:
+        module.fail_json(msg="Parameter %s of type %s isn't supported per %s." % (key, wanted, kind))
+    try:
+        value = SPEC_TYPES[wanted](value)
+    except (TypeError, ValueError) as e:
+        module.fail_json(
+            msg="Parameter %s of %s '%s' is of type %s and we were unable to convert to %s: %s" % (
+                key, kind, name, type(value), wanted, e,
+            )
+        )
+
+    choices = spec.get('choices')
+    if choices is not None:
+        invalid = set(value) - set(choices) if isinstance(value, list) else set([value]) - set(choices)
+        if invalid:
+            module.fail_json(
+                msg="Parameter %s of %s '%s' must be one of: %s, got: %s" % (
+                    key, kind, name, ', '.join(str(c) for c in choices), ', '.join(str(i) for i in invalid),
+                )
+            )
+    return value
+
+
+def merge_specs(module, list_param, allowed, required=('name',), kind='entity'):
+    """
+    Merge specifications of the entities of the `list_param` parameter with
+    the parameters of the module. Values of the specifications are converted
+    and checked against the argument spec of the module, so they are the same
+    as if they were passed as the parameters of the module.
+
+    :param module: Ansible module
+    :param list_param: name of the parameter with the list of specifications
+    :param allowed: names of the parameters, which can be specified per entity
+    :param required: names of the parameters, which every entity must have
+    :param kind: name of the kind of the entities used in error messages
+    :return: list of dictionaries of the parameters of every entity
+    """
+    specs = []
+    for entity in module.params[list_param]:
+        unknown = set(entity) - set(allowed)
+        if unknown:
+            module.fail_json(msg="Unsupported parameters of %s: %s" % (kind, ', '.join(sorted(unknown))))
+
+        params = dict(
+            (key, copy.deepcopy(value)) for key, value in module.params.items()
+            if key != list_param
+        )
+        if not all(entity.get(key, params.get(key)) for key in required):
+            module.fail_json(
+                msg="Every %s of the %s parameter must have %s." % (kind, list_param, ' and '.join(required))
+            )
+        name = entity.get('name', params.get('name'))
+        params.update(
+            (key, _check_spec_value(module, kind, name, key, copy.deepcopy(value)))
+            for key, value in entity.items()
+        )
+        specs.append(params)
+
+    names = [spec['name'] for spec in specs]
+    duplicates = set(name for name in names if names.count(name) > 1)
+    if duplicates:
+        module.fail_json(
+            msg="%s%ss %s are specified more than once." % (kind[0].upper(), kind[1:], ', '.join(sorted(duplicates)))
+        )
+
+    return specs
+
+
+class BulkResults(dict):
+    """
+    Results of the entities managed by one task, keyed by name of the entity.
+    Every result contains `name` and `id` of the entity, `changed` flag,
+    `timings` in seconds since the start of the task, and `error` message if
+    the entity failed.
+    """
+
+    def __init__(self, names, existing=None):
+        """
+        :param names: names of the entities, in order of the results
+        :param existing: dictionary of the existing entities keyed by name
+        """
+        existing = existing or {}
+        super(BulkResults, self).__init__(
+            (
+                name,
+                dict(
+                    name=name,
+                    id=getattr(existing.get(name), 'id', None),
+                    changed=False,
+                    timings=dict(),
+                ),
+            ) for name in names
+        )
+        self.names = list(names)
+        self.started = time.time()
+
+    def elapsed(self, timestamp):
+        return round(timestamp - self.started, 3)
+
+    def fail(self, name, error):
+        self[name]['error'] = str(error)
+
+    def report(self, module, key, action, kind):
+        """
+        Return result of the task, with list of the results of the entities
+        under `key`, or fail the module if any of the entities failed.
+
+        :param module: Ansible module
+        :param key: key of the list of the results, for example `vms`
+        :param action: action of the task used in the error message
+        :param kind: plural name of the kind of the entities used in the error message
+        """
+        entities = [self[name] for name in self.names]
+        failed = [entity['name'] for entity in entities if 'error' in entity]
+        ret = dict(changed=any(entity['changed'] for entity in entities))
+        ret[key] = entities
+        if failed:
+            module.fail_json(
+                msg="Failed to %s %d of %d %s: %s" % (
+                    action, len(failed), len(entities), kind, ', '.join(failed),
+                ),
+                **ret
+            )
+        return ret
+
+
+def create_concurrently(module, results, specs, build, add, timing='created'):
+    """
+    Build entities of the specifications and send their add requests, so at
+    most `concurrency` requests are pending at a time. In check mode the
+    entities are only marked as changed.
+
+    :param module: Ansible module
+    :param results: `BulkResults` of the entities
+    :param specs: specifications of the entities to create
+    :param build: function returning SDK struct of the entity of the specification
+    :param add: function sending add request of the entity and the specification,
+                and returning its future
+    :param timing: name of the timing of the response
+    :return: dictionary of the created entities keyed by name
+    """
+    created = {}
+    if module.check_mode:
+        for spec in specs:
+            results[spec['name']]['changed'] = True
+        return created
+
+    calls = []
+    for spec in specs:
+        try:
+            entity = build(spec)
+        except Exception as e:
+            results.fail(spec['name'], e)
+            continue
+        calls.append((spec, lambda entity=entity, spec=spec: add(entity, spec)))
+
+    responses = run_concurrently([call for _, call in calls], module.params['concurrency'])
+    for (spec, _), (entity, error, timestamp) in zip(calls, responses):
+        if error is not None:
+            results.fail(spec['name'], error)
+            continue
+        results[spec['name']].update(id=entity.id, changed=True)
+        results[spec['name']]['timings'][timing] = results.elapsed(timestamp)
+        created[spec['name']] = entity
+    return created
+
+
+def run_concurrently(calls, limit):
+    """
+    Execute functions, which send request asynchronously and return its
+    future, so at most `limit` requests are pending at a time.
+
+    :param calls: list of functions returning SDK futures
+    :param limit: maximum number of pending requests
+    :return: list of tuples of the result, the exception and the time of
+             the response of every call, in order of the calls, the
+             exception is `None` on success
+    """
+    results = [None] * len(calls)
+    pending = collections.deque()
+
+    def finish():
+        index, future = pending.popleft()
+        try:
+            results[index] = (future.wait(), None, time.time())
+        except Exception as e:
+            results[index] = (None, e, time.time())
+
+    for index, call in enumerate(calls):
+        if len(pending) >= max(limit, 1):
+            finish()
+        try:
+            pending.append((index, call()))
+        except Exception as e:
+            results[index] = (None, e, time.time())
+
+    while pending:
+        finish()
+
+    return results
+
+
+def wait_all(
+    list_entities,
+    ids,
+    condition,
+    fail_condition=lambda e: False,
+    timeout=180,
+    poll_interval=3,
+    progress=lambda e: None,
+):
+    """
+    Wait until all entities fulfill expected condition. All pending entities
+    are fetched by one call of `list_entities` per poll, instead of one
+    request per entity.
+
+    :param list_entities: function returning list of entities of given IDs
+    :param ids: IDs of the entities
+    :param condition: condition to be fulfilled, entity is `None` if it wasn't found
+    :param fail_condition: if this condition is true, the entity failed
+    :param timeout: max time to wait in seconds
+    :param poll_interval: number of seconds between the polls
+    :param progress: function called with every polled pending entity, before
+                     the conditions are checked, which sends the next actions of
+                     operations consisting of several steps
+    :return: tuple of dictionary of seconds it took the entities to fulfill
+             the condition, and dictionary of error messages of the failed
+             entities, both keyed by entity ID
+    """
+    start = time.time()
+    pending = set(ids)
+    elapsed = {}
+    errors = {}
+    while pending:
+        entities = dict((e.id, e) for e in list_entities(sorted(pending)))
+        for entity_id in sorted(pending):
+            entity = entities.get(entity_id)
+            if entity is not None:
+                try:
+                    progress(entity)
+                except Exception as e:
+                    errors[entity_id] = str(e)
+                    pending.remove(entity_id)
+                    continue
+            if condition(entity):
+                elapsed[entity_id] = time.time() - start
+                pending.remove(entity_id)
+            elif fail_condition(entity):
+                errors[entity_id] = "Error while waiting on result state of the entity."
+                pending.remove(entity_id)
+
+        if not pending:
+            break
+        # The last poll is done at the timeout, so it isn't lost for entities
+        # fulfilling the condition between the previous poll and the timeout:
+        remaining = start + timeout - time.time()
+        if remaining <= 0:
+            for entity_id in pending:
+                errors[entity_id] = "Timeout exceed while waiting on result state of the entity."
+            break
+        time.sleep(min(float(poll_interval), remaining))
+
+    return elapsed, errors
+
+
+class Slots(object):
+    """
+    Counts entities in flight per resource, like host or storage domain.
+    Resources are keyed by tuple of kind and ID of the resource. Limits of
+    the resources are given per kind, either one limit of all resources of
+    the kind, or dictionary of limits keyed by resource ID. Zero means no
+    limit.
+    """
+
+    def __init__(self, limits):
+        self._limits = limits
+        self._used = collections.defaultdict(int)
+
+    def full(self, key):
+        limit = self._limits.get(key[0])
+        if isinstance(limit, dict):
+            limit = limit.get(key[1])
+        return bool(limit) and self._used[key] >= limit
+
+    def used(self, key):
+        return self._used[key]
+
+    def available(self, keys):
+        return not any(self.full(key) for key in keys)
+
+    def acquire(self, keys):
+        for key in keys:
+            self._used[key] += 1
+
+    def release(self, keys):
+        for key in keys:
+            self._used[key] -= 1
+
+
+def run_waves(
+    ids,
+    admit,
+    list_entities,
+    condition,
+    fail_condition=lambda e: False,
+    observed_keys=lambda e: (),
+    progress=lambda e: None,
+    limit=10,
+    slots=None,
+    timeout=180,
+    poll_interval=3,
+    entity_timeout=None,
+):
+    """
+    Execute actions on the entities in waves. An entity is in flight from
+    its action until it fulfills the condition. Entities are admitted in
+    order of `ids`, as long as less than `limit` entities are in flight,
+    and the resources they use aren't full. Entities in flight are polled
+    by one call of `list_entities` per poll, and every entity which
+    fulfills the condition frees its resources for the next entities.
+
+    :param ids: IDs of the entities, in order of their priority
+    :param admit: function returning tuple of resource keys used by the entity
+                  and function sending the action and returning its future,
+                  for given ID and `Slots`, or `None` if the entity can't be
+                  admitted now
+    :param list_entities: function returning list of entities of given IDs
+    :param condition: condition to be fulfilled, entity is `None` if it wasn't found
+    :param fail_condition: if this condition is true, the entity failed
+    :param observed_keys: function returning keys of the resources used by the
+                          polled entity, which aren't known before the action,
+                          like host the entity runs on
+    :param progress: function called with every polled entity in flight, before
+                     the conditions are checked, which sends the next actions of
+                     operations consisting of several steps
+    :param limit: maximum number of entities in flight
+    :param slots: `Slots` counting entities per resource
+    :param timeout: max time to wait for all entities in seconds, `None` means
+                    no limit
+    :param poll_interval: number of seconds between the polls
+    :param entity_timeout: max time to wait for every entity since its action
+                           was sent in seconds, `None` means no limit
+    :return: tuple of dictionary of seconds since the start, when the action
+             of the entities was sent, dictionary of seconds since the start,
+             when the entities fulfilled the condition, and dictionary of error
+             messages of the failed entities, all keyed by entity ID
+    """
+    slots = slots or Slots({})
+    start = time.time()
+    pending = list(ids)
+    in_flight = {}
+    sent = {}
+    done = {}
+    errors = {}
+
+    def finish(entity_id, error=None):
+        slots.release(in_flight.pop(entity_id))
+        if error is None:
+            done[entity_id] = time.time() - start
+        else:
+            errors[entity_id] = error
+
+    while pending or in_flight:
+        # Admit the entities with the highest priority, which resources aren't full:
+        wave = []
+        for entity_id in list(pending):
+            if len(in_flight) >= max(limit, 1):
+                break
+            try:
+                admitted = admit(entity_id, slots)
+            except Exception as e:
+                pending.remove(entity_id)
+                errors[entity_id] = str(e)
+                continue
+            if admitted is None:
+                continue
+
+            keys, call = admitted
+            pending.remove(entity_id)
+            slots.acquire(keys)
+            in_flight[entity_id] = list(keys)
+            wave.append((entity_id, call))
+
+        for (entity_id, _), (_, error, timestamp) in zip(wave, run_concurrently([call for _, call in wave], limit)):
+            if error is not None:
+                finish(entity_id, str(error))
+            else:
+                sent[entity_id] = timestamp - start
+
+        if not in_flight:
+            for entity_id in pending:
+                errors[entity_id] = "The entity can't be admitted, its resources are full."
+            break
+
+        # The last poll is done at the timeout, as in `wait_all`:
+        deadlines = [start + timeout] if timeout is not None else []
+        if entity_timeout is not None:
+            deadlines.extend(start + sent[entity_id] + entity_timeout for entity_id in in_flight)
+        time.sleep(min([float(poll_interval)] + [max(deadline - time.time(), 0) for deadline in deadlines]))
+
+        entities = dict((e.id, e) for e in list_entities(sorted(in_flight)))
+        for entity_id in sorted(in_flight):
+            entity = entities.get(entity_id)
+            if entity is not None:
+                # Account resources chosen by the engine, like the host:
+                keys = [key for key in observed_keys(entity) if key not in in_flight[entity_id]]
+                slots.acquire(keys)
+                in_flight[entity_id].extend(keys)
+                try:
+                    progress(entity)
+                except Exception as e:
+                    finish(entity_id, str(e))
+                    continue
+            if condition(entity):
+                finish(entity_id)
+            elif fail_condition(entity):
+                finish(entity_id, "Error while waiting on result state of the entity.")
+            elif entity_timeout is not None and time.time() >= start + sent[entity_id] + entity_timeout:
+                finish(entity_id, "Timeout exceed while waiting on result state of the entity.")
+
+        if (pending or in_flight) and timeout is not None and time.time() >= start + timeout:
+            for entity_id in list(in_flight) + pending:
+                errors[entity_id] = "Timeout exceed while waiting on result state of the entity."
+            break
+
+    return sent, done, errors
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016 Red Hat, Inc.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Capacity planning of clusters.
+
+The planner models memory and CPU capacity of hosts and allocations of the
+running VMs in memory, built from a few listings of hosts, VMs and clusters.
+It answers whether VMs of given hosts can be migrated to the other hosts of
+their clusters, and how many hosts can be in maintenance at once. If NumPy
+is available the model is stored in arrays, otherwise in lists.
+"""
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+try:
+    import ovirtsdk4.types as otypes
+except ImportError:
+    pass
+
+
+def _threads(topology):
+    if topology is None:
+        return 0
+    return (topology.sockets or 1) * (topology.cores or 1) * (topology.threads or 1)
+
+
+def _memory_over_commit(cluster):
+    if cluster is None or cluster.memory_policy is None or cluster.memory_policy.over_commit is None:
+        return 100
+    return cluster.memory_policy.over_commit.percent or 100
+
+
+class CapacityPlanner(object):
+    """
+    In-memory model of capacity of the hosts and allocations of the VMs.
+    Memory capacity of the host is its memory multiplied by the memory over
+    commitment of its cluster. CPU capacity is number of CPU threads of the
+    host multiplied by `cpu_over_commit`, CPU isn't considered if it's `None`.
+    """
+
+    def __init__(self, hosts, vms, clusters, cpu_over_commit=None):
+        """
+        :param hosts: list of SDK structs of the hosts
+        :param vms: list of SDK structs of the VMs, VMs which don't run on
+                    any of the hosts are ignored
+        :param clusters: list of SDK structs of the clusters of the hosts
+        :param cpu_over_commit: number of virtual CPUs per CPU thread of host
+        """
+        self.clusters = dict((cluster.id, cluster) for cluster in clusters)
+        self.hosts = list(hosts)
+        self._index = dict((host.id, index) for index, host in enumerate(self.hosts))
+        self.vms = [
+            vm for vm in vms
+            if vm.host is not None and vm.host.id in self._index
+        ]
+        self._cpu_over_commit = cpu_over_commit
+
+        memory_capacity = [
+            (host.memory or 0) * _memory_over_commit(self.clusters.get(host.cluster.id)) / 100.0
+            for host in self.hosts
+        ]
+        cpu_capacity = [
+            _threads(host.cpu.topology if host.cpu else None) * (cpu_over_commit or 0)
+            for host in self.hosts
+        ]
+        cluster_ids = sorted(set(host.cluster.id for host in self.hosts))
+        cluster_index = dict((cluster_id, index) for index, cluster_id in enumerate(cluster_ids))
+        host_clusters = [cluster_index[host.cluster.id] for host in self.hosts]
+        up = [host.status == otypes.HostStatus.UP for host in self.hosts]
+        vm_memory = [float(vm.memory or 0) for vm in self.vms]
+        vm_cpu = [float(_threads(vm.cpu.topology if vm.cpu else None)) for vm in self.vms]
+        vm_hosts = [self._index[vm.host.id] for vm in self.vms]
+
+        if HAS_NUMPY:
+            self._memory_capacity = np.array(memory_capacity, dtype=float)
+            self._cpu_capacity = np.array(cpu_capacity, dtype=float)
+            self._host_clusters = np.array(host_clusters, dtype=int)
+            self._up = np.array(up, dtype=bool)
+            self._vm_memory = np.array(vm_memory, dtype=float)
+            self._vm_cpu = np.array(vm_cpu, dtype=float)
+            self._vm_hosts = np.array(vm_hosts, dtype=int)
+            self._memory_used = np.bincount(self._vm_hosts, weights=self._vm_memory, minlength=len(self.hosts))
+            self._cpu_used = np.bincount(self._vm_hosts, weights=self._vm_cpu, minlength=len(self.hosts))
+        else:
+            self._memory_capacity = memory_capacity
+            self._cpu_capacity = cpu_capacity
+            self._host_clusters = host_clusters
+            self._up = up
+            self._vm_memory = vm_memory
+            self._vm_cpu = vm_cpu
+            self._vm_hosts = vm_hosts
+            self._memory_used = [0.0] * len(self.hosts)
+            self._cpu_used = [0.0] * len(self.hosts)
+            for vm, host in enumerate(vm_hosts):
+                self._memory_used[host] += vm_memory[vm]
+                self._cpu_used[host] += vm_cpu[vm]
+
+    @classmethod
+    def fetch(cls, connection, cluster=None, cpu_over_commit=None):
+        """
+        Build the planner from listings of the hosts, VMs and clusters.
+
+        :param connection: connection to the Python SDK
+        :param cluster: name of the cluster, by default all clusters are planned
+        :param cpu_over_commit: number of virtual CPUs per CPU thread of host
+        """
+        system_service = connection.system_service()
+        search = 'cluster=%s' % cluster if cluster else None
+        return cls(
+            hosts=system_service.hosts_service().list(search=search),
+            vms=system_service.vms_service().list(search=search),
+            clusters=system_service.clusters_service().list(
+                search='name=%s' % cluster if cluster else None,
+            ),
+            cpu_over_commit=cpu_over_commit,
+        )
+
+    def host_capacity(self):
+        """
+        Return list of dictionaries with capacity and allocations of every host.
+        """
+        counts = [0] * len(self.hosts)
+        for host in self._vm_hosts:
+            counts[int(host)] += 1
+        return [
+            dict(
+                name=host.name,
+                id=host.id,
+                status=str(host.status),
+                memory_capacity=int(self._memory_capacity[index]),
+                memory_used=int(self._memory_used[index]),
+                cpu_capacity=int(self._cpu_capacity[index]) if self._cpu_over_commit else None,
+                cpu_used=int(self._cpu_used[index]),
+                vms=counts[index],
+            ) for index, host in enumerate(self.hosts)
+        ]
+
+    def drain(self, host_ids):
+        """
+        Place VMs running on the hosts to the other up hosts of their clusters.
+        The VMs are placed from the biggest one, every VM to the host with
+        most free memory, which has enough memory and CPU for the VM.
+
+        :param host_ids: IDs of the hosts to drain
+        :return: tuple of dictionary of IDs of the destination hosts keyed by
+                 VM ID, and list of IDs of the VMs which can't be placed
+        """
+        drained = set(self._index[host_id] for host_id in host_ids)
+        if HAS_NUMPY:
+            return self._drain_numpy(drained)
+
+        free_memory = [c - u for c, u in zip(self._memory_capacity, self._memory_used)]
+        free_cpu = [c - u for c, u in zip(self._cpu_capacity, self._cpu_used)]
+        vms = sorted(
+            (vm for vm, host in enumerate(self._vm_hosts) if host in drained),
+            key=lambda vm: -self._vm_memory[vm],
+        )
+        placement = {}
+        unplaced = []
+        for vm in vms:
+            cluster = self._host_clusters[self._vm_hosts[vm]]
+            candidates = [
+                host for host in range(len(self.hosts))
+                if self._up[host] and host not in drained and
+                self._host_clusters[host] == cluster and
+                free_memory[host] >= self._vm_memory[vm] and
+                (not self._cpu_over_commit or free_cpu[host] >= self._vm_cpu[vm])
+            ]
+            if not candidates:
+                unplaced.append(self.vms[vm].id)
+                continue
+            host = max(candidates, key=lambda h: (free_memory[h], -h))
+            free_memory[host] -= self._vm_memory[vm]
+            free_cpu[host] -= self._vm_cpu[vm]
+            placement[self.vms[vm].id] = self.hosts[host].id
+        return placement, unplaced
+
+    def _drain_numpy(self, drained):
+        free_memory = self._memory_capacity - self._memory_used
+        free_cpu = self._cpu_capacity - self._cpu_used
+        targets = self._up.copy()
+        drained = np.array(sorted(drained), dtype=int)
+        targets[drained] = False
+        vms = np.nonzero(np.isin(self._vm_hosts, drained))[0]
+        vms = vms[np.argsort(-self._vm_memory[vms], kind='mergesort')]
+        placement = {}
+        unplaced = []
+        for vm in vms:
+            fits = (
+                targets &
+                (self._host_clusters == self._host_clusters[self._vm_hosts[vm]]) &
+                (free_memory >= self._vm_memory[vm])
+            )
+            if self._cpu_over_commit:
+                fits &= free_cpu >= self._vm_cpu[vm]
+            if not fits.any():
+                unplaced.append(self.vms[vm].id)
+                continue
+            host = int(np.argmax(np.where(fits, free_memory, -np.inf)))
+            free_memory[host] -= self._vm_memory[vm]
+            free_cpu[host] -= self._vm_cpu[vm]
+            placement[self.vms[vm].id] = self.hosts[host].id
+        return placement, unplaced
+
+    def can_drain(self, host_ids):
+        """
+        Return `True` if all VMs of the hosts can be placed to other hosts.
+        """
+        return not self.drain(host_ids)[1]
+
+    def max_down(self, host_ids=None):
+        """
+        Return number of the up hosts, which can be in maintenance at once.
+        Hosts which aren't up don't lower the capacity, so they aren't counted,
+        and the worst case is assumed for the up hosts: those with the most
+        allocated memory are in maintenance together.
+
+        :param host_ids: IDs of the candidate hosts, by default all hosts
+        :return: number of the hosts
+        """
+        if host_ids is None:
+            host_ids = [host.id for host in self.hosts]
+        ordered = sorted(
+            (host_id for host_id in host_ids if self._up[self._index[host_id]]),
+            key=lambda host_id: (
+                -self._memory_used[self._index[host_id]],
+                -self._memory_capacity[self._index[host_id]],
+            ),
+        )
+        # Draining is monotonic, so the number is found by binary search:
+        low, high = 0, len(ordered)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.can_drain(ordered[:middle]):
+                low = middle
+            else:
+                high = middle - 1
+        return low
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016 Red Hat, Inc.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+try:
+    import ovirtsdk4 as sdk
+except ImportError:
+    pass
+
+
+# Connection pool parameters of the `auth` dictionary, which are passed
+# to the SDK only when set, so older SDKs without pool support keep working:
+POOL_PARAMETERS = ['connections', 'pipeline']
+
+
+def create_connection(auth):
+    """
+    Create a connection to Python SDK, from task `auth` parameter.
+    If user doesnt't have SSO token the `auth` dictionary has following parameters mandatory:
+     url, username, password
+
+    If user has SSO token the `auth` dictionary has following parameters mandatory:
+     url, token
+
+    The `ca_file` parameter is mandatory in case user want to use secure connection,
+    in case user want to use insecure connection, it's mandatory to send insecure=True.
+
+    The `connections` and `pipeline` parameters configure the pool of
+    persistent (keep-alive) HTTP connections, which are reused by all
+    requests sent by the module.
+
+    :param auth: dictionary which contains needed values for connection creation
+    :return: Python SDK connection
+    """
+    pool = dict(
+        (param, auth[param])
+        for param in POOL_PARAMETERS if auth.get(param)
+    )
+    return sdk.Connection(
+        url=auth.get('url'),
+        username=auth.get('username'),
+        password=auth.get('password'),
+        ca_file=auth.get('ca_file', None),
+        insecure=auth.get('insecure', False),
+        token=auth.get('token', None),
+        kerberos=auth.get('kerberos', None),
+        **pool
+    )
+
+
+class RequestCounter(object):
+    """
+    Counts HTTP requests sent by the connection, so modules can report
+    how many API calls the task took.
+    """
+
+    def __init__(self, connection):
+        self.count = 0
+        send = connection.send
+
+        def counting_send(request):
+            self.count += 1
+            return send(request)
+
+        connection.send = counting_send
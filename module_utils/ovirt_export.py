@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016 Red Hat, Inc.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Compact columnar export of facts.
+
+The exported file contains tables of records, every table is stored by
+columns. Nested dictionaries of the records are flattened into columns
+named by the dotted path of the key, for example `cluster.id`. Columns
+containing only strings are stored as indexes to the table of strings,
+which is shared by all tables, so strings repeated across records, like
+names of clusters or operating systems, are stored only once. Other
+columns are stored as lists of values. Missing values are stored as
+`None` and are omitted when the records are loaded.
+
+The file is written as JSON or, if the `msgpack` Python module is
+available, as MessagePack.
+"""
+
+import json
+import os
+import tempfile
+
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    HAS_MSGPACK = False
+
+
+EXPORT_FORMAT = 'ovirt-columnar'
+EXPORT_VERSION = 1
+EXPORT_FORMATS = ['json', 'msgpack']
+
+# Types of the columns:
+STRINGS = 's'
+VALUES = 'v'
+
+
+def _flatten(record, prefix=''):
+    """
+    Flatten nested dictionaries of the record into dotted keys. Empty
+    dictionaries are kept as values, so they are restored when loaded.
+    """
+    flat = {}
+    for key, value in record.items():
+        if isinstance(value, dict) and value:
+            flat.update(_flatten(value, '%s%s.' % (prefix, key)))
+        else:
+            flat['%s%s' % (prefix, key)] = value
+    return flat
+
+
+def _unflatten(flat):
+    record = {}
+    for key, value in flat.items():
+        path = key.split('.')
+        parent = record
+        for name in path[:-1]:
+            parent = parent.setdefault(name, {})
+        parent[path[-1]] = value
+    return record
+
+
+def _is_string(value):
+    try:
+        return isinstance(value, basestring)
+    except NameError:
+        return isinstance(value, str)
+
+
+class _Strings(object):
+    """
+    Table of interned strings.
+    """
+
+    def __init__(self):
+        self.strings = []
+        self._indexes = {}
+
+    def index(self, string):
+        index = self._indexes.get(string)
+        if index is None:
+            index = self._indexes[string] = len(self.strings)
+            self.strings.append(string)
+        return index
+
+
+def _encode_table(records, strings):
+    rows = [_flatten(record) for record in records]
+    keys = sorted(set(key for row in rows for key in row))
+    columns = {}
+    for key in keys:
+        values = [row.get(key) for row in rows]
+        if all(value is None or _is_string(value) for value in values):
+            columns[key] = [
+                STRINGS,
+                [None if value is None else strings.index(value) for value in values],
+            ]
+        else:
+            columns[key] = [VALUES, values]
+    return dict(count=len(rows), columns=columns)
+
+
+def _decode_table(table, strings):
+    decoded = dict(
+        (
+            key,
+            [
+                strings[value] if column_type == STRINGS and value is not None else value
+                for value in values
+            ],
+        ) for key, (column_type, values) in table['columns'].items()
+    )
+    return [
+        _unflatten(
+            dict(
+                (key, values[row]) for key, values in decoded.items()
+                if values[row] is not None
+            )
+        ) for row in range(table['count'])
+    ]
+
+
+def export_tables(path, tables, export_format='json'):
+    """
+    Write tables of records into the file in columnar format. The file is
+    written into temporary file first, and moved to `path` when complete.
+
+    :param path: path of the file
+    :param tables: dictionary of the lists of records, keyed by table name
+    :param export_format: `json` or `msgpack`
+    :return: dictionary summarizing the export
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError("Unsupported export format '%s'." % export_format)
+    if export_format == 'msgpack' and not HAS_MSGPACK:
+        raise Exception("msgpack Python module is required to export facts in msgpack format.")
+
+    strings = _Strings()
+    encoded = dict(
+        (name, _encode_table(records, strings))
+        for name, records in tables.items()
+    )
+    document = dict(
+        format=EXPORT_FORMAT,
+        version=EXPORT_VERSION,
+        strings=strings.strings,
+        tables=encoded,
+    )
+
+    path = os.path.expanduser(path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        if export_format == 'msgpack':
+            with os.fdopen(fd, 'wb') as export_file:
+                export_file.write(msgpack.packb(document, use_bin_type=True))
+        else:
+            with os.fdopen(fd, 'w') as export_file:
+                json.dump(document, export_file, separators=(',', ':'))
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+    os.rename(tmp_path, path)
+    return dict(
+        path=path,
+        format=export_format,
+        size=os.path.getsize(path),
+        counts=dict((name, table['count']) for name, table in encoded.items()),
+    )
+
+
+def export_facts(module, name, facts, tables=None):
+    """
+    Return `ansible_facts` of the facts module. If `export_path` parameter
+    is set, the facts are exported into the file, and only the summary of
+    the export is returned as `<name>_export` fact, instead of the facts.
+
+    :param module: Ansible module
+    :param name: name of the fact
+    :param facts: list of dictionaries gathered by the module
+    :param tables: tables to export, by default the facts as table `name`
+    :return: dictionary of the facts
+    """
+    export_path = module.params.get('export_path')
+    if not export_path:
+        return {name: facts}
+
+    return {
+        '%s_export' % name: export_tables(
+            export_path,
+            tables if tables is not None else {name: facts},
+            export_format=module.params.get('export_format') or 'json',
+        ),
+    }
+
+
+def load_export(path):
+    """
+    Load tables of records from the file written by `export_tables`, the
+    format of the file is detected automatically.
+
+    :param path: path of the file
+    :return: dictionary of the lists of records, keyed by table name
+    """
+    with open(os.path.expanduser(path), 'rb') as export_file:
+        data = export_file.read()
+
+    if data[:1] == b'{':
+        document = json.loads(data.decode('utf-8'))
+    elif HAS_MSGPACK:
+        document = msgpack.unpackb(data, raw=False)
+    else:
+        raise Exception("msgpack Python module is required to load facts exported in msgpack format.")
+
+    if document.get('format') != EXPORT_FORMAT or document.get('version') != EXPORT_VERSION:
+        raise ValueError("File '%s' isn't a facts export of version %s." % (path, EXPORT_VERSION))
+
+    strings = document['strings']
+    return dict(
+        (name, _decode_table(table, strings))
+        for name, table in document['tables'].items()
+    )
@@ -0,0 +1,622 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016 Red Hat, Inc.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import copy
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from datetime import datetime
+
+try:
+    from inspect import getfullargspec as getargspec
+except ImportError:
+    from inspect import getargspec
+
+try:
+    from enum import Enum  # enum is a ovirtsdk4 requirement
+    import ovirtsdk4 as sdk
+except ImportError:
+    pass
+
+from ansible.module_utils.ovirt import (
+    get_dict_of_struct,
+    ovirt_full_argument_spec,
+)
+
+
+DEFAULT_CACHE_PATH = '~/.ansible/ovirt_facts_cache'
+DEFAULT_DELTA_PATH = '~/.ansible/ovirt_facts_delta'
+
+# Maximum number of terms of one search query, so the URL of the request
+# doesn't exceed the limits of the HTTP servers:
+SEARCH_CHUNK_SIZE = 50
+
+# Parameters which don't affect the entities gathered by the facts module,
+# so they aren't part of the cache and snapshot keys:
+LOCAL_PARAMETERS = [
+    'auth', 'cache_ttl', 'cache_path', 'cache_invalidate', 'delta', 'delta_path',
+    'export_path', 'export_format',
+]
+
+
+def ovirt_facts_argument_spec(**kwargs):
+    """
+    Extend parameters of facts module with parameters which are common to all
+    oVirt facts modules.
+
+    :param kwargs: kwargs to be extended
+    :return: extended dictionary with common parameters
+    """
+    spec = ovirt_full_argument_spec(
+        fetch_nested=dict(default=False, type='bool'),
+        nested_attributes=dict(default=list(), type='list'),
+        fields=dict(default=None, type='list'),
+        follow=dict(default=None, type='list'),
+        cache_ttl=dict(default=0, type='int'),
+        cache_path=dict(default=DEFAULT_CACHE_PATH),
+        cache_invalidate=dict(default=False, type='bool'),
+        export_path=dict(default=None),
+        export_format=dict(default='json', choices=['json', 'msgpack']),
+    )
+    spec.update(kwargs)
+    return spec
+
+
+def list_params(module):
+    """
+    Return parameters of the `list` method of the service, which follow
+    the links specified in `follow` parameter of the facts module, so the
+    engine returns the linked entities inlined in the same response.
+    """
+    follow = module.params.get('follow')
+    return dict(follow=','.join(follow)) if follow else dict()
+
+
+def _identity(value):
+    return value
+
+
+class StructSerializer(object):
+    """
+    Converts SDK structs into dictionaries, the same way as `get_dict_of_struct`
+    does without `fetch_nested`, but faster. Instead of inspecting every
+    attribute of every struct, the serializer computes once per struct type
+    the plan of its attributes and their dictionary keys, and once per value
+    type the function converting the value. Strings of enum values are
+    cached too.
+
+    The output is identical to the output of `get_dict_of_struct`, so `None`
+    attributes are omitted, while empty lists are kept.
+    """
+
+    def __init__(self):
+        self._plans = {}
+        self._converters = {}
+        self._item_converters = {}
+        self._enums = {}
+
+    def _plan(self, struct):
+        attributes = struct.__dict__
+        plan = self._plans.get(type(struct))
+        # All structs of the same type have the same attributes, so the plan
+        # of the type is computed again only if the struct was modified:
+        if plan is None or len(plan) != len(attributes) or plan[0][0] not in attributes:
+            plan = tuple(
+                (key, key[1:] if key.startswith('_') else key)
+                for key in attributes
+            )
+            self._plans[type(struct)] = plan
+        return plan
+
+    def _enum(self, value):
+        string = self._enums.get(value)
+        if string is None:
+            string = self._enums[value] = str(value)
+        return string
+
+    def _converter(self, value_type):
+        if issubclass(value_type, sdk.Struct):
+            converter = self.to_dict
+        elif issubclass(value_type, Enum):
+            converter = self._enum
+        elif issubclass(value_type, datetime):
+            converter = str
+        elif issubclass(value_type, list):
+            converter = self._list
+        else:
+            converter = _identity
+        self._converters[value_type] = converter
+        return converter
+
+    def _item_converter(self, item_type):
+        # Items of lists are converted only if they are structs or enums:
+        if issubclass(item_type, sdk.Struct):
+            converter = self.to_dict
+        elif issubclass(item_type, Enum):
+            converter = self._enum
+        else:
+            converter = _identity
+        self._item_converters[item_type] = converter
+        return converter
+
+    def _list(self, value):
+        converters = self._item_converters
+        return [
+            (converters.get(type(item)) or self._item_converter(type(item)))(item)
+            for item in value
+        ]
+
+    def to_dict(self, struct):
+        """
+        Convert SDK struct into dictionary.
+        """
+        res = {}
+        if struct is None:
+            return res
+
+        converters = self._converters
+        attributes = struct.__dict__
+        for key, out_key in self._plan(struct):
+            value = attributes.get(key)
+            if value is not None:
+                res[out_key] = (
+                    converters.get(type(value)) or self._converter(type(value))
+                )(value)
+        return res
+
+
+_serializer = None
+
+
+def struct_to_dict(struct):
+    """
+    Convert SDK struct into dictionary, using serializer shared by all calls
+    within the module, so the plans of struct types are computed only once.
+    """
+    global _serializer
+    if _serializer is None:
+        _serializer = StructSerializer()
+    return _serializer.to_dict(struct)
+
+
+# Glob patterns which the search backend evaluates the same way, the only
+# wildcard it supports is `*`:
+SEARCHABLE_GLOB = re.compile(r'^[\w.*-]+$')
+
+
+def glob_to_search(attribute, pattern):
+    """
+    Translate glob pattern matching the `attribute` into the term of search
+    query, or return `None` if the search backend can't express the pattern.
+    """
+    if pattern is None or not SEARCHABLE_GLOB.match(pattern):
+        return None
+    return '%s=%s' % (attribute, pattern)
+
+
+def _list_accepts(service, parameter):
+    list_method = getattr(service, 'list', None)
+    return list_method is not None and parameter in getargspec(list_method).args
+
+
+def supports_search(service):
+    """
+    Return `True` if the `list` method of the service accepts search query.
+    """
+    return _list_accepts(service, 'search')
+
+
+def search_by_terms(service, attribute, values, search=None, **kwargs):
+    """
+    List entities which `attribute` equals to any of the values, using one
+    search query `attribute=a or attribute=b ...` per `SEARCH_CHUNK_SIZE`
+    values, instead of one query per value.
+
+    :param service: service of the collection which supports search
+    :param attribute: searched attribute, for example `name` or `id`
+    :param values: list of the values
+    :param search: search query, which the entities must match too
+    :param kwargs: additional parameters passed to `list` method of the service
+    :return: list of the entities
+    """
+    values = sorted(set(v for v in values if v is not None))
+    entities = []
+    for start in range(0, len(values), SEARCH_CHUNK_SIZE):
+        terms = ' or '.join(
+            '%s=%s' % (attribute, value)
+            for value in values[start:start + SEARCH_CHUNK_SIZE]
+        )
+        entities.extend(
+            service.list(
+                search='(%s) and %s' % (terms, search) if search else terms,
+                **kwargs
+            )
+        )
+    return entities
+
+
+def link_entities(connection, link):
+    """
+    Return entities of the link, the link is followed only if the engine
+    didn't return the entities inlined.
+    """
+    if link is None:
+        return []
+    if not len(link) and link.href:
+        return connection.follow_link(link)
+    return link
+
+
+def supports_follow(service):
+    """
+    Return `True` if the `list` method of the service can return the linked
+    entities inlined, which requires oVirt Python SDK 4.2 or higher.
+    """
+    return _list_accepts(service, 'follow')
+
+
+def list_by_name(service, pattern, **kwargs):
+    """
+    List entities of the service which names match the glob pattern. If the
+    service supports search and the pattern can be expressed as search term,
+    the engine filters the entities, otherwise all entities are listed and
+    filtered locally. The entities are always matched against the pattern
+    locally too, as the search backend doesn't match names case sensitively.
+
+    :param service: service of the collection
+    :param pattern: glob pattern of the names
+    :param kwargs: additional parameters passed to `list` method of the service
+    :return: tuple of the list of matching entities and boolean flag, which
+             is `True` if the filter was pushed down to the engine
+    """
+    search = glob_to_search('name', pattern) if supports_search(service) else None
+    if search is not None:
+        entities = service.list(search=search, **kwargs)
+    else:
+        entities = service.list(**kwargs)
+
+    return [
+        e for e in entities if e.name is not None and fnmatch.fnmatch(e.name, pattern)
+    ], search is not None
+
+
+def entity_to_dict(connection, entity, fields=None, fetch_nested=False, nested_attributes=None):
+    """
+    Convert entity into dictionary. Only the attributes specified in `fields`
+    are converted, so links of other attributes aren't fetched from the
+    engine even if `fetch_nested` is `True`.
+
+    :param connection: connection to the Python SDK
+    :param entity: SDK struct of the entity
+    :param fields: list of the converted attributes, all if `None`
+    :param fetch_nested: if `True` the links of the entity are followed
+    :param nested_attributes: attributes of the followed entities to return
+    :return: dictionary of the entity
+    """
+    if fields:
+        entity = copy.copy(entity)
+        for key in entity.__dict__:
+            if key.lstrip('_') not in fields and key.lstrip('_') != 'id':
+                entity.__dict__[key] = None
+
+    if not fetch_nested:
+        return struct_to_dict(entity)
+
+    return get_dict_of_struct(
+        struct=entity,
+        connection=connection,
+        fetch_nested=fetch_nested,
+        attributes=nested_attributes,
+    )
+
+
+def get_dict_of_entity(connection, module, entity):
+    """
+    Convert entity into dictionary according to `fields`, `fetch_nested` and
+    `nested_attributes` parameters of the facts module.
+    """
+    return entity_to_dict(
+        connection,
+        entity,
+        fields=module.params.get('fields'),
+        fetch_nested=module.params.get('fetch_nested'),
+        nested_attributes=module.params.get('nested_attributes'),
+    )
+
+
+def _sha1(value):
+    return hashlib.sha1(
+        json.dumps(value, sort_keys=True).encode('utf-8')
+    ).hexdigest()
+
+
+def auth_key(auth):
+    """
+    Return key of the engine and the user of the `auth` dictionary, so the
+    data stored locally isn't shared by users with different permissions.
+    The SSO token identifies the user, if the username isn't known.
+    """
+    return _sha1([auth.get('url'), auth.get('username') or auth.get('token')])
+
+
+def _query_key(module):
+    return _sha1(
+        dict(
+            (k, v) for k, v in module.params.items()
+            if k not in LOCAL_PARAMETERS
+        )
+    )
+
+
+def write_json(path, data):
+    """
+    Write JSON file atomically, so concurrent forks never read partial data.
+    """
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory, 0o700)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, 'w') as json_file:
+        json.dump(data, json_file)
+    os.rename(tmp_path, path)
+
+
+def read_json(path):
+    """
+    Read JSON file, return `None` if the file doesn't exist or isn't valid.
+    """
+    try:
+        with open(path) as json_file:
+            return json.load(json_file)
+    except (IOError, ValueError):
+        return None
+
+
+class FactsCache(object):
+    """
+    Local cache of the facts returned by facts modules. The facts are cached
+    per engine URL and user, facts module and its search parameters, for
+    `cache_ttl` seconds. Caching is disabled when `cache_ttl` is zero.
+    """
+
+    def __init__(self, module, auth, name):
+        """
+        :param module: Ansible module
+        :param auth: dictionary which contains the engine URL and the user
+        :param name: name of the facts module
+        """
+        self._module = module
+        self._ttl = module.params.get('cache_ttl') or 0
+        self._directory = os.path.join(
+            os.path.expanduser(module.params.get('cache_path') or DEFAULT_CACHE_PATH),
+            auth_key(auth),
+            name,
+        )
+        self._path = os.path.join(self._directory, '%s.json' % _query_key(module))
+        # Attributes of the gathering stored with the facts, like flag if the
+        # filter was pushed down to the engine:
+        self.metadata = {}
+
+        if module.params.get('cache_invalidate'):
+            self.invalidate()
+
+    def invalidate(self):
+        """
+        Remove all cached facts of the facts module for the engine.
+        """
+        if os.path.isdir(self._directory):
+            shutil.rmtree(self._directory, ignore_errors=True)
+
+    def get(self):
+        """
+        Return cached facts, or `None` if the facts aren't cached or expired.
+        """
+        if self._ttl <= 0 or not os.path.isfile(self._path):
+            return None
+
+        cached = read_json(self._path)
+        if cached is None or time.time() - cached.get('time', 0) > self._ttl:
+            return None
+
+        self.metadata = cached.get('metadata', {})
+        return cached.get('facts')
+
+    def put(self, facts, **metadata):
+        """
+        Store facts and the attributes of their gathering in the cache, if
+        caching is enabled.
+        """
+        if self._ttl <= 0:
+            return
+
+        write_json(self._path, dict(time=time.time(), facts=facts, metadata=metadata))
+
+
+def list_pages(service, search=None, page_size=0, **kwargs):
+    """
+    Generator of the entities listed by the `service`. If `page_size` is set,
+    the entities are listed page by page, using the `max` parameter and
+    the `page` clause of the search query, so only one page of entities is
+    held in memory at a time. Pages are sorted by name, unless the search
+    query has its own `sortby` clause, so the pages don't overlap.
+
+    :param service: service of the collection which supports search
+    :param search: search query
+    :param page_size: number of entities per page, zero disables paging
+    :param kwargs: additional parameters passed to `list` method of the service
+    """
+    if not page_size:
+        for entity in service.list(search=search, **kwargs):
+            yield entity
+        return
+
+    search = (search or '').strip()
+    if 'sortby' not in search.lower():
+        search = ('%s sortby name asc' % search).strip()
+
+    page = 1
+    while True:
+        entities = service.list(
+            search='%s page %d' % (search, page),
+            max=page_size,
+            **kwargs
+        )
+        for entity in entities:
+            yield entity
+
+        if len(entities) < page_size:
+            break
+        page += 1
+
+
+def write_json_lines(path, records):
+    """
+    Write records to a JSON Lines file, one JSON document per line.
+    The records are written as they are produced, and the file is moved
+    to `path` only when all records are written.
+
+    :param path: path of the file
+    :param records: iterable of JSON serializable records
+    :return: number of records written
+    """
+    path = os.path.expanduser(path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    count = 0
+    try:
+        with os.fdopen(fd, 'w') as output_file:
+            for record in records:
+                output_file.write(json.dumps(record))
+                output_file.write('\n')
+                count += 1
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+    os.rename(tmp_path, path)
+    return count
+
+
+def event_index(event):
+    """
+    Return index of the engine event, older engines don't report the index,
+    and the ID of the event is used instead.
+    """
+    return event.index if event.index is not None else int(event.id)
+
+
+def last_event_index(events_service):
+    """
+    Return index of the newest engine event, or zero if there is no event.
+    """
+    # Events are listed from the newest one:
+    events = events_service.list(max=1)
+    return event_index(events[0]) if events else 0
+
+
+class DeltaTracker(object):
+    """
+    Tracks changes of the entities gathered by a facts module between its
+    runs. The tracker stores locally a snapshot of the entities and the index
+    of the last processed engine event. Subsequent runs fetch only entities
+    referenced by newer events, and return which of them were added, changed
+    or removed, instead of all entities.
+    """
+
+    def __init__(self, module, auth, name):
+        """
+        :param module: Ansible module
+        :param auth: dictionary which contains the engine URL and the user
+        :param name: name of the facts module
+        """
+        self._path = os.path.join(
+            os.path.expanduser(module.params.get('delta_path') or DEFAULT_DELTA_PATH),
+            auth_key(auth),
+            name,
+            '%s.json' % _query_key(module),
+        )
+
+    def delta(self, connection, service, event_attribute, convert, search=None, page_size=0, **kwargs):
+        """
+        Return dictionary with lists of `added`, `changed` and `removed`
+        entities, since the previous run. If there is no snapshot from the
+        previous run, all entities are listed and returned as `added`.
+
+        :param connection: connection to the Python SDK
+        :param service: service of the collection of the entities
+        :param event_attribute: attribute of the event, which links the entity
+        :param convert: function converting entity into dictionary
+        :param search: search query selecting the entities
+        :param page_size: number of entities per page of the initial listing
+        :param kwargs: additional parameters passed to `list` method of the service
+        :return: dictionary with `added`, `changed` and `removed` entities
+        """
+        # Compare entities as they are stored in the snapshot:
+        def normalize(entity):
+            return json.loads(json.dumps(convert(entity)))
+
+        events_service = connection.system_service().events_service()
+        snapshot = read_json(self._path)
+        if snapshot is None:
+            # Take the index before listing, so changes done during
+            # listing are processed by the next run:
+            index = last_event_index(events_service)
+            entities = dict(
+                (e.id, normalize(e))
+                for e in list_pages(service, search=search, page_size=page_size, **kwargs)
+            )
+            write_json(self._path, dict(index=index, entities=entities))
+            return dict(added=list(entities.values()), changed=[], removed=[])
+
+        entities = snapshot['entities']
+        index = snapshot['index']
+        ids = set()
+        for event in events_service.list(from_=snapshot['index']):
+            index = max(index, event_index(event))
+            link = getattr(event, event_attribute)
+            if link is not None:
+                ids.add(link.id)
+
+        # Entities referenced by the events, which still match the search query:
+        found = dict(
+            (e.id, e) for e in search_by_terms(service, 'id', ids, search=search, **kwargs)
+            if e.id in ids
+        )
+        added, changed, removed = [], [], []
+        for entity_id in ids:
+            old = entities.pop(entity_id, None)
+            if entity_id in found:
+                new = normalize(found[entity_id])
+                entities[entity_id] = new
+                if old is None:
+                    added.append(new)
+                elif old != new:
+                    changed.append(new)
+            elif old is not None:
+                removed.append(old)
+
+        write_json(self._path, dict(index=index, entities=entities))
+        return dict(added=added, changed=changed, removed=removed)
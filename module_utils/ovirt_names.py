@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016 Red Hat, Inc.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from ansible.module_utils.ovirt import get_link_name
+from ansible.module_utils.ovirt_facts import (
+    search_by_terms,
+    supports_search,
+)
+
+
+# Top-level collections of the entity types, which can be listed
+# at once to index names of all entities of the type:
+COLLECTIONS = {
+    'Cluster': 'clusters_service',
+    'DataCenter': 'data_centers_service',
+    'Disk': 'disks_service',
+    'Group': 'groups_service',
+    'Host': 'hosts_service',
+    'Network': 'networks_service',
+    'Role': 'roles_service',
+    'StorageDomain': 'storage_domains_service',
+    'Template': 'templates_service',
+    'User': 'users_service',
+    'Vm': 'vms_service',
+    'VmPool': 'vm_pools_service',
+    'VnicProfile': 'vnic_profiles_service',
+}
+
+
+class EntityCache(object):
+    """
+    Per-run cache of entities looked up by name, and of names of entities
+    looked up by ID, kept per entity type. Names or IDs of several entities
+    of the same type are looked up by one `or` search query, collections
+    without search support are listed once. Names of the entities of types
+    without top-level collection are resolved by following their links, one
+    by one.
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._entities = {}
+        self._names = {}
+        self._listed = set()
+        self._followed = {}
+
+    def _service(self, type_name):
+        return getattr(self._connection.system_service(), COLLECTIONS[type_name])()
+
+    def _store(self, type_name, entities):
+        names = self._names.setdefault(type_name, {})
+        for entity in entities:
+            names[entity.id] = entity.name
+
+    def _list_all(self, type_name):
+        if type_name not in self._listed:
+            entities = self._service(type_name).list()
+            by_name = self._entities.setdefault(type_name, {})
+            for entity in entities:
+                by_name.setdefault(entity.name, []).append(entity)
+            self._store(type_name, entities)
+            self._listed.add(type_name)
+
+    def prefetch(self, type_name, names):
+        """
+        Look up entities of all names, which aren't cached yet, by one
+        search query.
+
+        :param type_name: name of the SDK type, for example `Disk`
+        :param names: names of the entities
+        """
+        by_name = self._entities.setdefault(type_name, {})
+        names = set(name for name in names if name is not None and name not in by_name)
+        if not names or type_name in self._listed:
+            return
+
+        service = self._service(type_name)
+        if not supports_search(service):
+            self._list_all(type_name)
+            return
+
+        entities = [e for e in search_by_terms(service, 'name', names) if e.name in names]
+        for name in names:
+            by_name[name] = [e for e in entities if e.name == name]
+        self._store(type_name, entities)
+
+    def all(self, type_name, name):
+        """
+        Return list of all entities of the type with the name.
+        """
+        self.prefetch(type_name, [name])
+        return self._entities[type_name].get(name, [])
+
+    def get(self, type_name, name):
+        """
+        Return entity of the type with the name, or `None` if there is no
+        such entity.
+        """
+        entities = self.all(type_name, name)
+        return entities[0] if entities else None
+
+    def prefetch_names(self, links):
+        """
+        Look up names of the entities which links point to, by one search
+        query per entity type.
+        """
+        ids = {}
+        for link in links:
+            if link is None or getattr(link, 'name', None):
+                continue
+            type_name = type(link).__name__
+            if type_name in COLLECTIONS and link.id not in self._names.get(type_name, {}):
+                ids.setdefault(type_name, set()).add(link.id)
+
+        for type_name, type_ids in ids.items():
+            service = self._service(type_name)
+            if supports_search(service):
+                self._store(type_name, search_by_terms(service, 'id', type_ids))
+            else:
+                self._list_all(type_name)
+
+    def name(self, link):
+        """
+        Return name of the entity which link points to.
+        """
+        if link is None:
+            return None
+        if getattr(link, 'name', None):
+            return link.name
+
+        type_name = type(link).__name__
+        if type_name in COLLECTIONS:
+            self.prefetch_names([link])
+            if link.id in self._names.get(type_name, {}):
+                return self._names[type_name][link.id]
+
+        if link.href not in self._followed:
+            self._followed[link.href] = get_link_name(self._connection, link)
+        return self._followed[link.href]
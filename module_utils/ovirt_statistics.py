@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016 Red Hat, Inc.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Collection and aggregation of statistics of VMs and hosts.
+
+Statistics of the entities are fetched concurrently and stored as a matrix
+of entities and statistics. If NumPy is available the matrices are NumPy
+arrays and the aggregates are computed in vectorized form, otherwise they
+are lists, and the aggregates are computed in Python.
+"""
+
+import collections
+import math
+import warnings
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+# Maximum number of statistics requests sent at once, so the number of
+# pending responses held in memory is bounded:
+CONCURRENT_REQUESTS = 100
+
+# Services of the collection and of the entity of supported entity types:
+ENTITY_SERVICES = {
+    'vm': ('vms_service', 'vm_service'),
+    'host': ('hosts_service', 'host_service'),
+}
+
+
+def _datum(statistic):
+    values = statistic.values
+    if not values or values[0].datum is None:
+        return None
+    return float(values[0].datum)
+
+
+def fetch_statistics(connection, entity_type, entities):
+    """
+    Fetch statistics of the entities concurrently, at most `CONCURRENT_REQUESTS`
+    requests are pending at a time.
+
+    :param connection: connection to the Python SDK
+    :param entity_type: `vm` or `host`
+    :param entities: list of SDK structs of the entities
+    :return: list of dictionaries of statistic values keyed by statistic
+             name, one per entity, and dictionary of units of the statistics
+    """
+    collection_service, entity_service = ENTITY_SERVICES[entity_type]
+    service = getattr(connection.system_service(), collection_service)()
+    samples = []
+    units = {}
+    for start in range(0, len(entities), CONCURRENT_REQUESTS):
+        futures = [
+            getattr(service, entity_service)(entity.id).statistics_service().list(wait=False)
+            for entity in entities[start:start + CONCURRENT_REQUESTS]
+        ]
+        for future in futures:
+            statistics = future.wait()
+            samples.append(dict((s.name, _datum(s)) for s in statistics))
+            for statistic in statistics:
+                if statistic.unit is not None:
+                    units[statistic.name] = str(statistic.unit)
+
+    return samples, units
+
+
+def to_matrix(samples, names):
+    """
+    Convert statistics of entities into matrix of entities and statistics,
+    missing values are `NaN`.
+    """
+    rows = [
+        [sample.get(name) for name in names]
+        for sample in samples
+    ]
+    if HAS_NUMPY:
+        return np.array(
+            [[np.nan if value is None else value for value in row] for row in rows],
+            dtype=float,
+        ).reshape(len(rows), len(names))
+    return [
+        [float('nan') if value is None else value for value in row]
+        for row in rows
+    ]
+
+
+class RingBuffer(object):
+    """
+    Keeps last `size` matrices of statistics sampled over a time window, so
+    memory used by sampling is bounded regardless of the length of the window.
+    """
+
+    def __init__(self, size):
+        self._size = size
+        self._buffer = None
+        self._count = 0
+        self._samples = collections.deque(maxlen=size)
+
+    def __len__(self):
+        return min(self._count, self._size)
+
+    def append(self, matrix):
+        if HAS_NUMPY:
+            if self._buffer is None:
+                self._buffer = np.full((self._size,) + matrix.shape, np.nan)
+            self._buffer[self._count % self._size] = matrix
+        else:
+            self._samples.append(matrix)
+        self._count += 1
+
+    def mean(self):
+        """
+        Return matrix of the means of the buffered samples, ignoring `NaN`.
+        """
+        if HAS_NUMPY:
+            with warnings.catch_warnings():
+                # Mean of statistics missing in all samples is NaN:
+                warnings.simplefilter('ignore', RuntimeWarning)
+                return np.nanmean(self._buffer[:len(self)], axis=0)
+
+        rows = len(self._samples[0])
+        columns = len(self._samples[0][0]) if rows else 0
+        mean = []
+        for row in range(rows):
+            mean_row = []
+            for column in range(columns):
+                values = [
+                    sample[row][column] for sample in self._samples
+                    if not math.isnan(sample[row][column])
+                ]
+                mean_row.append(sum(values) / len(values) if values else float('nan'))
+            mean.append(mean_row)
+        return mean
+
+
+def _percentile(sorted_values, percent):
+    # Linear interpolation between the closest ranks, as NumPy does:
+    rank = (len(sorted_values) - 1) * percent / 100.0
+    lower = int(math.floor(rank))
+    upper = int(math.ceil(rank))
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+def _aggregate_column(values, groups, group_count, percentiles, top):
+    """
+    Aggregate one column of the matrix in Python.
+    """
+    valid = [(i, v) for i, v in enumerate(values) if not math.isnan(v)]
+    if not valid:
+        return None
+
+    ordered = sorted(v for _, v in valid)
+    sums = [0.0] * group_count
+    counts = [0] * group_count
+    for i, v in valid:
+        sums[groups[i]] += v
+        counts[groups[i]] += 1
+
+    return dict(
+        sum=sum(ordered),
+        min=ordered[0],
+        max=ordered[-1],
+        mean=sum(ordered) / len(ordered),
+        percentiles=[_percentile(ordered, p) for p in percentiles],
+        top=[i for i, _ in sorted(valid, key=lambda item: -item[1])[:top]],
+        group_sums=sums,
+        group_counts=counts,
+    )
+
+
+def _aggregate_column_numpy(values, groups, group_count, percentiles, top):
+    """
+    Aggregate one column of the matrix in vectorized form.
+    """
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return None
+
+    present = values[valid]
+    # Indexes of the entities with highest values, NaN sorted last:
+    top_indexes = np.argsort(np.where(valid, -values, np.inf), kind='mergesort')[:min(top, present.size)]
+    return dict(
+        sum=float(present.sum()),
+        min=float(present.min()),
+        max=float(present.max()),
+        mean=float(present.mean()),
+        percentiles=[float(p) for p in np.percentile(present, percentiles)] if percentiles else [],
+        top=[int(i) for i in top_indexes],
+        group_sums=[float(s) for s in np.bincount(groups[valid], weights=present, minlength=group_count)],
+        group_counts=[int(c) for c in np.bincount(groups[valid], minlength=group_count)],
+    )
+
+
+def aggregate(matrix, names, units, entities, groups, percentiles, top):
+    """
+    Compute aggregates of every statistic over the entities.
+
+    :param matrix: matrix of entities and statistics
+    :param names: names of the statistics, the columns of the matrix
+    :param units: dictionary of units of the statistics
+    :param entities: list of SDK structs of the entities, the rows of the matrix
+    :param groups: list of group names of the entities, for example names of clusters
+    :param percentiles: list of percentiles to compute
+    :param top: number of entities with highest values to return
+    :return: dictionary of aggregates keyed by statistic name
+    """
+    group_names = sorted(set(groups))
+    indexes = dict((group, index) for index, group in enumerate(group_names))
+    group_indexes = [indexes[group] for group in groups]
+    if HAS_NUMPY:
+        group_indexes = np.array(group_indexes, dtype=int)
+
+    result = {}
+    for column, name in enumerate(names):
+        if HAS_NUMPY:
+            aggregates = _aggregate_column_numpy(
+                matrix[:, column], group_indexes, len(group_names), percentiles, top,
+            )
+        else:
+            aggregates = _aggregate_column(
+                [row[column] for row in matrix], group_indexes, len(group_names), percentiles, top,
+            )
+        if aggregates is None:
+            continue
+
+        result[name] = dict(
+            unit=units.get(name),
+            sum=aggregates['sum'],
+            min=aggregates['min'],
+            max=aggregates['max'],
+            mean=aggregates['mean'],
+            percentiles=dict(
+                ('p%g' % p, value)
+                for p, value in zip(percentiles, aggregates['percentiles'])
+            ),
+            top=[
+                dict(
+                    id=entities[i].id,
+                    name=entities[i].name,
+                    value=float(matrix[i][column]),
+                ) for i in aggregates['top']
+            ],
+            groups=dict(
+                (group, dict(sum=total, count=count, mean=total / count))
+                for group, total, count in zip(
+                    group_names, aggregates['group_sums'], aggregates['group_counts'],
+                ) if count
+            ),
+        )
+
+    return result
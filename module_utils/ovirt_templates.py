@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016 Red Hat, Inc.
+#
+# This file is part of Ansible
+#
+# Ansible is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Ansible is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+Local index of the templates and their versions.
+
+Templates are resolved by name and version number on every VM create,
+which requires listing of all versions of the template. The index maps
+name and version number of all templates to their IDs. It's built by one
+listing of the templates, stored locally and shared by subsequent runs.
+The index is rebuilt when the engine logs an event related to a template
+since the index was built, or when a template isn't found in the index.
+"""
+
+import os
+
+from ansible.module_utils.ovirt_facts import (
+    auth_key,
+    event_index,
+    last_event_index,
+    read_json,
+    write_json,
+)
+
+
+DEFAULT_TEMPLATE_INDEX_PATH = '~/.ansible/ovirt_template_index'
+
+# Version of the stored index, the index of other version is rebuilt:
+INDEX_VERSION = 1
+
+
+class TemplateIndex(object):
+    """
+    Index of the templates keyed by name and version number, the version
+    number `None` selects the latest version of the template.
+    """
+
+    def __init__(self, connection, auth, path=None):
+        """
+        :param connection: connection to the Python SDK
+        :param auth: dictionary which contains the engine URL and the user
+        :param path: directory of the stored indexes
+        """
+        self._connection = connection
+        self._path = os.path.join(
+            os.path.expanduser(path or DEFAULT_TEMPLATE_INDEX_PATH),
+            '%s.json' % auth_key(auth),
+        )
+        self._keys = None
+        self._fresh = False
+
+    def _build(self):
+        # Take the index before listing, so templates changed during
+        # listing are rebuilt by the next run:
+        index = last_event_index(self._connection.system_service().events_service())
+        templates = [
+            dict(
+                id=t.id,
+                name=t.name,
+                version=t.version.version_number if t.version else None,
+            ) for t in self._connection.system_service().templates_service().list()
+        ]
+        write_json(self._path, dict(version=INDEX_VERSION, index=index, templates=templates))
+        self._fresh = True
+        return templates
+
+    def _load(self):
+        stored = read_json(self._path)
+        if stored is None or stored.get('version') != INDEX_VERSION:
+            return self._build()
+
+        index = stored['index']
+        events = self._connection.system_service().events_service().list(from_=index)
+        if any(event.template is not None for event in events):
+            return self._build()
+
+        # Move the index past the processed events, so next runs list only newer events:
+        if events:
+            stored['index'] = max(index, max(event_index(event) for event in events))
+            write_json(self._path, stored)
+        return stored['templates']
+
+    def _index(self, templates):
+        keys = {}
+        for template in sorted(templates, key=lambda t: (t['version'] or 0, t['id'])):
+            keys.setdefault((template['name'], template['version']), template['id'])
+            # Versions are sorted, so the latest version is stored last:
+            keys[(template['name'], None)] = template['id']
+        self._keys = keys
+
+    def template_id(self, name, version=None):
+        """
+        Return ID of the template of the name and version number, or `None`
+        if there is no such template. If the template isn't in the stored
+        index, the index is rebuilt once.
+
+        :param name: name of the template
+        :param version: version number, `None` for the latest version
+        :return: ID of the template
+        """
+        if self._keys is None:
+            self._index(self._load())
+
+        key = (name, version)
+        if key not in self._keys and not self._fresh:
+            self._index(self._build())
+
+        return self._keys.get(key)